@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed; carries the HTTP status and a Retry-After hint."""
+
+    def __init__(self, status_code: int, detail: str, retry_after: float):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = max(1, int(round(retry_after)))
+
+
+class TokenBucket:
+    """Classic token bucket: ``rate`` tokens per second up to ``burst``."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, cost: float = 1.0) -> bool:
+        self._refill()
+        if self._tokens >= cost:
+            self._tokens -= cost
+            return True
+        return False
+
+    def retry_after(self, cost: float = 1.0) -> float:
+        self._refill()
+        if self.rate <= 0:
+            return 60.0
+        return max(0.0, (cost - self._tokens) / self.rate)
+
+
+def _upstream_status(exc: BaseException) -> Optional[int]:
+    """HTTP status of a rejected websocket handshake, across websockets versions."""
+    response = getattr(exc, "response", None)
+    status = getattr(response, "status_code", None) or getattr(exc, "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+class AdmissionController:
+    """Sheds load at the API edge before it reaches Azure Voice Live.
+
+    New sessions are limited by concurrent upstream connects, a short wait
+    queue with a deadline and a cap on live sessions; admitted sessions get
+    per-client token buckets for text and audio messages.
+    """
+
+    def __init__(self) -> None:
+        self.max_concurrent_connects = int(os.getenv("ADMISSION_MAX_CONCURRENT_CONNECTS", "4"))
+        self.max_waiting = int(os.getenv("ADMISSION_MAX_WAITING", "16"))
+        self.wait_timeout = float(os.getenv("ADMISSION_WAIT_TIMEOUT_SECONDS", "2"))
+        self.connect_timeout = float(os.getenv("ADMISSION_CONNECT_TIMEOUT_SECONDS", "10"))
+        self.max_sessions = int(os.getenv("MAX_ACTIVE_SESSIONS", "50"))
+        # Text-only sessions have no audio or avatar streams, so far more fit in a container
+        self.max_text_sessions = int(os.getenv("MAX_ACTIVE_TEXT_SESSIONS", "500"))
+        self.text_rate = float(os.getenv("ADMISSION_TEXT_RATE", "1"))
+        self.text_burst = float(os.getenv("ADMISSION_TEXT_BURST", "5"))
+        # Audio is metered in seconds of audio per second of wall time
+        self.audio_rate = float(os.getenv("ADMISSION_AUDIO_RATE", "1.5"))
+        self.audio_burst = float(os.getenv("ADMISSION_AUDIO_BURST", "3"))
+        self._connect_semaphore = asyncio.Semaphore(self.max_concurrent_connects)
+        self._waiting = 0
+        self._active = 0
+        # Sessions admitted past the capacity check but not yet registered, per kind of session
+        self._reserved: Dict[str, int] = {}
+        self._connect_seconds = 1.0
+        self._throttled_until = 0.0
+        self._text_buckets: Dict[str, TokenBucket] = {}
+        self._audio_buckets: Dict[str, TokenBucket] = {}
+
+    def _retry_hint(self) -> float:
+        queued = self._waiting + self.max_concurrent_connects
+        return self._connect_seconds * queued / max(1, self.max_concurrent_connects)
+
+    @asynccontextmanager
+    async def connect_slot(
+        self,
+        active_sessions: int,
+        max_sessions: Optional[int] = None,
+        kind: str = "voice",
+        timeout_detail: str = "Upstream connect timed out",
+    ) -> AsyncIterator[None]:
+        """Admit one upstream session connect or raise :class:`AdmissionRejected`.
+
+        ``active_sessions`` is the registered count of this ``kind``; requests admitted but still
+        connecting hold a reservation so concurrent requests cannot all take the last slot.
+        """
+        now = time.monotonic()
+        if now < self._throttled_until:
+            raise AdmissionRejected(503, "Upstream is rate limiting new sessions", self._throttled_until - now)
+        reserved = self._reserved.get(kind, 0)
+        if active_sessions + reserved >= (self.max_sessions if max_sessions is None else max_sessions):
+            raise AdmissionRejected(503, "Session capacity reached", 30)
+        if self._active + self._waiting >= self.max_concurrent_connects + self.max_waiting:
+            raise AdmissionRejected(503, "Too many pending session requests", self._retry_hint())
+
+        self._reserved[kind] = reserved + 1
+        try:
+            self._waiting += 1
+            try:
+                await asyncio.wait_for(self._connect_semaphore.acquire(), timeout=self.wait_timeout)
+            except asyncio.TimeoutError as exc:
+                raise AdmissionRejected(503, "Timed out waiting for a connect slot", self._retry_hint()) from exc
+            finally:
+                self._waiting -= 1
+
+            async with self._holding_connect_slot(timeout_detail):
+                yield
+        finally:
+            self._reserved[kind] -= 1
+
+    @asynccontextmanager
+    async def _holding_connect_slot(self, timeout_detail: str) -> AsyncIterator[None]:
+        self._active += 1
+        started = time.monotonic()
+        try:
+            yield
+        except asyncio.TimeoutError as exc:
+            raise AdmissionRejected(503, timeout_detail, self._retry_hint()) from exc
+        except Exception as exc:
+            if _upstream_status(exc) != 429:
+                raise
+            # Back off all new connects for a while instead of piling onto a throttled upstream
+            self._throttled_until = time.monotonic() + 10
+            logger.warning("Upstream rejected a session with 429; shedding new sessions for 10s")
+            raise AdmissionRejected(503, "Upstream is rate limiting new sessions", 10) from exc
+        else:
+            elapsed = time.monotonic() - started
+            self._connect_seconds = 0.8 * self._connect_seconds + 0.2 * elapsed
+        finally:
+            self._active -= 1
+            self._connect_semaphore.release()
+
+    def _bucket(self, buckets: Dict[str, TokenBucket], client_id: str, rate: float, burst: float) -> TokenBucket:
+        bucket = buckets.get(client_id)
+        if bucket is None:
+            bucket = buckets[client_id] = TokenBucket(rate, burst)
+        return bucket
+
+    def check_text(self, client_id: str) -> None:
+        """Charge one text/response request, raising 429 when the client is over its rate."""
+        bucket = self._bucket(self._text_buckets, client_id, self.text_rate, self.text_burst)
+        if not bucket.try_acquire():
+            raise AdmissionRejected(429, "Too many messages", bucket.retry_after())
+
+    def allow_audio(self, client_id: str, audio_seconds: float) -> bool:
+        """Charge ``audio_seconds`` of microphone audio; False means drop the frame."""
+        bucket = self._bucket(self._audio_buckets, client_id, self.audio_rate, self.audio_burst)
+        return bucket.try_acquire(audio_seconds)
+
+    def forget(self, client_id: str) -> None:
+        self._text_buckets.pop(client_id, None)
+        self._audio_buckets.pop(client_id, None)
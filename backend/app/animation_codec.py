@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import struct
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+# Binary WebSocket frames for avatar animation. Every frame starts with a one-byte kind.
+#
+# Blendshapes: <B kind=1><B reserved><H frame_count><H values_per_frame><I frame_index>
+#              followed by frame_count * values_per_frame little-endian float16 values.
+# Visemes:     <B kind=2><B reserved><H record_count>
+#              followed by record_count * <I audio_offset_ms><B viseme_id> records.
+KIND_BLENDSHAPES = 1
+KIND_VISEMES = 2
+
+_BLENDSHAPE_HEADER = struct.Struct("<BBHHI")
+_VISEME_HEADER = struct.Struct("<BBH")
+_VISEME_RECORD = struct.Struct("<IB")
+
+
+def encode_blendshapes(event: Dict[str, Any]) -> bytes:
+    """Pack a ``response.animation_blendshapes.delta`` event; raises ValueError on malformed frames."""
+    try:
+        frames = np.asarray(event.get("frames") or [], dtype="<f2")
+        if frames.ndim == 1:
+            # A single flat frame, or none at all
+            frames = frames.reshape(1 if frames.size else 0, frames.size)
+        if frames.ndim != 2:
+            raise ValueError(f"expected 2 dimensions, got {frames.ndim}")
+        frame_count, values_per_frame = frames.shape
+        header = _BLENDSHAPE_HEADER.pack(
+            KIND_BLENDSHAPES, 0, frame_count, values_per_frame, int(event.get("frame_index") or 0)
+        )
+    except (TypeError, ValueError, struct.error) as exc:
+        # Ragged rows, non-numeric values or counts that do not fit the header
+        raise ValueError(f"Malformed blendshape frames: {exc}") from exc
+    return header + frames.tobytes()
+
+
+def encode_visemes(events: List[Dict[str, Any]]) -> bytes:
+    """Pack one or more ``response.animation_viseme.delta`` events; raises ValueError on malformed ones."""
+    try:
+        parts = [_VISEME_HEADER.pack(KIND_VISEMES, 0, len(events))]
+        for event in events:
+            parts.append(
+                _VISEME_RECORD.pack(int(event.get("audio_offset_ms") or 0), int(event.get("viseme_id") or 0))
+            )
+    except (TypeError, ValueError, struct.error) as exc:
+        raise ValueError(f"Malformed viseme events: {exc}") from exc
+    return b"".join(parts)
+
+
+def decode(frame: bytes) -> Tuple[int, Any]:
+    """Inverse of the encoders, for tools and benchmarks."""
+    kind = frame[0]
+    if kind == KIND_BLENDSHAPES:
+        _, _, frame_count, values_per_frame, frame_index = _BLENDSHAPE_HEADER.unpack_from(frame)
+        values = np.frombuffer(frame, dtype="<f2", offset=_BLENDSHAPE_HEADER.size)
+        return kind, {"frame_index": frame_index, "frames": values.reshape(frame_count, values_per_frame)}
+    if kind == KIND_VISEMES:
+        _, _, count = _VISEME_HEADER.unpack_from(frame)
+        records = [
+            _VISEME_RECORD.unpack_from(frame, _VISEME_HEADER.size + i * _VISEME_RECORD.size) for i in range(count)
+        ]
+        return kind, [{"audio_offset_ms": offset, "viseme_id": viseme} for offset, viseme in records]
+    raise ValueError(f"Unknown animation frame kind {kind}")
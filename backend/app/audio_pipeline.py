@@ -0,0 +1,159 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Awaitable, Callable, Deque, List, Optional, Tuple, Union
+
+from .audio_utils import TARGET_SAMPLE_RATE, transcode_batch
+
+logger = logging.getLogger(__name__)
+
+# (data, encoding) as received from the browser: base64 text from JSON messages, raw bytes from binary frames
+Chunk = Tuple[Union[str, bytes], str]
+
+_UNSET = object()
+_executor: object = _UNSET
+
+
+def _create_executor(mode: str) -> Optional[Executor]:
+    workers = int(os.getenv("AUDIO_TRANSCODE_WORKERS", str(min(4, os.cpu_count() or 1))))
+    if mode == "inline":
+        return None
+    if mode == "process":
+        # spawn: forking a process that runs an event loop and thread pools is not safe
+        return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    if mode != "thread":
+        logger.warning("Unknown AUDIO_TRANSCODE_EXECUTOR %r, using thread", mode)
+    # NumPy and base64 release the GIL for the bulk of the work
+    return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="audio-transcode")
+
+
+def get_transcode_executor() -> Optional[Executor]:
+    """Process-wide transcode pool selected by AUDIO_TRANSCODE_EXECUTOR; None means inline on the event loop."""
+    global _executor  # pylint: disable=global-statement
+    if _executor is _UNSET:
+        _executor = _create_executor(os.getenv("AUDIO_TRANSCODE_EXECUTOR", "thread").lower())
+    return _executor  # type: ignore[return-value]
+
+
+def shutdown_transcode_executor() -> None:
+    global _executor  # pylint: disable=global-statement
+    if isinstance(_executor, Executor):
+        _executor.shutdown(wait=False, cancel_futures=True)
+    _executor = _UNSET
+
+
+def _batch_limit() -> int:
+    """Base64 characters of float32 audio in AUDIO_TRANSCODE_MAX_BATCH_MS."""
+    batch_ms = float(os.getenv("AUDIO_TRANSCODE_MAX_BATCH_MS", "200"))
+    return max(1, int(TARGET_SAMPLE_RATE * 4 * batch_ms / 1000 * 4 / 3))
+
+
+def _chunk_chars(data: Union[str, bytes]) -> int:
+    """Size of a chunk in base64 characters, whichever form it arrived in."""
+    return (len(data) + 2) // 3 * 4 if isinstance(data, bytes) else len(data)
+
+
+def _passes_through(batch: List[Chunk]) -> bool:
+    """A lone base64 PCM16 chunk is already what Voice Live wants."""
+    return len(batch) == 1 and isinstance(batch[0][0], str) and batch[0][1] != "float32"
+
+
+class AudioPipeline:
+    """Per-session transcode stage between the browser socket and Voice Live.
+
+    Chunks are converted in order, one dispatch at a time; whatever queued up while
+    the previous batch was in the pool goes out as the next single append. Raw PCM16
+    frames skip the pool while nothing is queued ahead of them.
+    """
+
+    def __init__(
+        self,
+        send: Callable[[str], Awaitable[None]],
+        executor: object = _UNSET,
+        max_batch_chars: Optional[int] = None,
+    ):
+        self._send = send
+        self._executor: Optional[Executor] = get_transcode_executor() if executor is _UNSET else executor  # type: ignore[assignment]
+        self._max_batch_chars = max_batch_chars or _batch_limit()
+        self._pending: Deque[Chunk] = deque()
+        self._pending_chars = 0
+        self._worker: Optional[asyncio.Task] = None
+        # Bumped by clear() so a batch already in the pool is discarded
+        self._generation = 0
+        self.batches = 0
+        self.chunks = 0
+
+    async def submit(self, data: Union[str, bytes], encoding: str) -> None:
+        """Queue base64 text or raw bytes (binary frames) for conversion and sending."""
+        self.chunks += 1
+        idle = self._worker is None or self._worker.done()
+        # Raw PCM16 only needs base64, which costs less than a pool dispatch (bench_audio_offload.py
+        # --input binary), so it is encoded here unless earlier chunks are still queued ahead of it
+        if self._executor is None or (isinstance(data, bytes) and encoding != "float32" and idle):
+            self.batches += 1
+            await self._send(self._convert_inline([(data, encoding)]))
+            return
+        self._pending.append((data, encoding))
+        self._pending_chars += _chunk_chars(data)
+        if idle:
+            self._worker = asyncio.create_task(self._run())
+        elif self._pending_chars > 5 * self._max_batch_chars:
+            # The pool is falling behind: hold the reader rather than queue without bound
+            await self.flush()
+
+    async def flush(self) -> None:
+        """Wait until every submitted chunk has been sent upstream."""
+        while self._worker is not None and not self._worker.done():
+            await asyncio.shield(self._worker)
+
+    def clear(self) -> None:
+        """Drop chunks not yet sent upstream."""
+        self._pending.clear()
+        self._pending_chars = 0
+        self._generation += 1
+
+    def close(self) -> None:
+        self.clear()
+        if self._worker is not None:
+            self._worker.cancel()
+
+    @staticmethod
+    def _convert_inline(batch: List[Chunk]) -> str:
+        if _passes_through(batch):
+            return batch[0][0]  # type: ignore[return-value]
+        return transcode_batch(batch)
+
+    def _take_batch(self) -> List[Chunk]:
+        batch = [self._pending.popleft()]
+        size = _chunk_chars(batch[0][0])
+        while self._pending and size + _chunk_chars(self._pending[0][0]) <= self._max_batch_chars:
+            chunk = self._pending.popleft()
+            size += _chunk_chars(chunk[0])
+            batch.append(chunk)
+        self._pending_chars -= size
+        return batch
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while self._pending:
+            batch = self._take_batch()
+            generation = self._generation
+            try:
+                if _passes_through(batch):
+                    pcm_b64 = batch[0][0]
+                else:
+                    pcm_b64 = await loop.run_in_executor(self._executor, transcode_batch, batch)
+                if generation != self._generation:
+                    continue
+                self.batches += 1
+                await self._send(pcm_b64)
+            except asyncio.CancelledError:
+                raise
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Dropping %d queued audio chunks after a failed append", len(batch) + len(self._pending))
+                self.clear()
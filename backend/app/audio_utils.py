@@ -1,5 +1,5 @@
 import base64
-from typing import Iterable
+from typing import Iterable, Sequence, Tuple, Union
 
 import numpy as np
 
@@ -31,3 +31,17 @@ def float_frame_base64_to_pcm16_base64(data_b64: str) -> str:
     float_array = np.frombuffer(base64.b64decode(data_b64), dtype=np.float32)
     pcm_bytes = float_frame_to_pcm16_bytes(float_array)
     return base64.b64encode(pcm_bytes).decode("ascii")
+
+
+def transcode_batch(chunks: Sequence[Tuple[Union[str, bytes], str]]) -> str:
+    """Join consecutive ``(data, encoding)`` chunks into one base64-encoded PCM16 payload.
+
+    ``data`` is base64 text from JSON messages, or raw bytes from binary WebSocket frames.
+    """
+    parts = []
+    for data, encoding in chunks:
+        raw = data if isinstance(data, bytes) else base64.b64decode(data)
+        if encoding == "float32":
+            raw = float_frame_to_pcm16_bytes(np.frombuffer(raw, dtype=np.float32))
+        parts.append(raw)
+    return base64.b64encode(b"".join(parts)).decode("ascii")
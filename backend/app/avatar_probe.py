@@ -0,0 +1,350 @@
+"""
+Probe which avatar character/style/resolution combinations a Voice Live resource accepts.
+
+Each probe runs the real negotiation (session.update, then session.avatar.connect
+with a WebRTC offer from aiortc). Probes run concurrently up to a bound, and the
+results are kept in an on-disk capability cache. ``_build_avatar_config``
+consults that cache without any network round trip.
+
+    python -m app.avatar_probe lisa:casual-sitting james:casual-sitting --concurrency 4
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parents[1] / ".avatar_capabilities.json"
+
+
+class ProbeResult(NamedTuple):
+    character: str
+    style: Optional[str]
+    width: int
+    height: int
+    valid: bool
+    message: str
+    # The service gave a verdict on the character itself (accepted, or failed avatar verification),
+    # rather than failing for some other reason; only these are cached
+    definite: bool = False
+
+
+def _cache_key(endpoint: str, character: str, style: Optional[str], width: int, height: int) -> str:
+    return f"{endpoint.rstrip('/')}|{character}|{style or ''}|{width}x{height}"
+
+
+class CapabilityCache:
+    """JSON file of probe verdicts, keyed by endpoint, character, style and resolution."""
+
+    def __init__(self, path: Path, ttl_seconds: float):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        try:
+            self._entries: Dict[str, Dict[str, Any]] = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self._entries = {}
+
+    def get(self, endpoint: str, character: str, style: Optional[str], width: int, height: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(_cache_key(endpoint, character, style, width, height))
+        if entry is None or time.time() - entry["checked_at"] > self.ttl_seconds:
+            return None
+        return entry
+
+    def put(self, endpoint: str, result: ProbeResult) -> None:
+        key = _cache_key(endpoint, result.character, result.style, result.width, result.height)
+        with self._lock:
+            self._entries[key] = {"valid": result.valid, "message": result.message, "checked_at": time.time()}
+
+    def valid_combinations(self, endpoint: str, width: int, height: int) -> List[Tuple[str, Optional[str]]]:
+        prefix = f"{endpoint.rstrip('/')}|"
+        suffix = f"|{width}x{height}"
+        found = []
+        with self._lock:
+            for key, entry in self._entries.items():
+                if key.startswith(prefix) and key.endswith(suffix) and entry["valid"]:
+                    _, character, style, _ = key.split("|")
+                    found.append((character, style or None))
+        return found
+
+    def save(self) -> None:
+        with self._lock:
+            data = json.dumps(self._entries, indent=2, sort_keys=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        tmp_path.write_text(data, encoding="utf-8")
+        tmp_path.replace(self.path)
+
+
+_cache: Optional[CapabilityCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_capability_cache() -> CapabilityCache:
+    global _cache  # pylint: disable=global-statement
+    with _cache_lock:
+        if _cache is None:
+            path = Path(os.getenv("AVATAR_CAPABILITY_CACHE", str(DEFAULT_CACHE_PATH)))
+            ttl_hours = float(os.getenv("AVATAR_CAPABILITY_TTL_HOURS", "168"))
+            _cache = CapabilityCache(path, ttl_hours * 3600)
+        return _cache
+
+
+def _configured_endpoints() -> List[Tuple[str, Optional[str]]]:
+    """(url, api key) of every configured endpoint: AZURE_VOICE_LIVE_ENDPOINTS or AZURE_VOICE_LIVE_ENDPOINT."""
+    from .endpoint_pool import endpoints_from_env
+
+    return [(state.url, state.api_key) for state in endpoints_from_env()]
+
+
+def _default_endpoint() -> str:
+    endpoints = _configured_endpoints()
+    return endpoints[0][0] if endpoints else ""
+
+
+def avatar_capability(character: str, style: Optional[str], width: int, height: int) -> Optional[bool]:
+    """Cached verdict across the configured endpoints, or None when none was probed.
+
+    A session may land on any endpoint, so the combination counts as rejected only
+    when no endpoint has accepted it.
+    """
+    cache = get_capability_cache()
+    verdicts = [cache.get(url, character, style, width, height) for url, _ in _configured_endpoints()]
+    verdicts = [entry["valid"] for entry in verdicts if entry is not None]
+    return any(verdicts) if verdicts else None
+
+
+def known_valid_avatar(width: int, height: int) -> Optional[Tuple[str, Optional[str]]]:
+    """Some combination the cache has seen accepted at this resolution on a configured endpoint."""
+    cache = get_capability_cache()
+    for url, _ in _configured_endpoints():
+        combinations = cache.valid_combinations(url, width, height)
+        if combinations:
+            return combinations[0]
+    return None
+
+
+def _ws_url(endpoint: str, api_version: str, model: str) -> str:
+    base = endpoint.rstrip("/").replace("https://", "wss://").replace("http://", "ws://")
+    return f"{base}/voice-live/realtime?api-version={api_version}&model={model}"
+
+
+def _decode_server_sdp(raw: str) -> Tuple[str, str]:
+    """The service base64-encodes a JSON ``{"type", "sdp"}`` payload; older versions send raw SDP."""
+    if not raw or raw.startswith("v=0"):
+        return raw, "answer"
+    try:
+        decoded = base64.b64decode(raw).decode()
+    except Exception:  # pylint: disable=broad-except
+        return "", "answer"
+    try:
+        parsed = json.loads(decoded)
+    except json.JSONDecodeError:
+        return decoded, "answer"
+    return parsed.get("sdp", ""), parsed.get("type") or "answer"
+
+
+async def _wait_for(ws, types: Iterable[str], timeout: float) -> Dict[str, Any]:
+    """Next event of one of ``types`` (or an error), skipping everything else."""
+    wanted = set(types) | {"error"}
+    while True:
+        event = json.loads(await asyncio.wait_for(ws.recv(), timeout=timeout))
+        if event.get("type") in wanted:
+            return event
+
+
+async def probe_avatar(
+    character: str,
+    style: Optional[str],
+    width: int = 1280,
+    height: int = 720,
+    *,
+    endpoint: Optional[str] = None,
+    api_key: Optional[str] = None,
+    connect: Optional[Callable[..., Any]] = None,
+    timeout: float = 5.0,
+) -> ProbeResult:
+    """Run one avatar negotiation; ``endpoint`` and ``connect`` can point at a local mock."""
+    from aiortc import RTCPeerConnection, RTCSessionDescription  # imported lazily: heavy, and only needed here
+
+    if connect is None:
+        import websockets  # type: ignore[import]
+
+        connect = websockets.connect
+    endpoint = endpoint or _default_endpoint()
+    api_key = api_key or os.getenv("AZURE_OPENAI_API_KEY", "")
+    url = _ws_url(
+        endpoint,
+        os.getenv("AZURE_VOICE_LIVE_API_VERSION", "2025-05-01-preview"),
+        os.getenv("VOICE_LIVE_MODEL", "gpt-realtime"),
+    )
+
+    def result(valid: bool, message: str, definite: bool = False) -> ProbeResult:
+        return ProbeResult(character, style, width, height, valid, message, definite)
+
+    avatar_config: Dict[str, Any] = {
+        "character": character,
+        "customized": False,
+        "video": {"resolution": {"width": width, "height": height}, "bitrate": 2000000},
+    }
+    if style:
+        avatar_config["style"] = style
+
+    pc = RTCPeerConnection()
+    try:
+        async with connect(url, additional_headers=[("api-key", api_key)]) as ws:
+            event = await _wait_for(ws, ["session.created"], timeout)
+            if event["type"] == "error":
+                return result(False, f"Error: {event.get('error', {}).get('message', 'Unknown error')}")
+
+            session = {"modalities": ["text", "audio", "avatar"], "avatar": avatar_config}
+            await ws.send(json.dumps({"type": "session.update", "session": session}))
+            event = await _wait_for(ws, ["session.updated"], timeout)
+            if event["type"] == "error":
+                return result(False, f"Config error: {event.get('error', {}).get('message', 'Unknown')}")
+            if "avatar" not in event.get("session", {}).get("modalities", []):
+                return result(False, "Avatar modality not supported by resource")
+
+            # Downstream media only; the complete SDP (all ICE candidates) is what the service expects
+            pc.addTransceiver("audio", direction="recvonly")
+            pc.addTransceiver("video", direction="recvonly")
+            await pc.setLocalDescription(await pc.createOffer())
+            deadline = time.monotonic() + timeout
+            while pc.iceGatheringState != "complete" and time.monotonic() < deadline:
+                await asyncio.sleep(0.05)
+            offer = json.dumps({"type": "offer", "sdp": pc.localDescription.sdp})
+            await ws.send(
+                json.dumps(
+                    {
+                        "type": "session.avatar.connect",
+                        "client_sdp": base64.b64encode(offer.encode()).decode(),
+                        "rtc_configuration": {"bundle_policy": "max-bundle"},
+                    }
+                )
+            )
+
+            event = await _wait_for(ws, ["session.avatar.connecting"], timeout * 2)
+            if event["type"] == "error":
+                error = event.get("error", {})
+                if error.get("code") == "avatar_verification_failed":
+                    return result(False, f"Not found: {error.get('message', 'Character not found')}", definite=True)
+                return result(False, f"Error: {error.get('message', 'Unknown error')}")
+            server_sdp, answer_type = _decode_server_sdp(event.get("server_sdp", ""))
+            if not server_sdp:
+                return result(False, "Error: Empty server SDP received")
+            try:
+                await pc.setRemoteDescription(RTCSessionDescription(sdp=server_sdp, type=answer_type))
+            except Exception as exc:  # pylint: disable=broad-except
+                return result(False, f"Error setting remote description: {exc}")
+            return result(True, "Valid character+style", definite=True)
+    except asyncio.TimeoutError:
+        return result(False, "Timeout waiting for response")
+    except Exception as exc:  # pylint: disable=broad-except
+        return result(False, f"Connection error: {exc}")
+    finally:
+        await pc.close()
+
+
+async def probe_many(
+    combinations: Iterable[Tuple[str, Optional[str], int, int]],
+    *,
+    concurrency: int = 4,
+    refresh: bool = False,
+    cache: Optional[CapabilityCache] = None,
+    **probe_options: Any,
+) -> List[ProbeResult]:
+    """Probe combinations with bounded concurrency, answering from the cache where possible."""
+    cache = cache or get_capability_cache()
+    endpoint = probe_options.get("endpoint") or _default_endpoint()
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def run(character: str, style: Optional[str], width: int, height: int) -> ProbeResult:
+        cached = None if refresh else cache.get(endpoint, character, style, width, height)
+        if cached is not None:
+            return ProbeResult(character, style, width, height, cached["valid"], f"{cached['message']} (cached)", True)
+        async with semaphore:
+            outcome = await probe_avatar(character, style, width, height, **probe_options)
+        # Only the service's verdict on the character is cached; any other failure may be transient
+        if outcome.definite:
+            cache.put(endpoint, outcome)
+        return outcome
+
+    results = await asyncio.gather(*(run(*combination) for combination in combinations))
+    cache.save()
+    return list(results)
+
+
+async def validate_configured_avatar() -> List[ProbeResult]:
+    """Probe the configured character/style at every avatar profile resolution, on every endpoint."""
+    from .avatar_profiles import AVATAR_PROFILES
+
+    default_key = os.getenv("AZURE_OPENAI_API_KEY")
+    endpoints = [(url, api_key or default_key) for url, api_key in _configured_endpoints()]
+    if not endpoints or not all(api_key for _, api_key in endpoints):
+        logger.info("Skipping avatar validation: endpoint or API key not configured")
+        return []
+    character = os.getenv("AZURE_VOICE_AVATAR_CHARACTER", "lisa")
+    style = os.getenv("AZURE_VOICE_AVATAR_STYLE")
+    combinations = [(character, style, profile["width"], profile["height"]) for profile in AVATAR_PROFILES.values()]
+    results: List[ProbeResult] = []
+    for url, api_key in endpoints:
+        outcomes = await probe_many(
+            combinations,
+            concurrency=int(os.getenv("AVATAR_PROBE_CONCURRENCY", "4")),
+            endpoint=url,
+            api_key=api_key,
+        )
+        for outcome in outcomes:
+            if not outcome.valid:
+                logger.warning(
+                    "Avatar %s/%s at %dx%d rejected by %s: %s",
+                    outcome.character,
+                    outcome.style,
+                    outcome.width,
+                    outcome.height,
+                    url,
+                    outcome.message,
+                )
+        results.extend(outcomes)
+    return results
+
+
+def _parse_combination(value: str) -> Tuple[str, Optional[str]]:
+    character, _, style = value.partition(":")
+    return character, style or None
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("combinations", nargs="+", type=_parse_combination, help="character[:style]")
+    parser.add_argument("--resolution", default="1280x720", help="WIDTHxHEIGHT (default 1280x720)")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--refresh", action="store_true", help="ignore cached verdicts")
+    parser.add_argument(
+        "--endpoint", help="default: the first configured endpoint; e.g. ws://127.0.0.1:8765 for a mock"
+    )
+    args = parser.parse_args(argv)
+
+    width, height = (int(part) for part in args.resolution.lower().split("x"))
+    combinations = [(character, style, width, height) for character, style in args.combinations]
+    results = asyncio.run(
+        probe_many(combinations, concurrency=args.concurrency, refresh=args.refresh, endpoint=args.endpoint)
+    )
+    for outcome in results:
+        label = f"{outcome.character}+{outcome.style}" if outcome.style else outcome.character
+        print(f"{'[OK]' if outcome.valid else '[X] '} {label} {outcome.width}x{outcome.height}: {outcome.message}")
+    return 0 if any(outcome.valid for outcome in results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
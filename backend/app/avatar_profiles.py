@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+import logging
+import os
+from typing import Any, Dict, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+# Ordered from cheapest to richest; bitrates follow the avatar service's recommended ranges
+AVATAR_PROFILES: Dict[str, Dict[str, int]] = {
+    "360p": {"width": 640, "height": 360, "bitrate": 500_000},
+    "540p": {"width": 960, "height": 540, "bitrate": 1_000_000},
+    "720p": {"width": 1280, "height": 720, "bitrate": 2_000_000},
+}
+AUDIO_ONLY = "audio-only"
+
+# Video should use at most this share of the client's measured downlink
+_BANDWIDTH_HEADROOM = 0.6
+
+
+def default_avatar_profile() -> str:
+    name = os.getenv("AZURE_VOICE_AVATAR_PROFILE", "720p")
+    if name not in AVATAR_PROFILES:
+        logger.warning("Unknown AZURE_VOICE_AVATAR_PROFILE %r; using 720p", name)
+        return "720p"
+    return name
+
+
+def _cheapest(*names: str) -> str:
+    order = list(AVATAR_PROFILES)
+    return min(names, key=order.index)
+
+
+def _profile_for_viewport(width: float, height: float) -> str:
+    """Smallest profile that covers the rendered avatar in device pixels."""
+    for name, profile in AVATAR_PROFILES.items():
+        if profile["width"] >= width and profile["height"] >= height:
+            return name
+    return list(AVATAR_PROFILES)[-1]
+
+
+def _profile_for_bandwidth(downlink_mbps: float) -> Optional[str]:
+    """Richest profile the link can sustain, or None when even the cheapest one cannot."""
+    budget = downlink_mbps * 1_000_000 * _BANDWIDTH_HEADROOM
+    best: Optional[str] = None
+    for name, profile in AVATAR_PROFILES.items():
+        if profile["bitrate"] <= budget:
+            best = name
+    return best
+
+
+def select_avatar_profile(hints: Optional[Mapping[str, Any]]) -> str:
+    """Pick an avatar profile name (or ``AUDIO_ONLY``) from client hints.
+
+    Recognised hints: ``audio_only``, ``save_data``, ``avatar_profile``,
+    ``viewport_width``/``viewport_height``, ``device_pixel_ratio`` and
+    ``downlink_mbps``. The configured default is an upper bound.
+    """
+    ceiling = default_avatar_profile()
+    if not hints:
+        return ceiling
+    if hints.get("audio_only"):
+        return AUDIO_ONLY
+
+    candidates = [ceiling]
+    requested = hints.get("avatar_profile")
+    if requested == AUDIO_ONLY:
+        return AUDIO_ONLY
+    if requested in AVATAR_PROFILES:
+        candidates.append(requested)
+
+    width = hints.get("viewport_width")
+    height = hints.get("viewport_height")
+    if width and height:
+        dpr = hints.get("device_pixel_ratio") or 1.0
+        candidates.append(_profile_for_viewport(width * dpr, height * dpr))
+
+    downlink = hints.get("downlink_mbps")
+    if downlink:
+        fitting = _profile_for_bandwidth(downlink)
+        if fitting is None:
+            return AUDIO_ONLY
+        candidates.append(fitting)
+
+    if hints.get("save_data"):
+        candidates.append(list(AVATAR_PROFILES)[0])
+    return _cheapest(*candidates)
@@ -0,0 +1,236 @@
+"""
+Record and replay Voice Live sessions.
+
+With VOICE_LIVE_CAPTURE_DIR set, every session writes ``<session_id>.jsonl.gz``:
+one line per event with the seconds since the session started (``t``), the
+direction (``in`` from Voice Live, ``out`` to Voice Live, ``down`` to browsers,
+``tool`` for raw tool results) and the event itself (``e``). Upstream messages
+that are not JSON objects are kept as a string in ``raw`` instead of ``e`` (base64
+in ``raw_b64`` for binary ones), so one bad message never breaks the file.
+
+Replaying feeds the recorded upstream events through ``_receive_loop`` and the
+browser fan-out at real or accelerated speed, without any network:
+
+    python -m app.capture replay captures/<session_id>.jsonl.gz --speed 10
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import base64
+import gzip
+import json
+import logging
+import os
+import sys
+import time
+from collections import defaultdict, deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+
+class SessionRecorder:
+    """Append the timestamped event stream of one session to a gzip JSON-lines file."""
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.path = path
+        self._file = gzip.open(path, "at", encoding="utf-8")
+        self._started = time.monotonic()
+
+    def _write(self, direction: str, encoded_event: str, key: str = "e") -> None:
+        elapsed = time.monotonic() - self._started
+        self._file.write(f'{{"t":{elapsed:.4f},"d":"{direction}","{key}":{encoded_event}}}\n')
+
+    def record_raw(self, direction: str, message: Union[str, bytes]) -> None:
+        """Record a message the caller has parsed as a JSON object, without re-serializing it."""
+        if isinstance(message, bytes):
+            try:
+                message = message.decode("utf-8")
+            except UnicodeDecodeError:
+                # JSON in UTF-16/32: keep the bytes as they came
+                self.record_undecodable(direction, message)
+                return
+        self._write(direction, message)
+
+    def record_undecodable(self, direction: str, message: Union[str, bytes]) -> None:
+        """Record a message that is not a JSON object, wrapped so the line stays valid JSON."""
+        if isinstance(message, bytes):
+            self._write(direction, json.dumps(base64.b64encode(message).decode("ascii")), key="raw_b64")
+        else:
+            self._write(direction, json.dumps(message, ensure_ascii=False), key="raw")
+
+    def record(self, direction: str, event: Union[Dict[str, Any], bytes]) -> None:
+        if isinstance(event, bytes):
+            event = {"binary": base64.b64encode(event).decode("ascii")}
+        self._write(direction, json.dumps(event, separators=(",", ":"), ensure_ascii=False))
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def recorder_for(session_id: str) -> Optional[SessionRecorder]:
+    """A recorder for ``session_id`` when VOICE_LIVE_CAPTURE_DIR is set."""
+    directory = os.getenv("VOICE_LIVE_CAPTURE_DIR")
+    if not directory:
+        return None
+    try:
+        return SessionRecorder(Path(directory) / f"{session_id}.jsonl.gz")
+    except OSError:
+        logger.exception("Could not open capture file for session %s", session_id)
+        return None
+
+
+def load_capture(path: Path) -> List[Dict[str, Any]]:
+    with gzip.open(path, "rt", encoding="utf-8") as handle:
+        return [json.loads(line) for line in handle if line.strip()]
+
+
+def _replayed_message(entry: Dict[str, Any]) -> Union[str, bytes]:
+    if "raw_b64" in entry:
+        return base64.b64decode(entry["raw_b64"])
+    if "raw" in entry:
+        return entry["raw"]
+    return json.dumps(entry["e"])
+
+
+class ReplaySocket:
+    """Stands in for the upstream websocket, yielding recorded events on their original schedule."""
+
+    def __init__(self, entries: List[Dict[str, Any]], speed: float = 1.0):
+        self._messages = [(entry["t"], _replayed_message(entry)) for entry in entries if entry["d"] == "in"]
+        self._speed = speed
+        self.open = True
+        self.close_code: Optional[int] = None
+        self.sent: List[str] = []
+        self.exhausted = asyncio.Event()
+        self._closed = asyncio.Event()
+
+    async def __aiter__(self):
+        started = time.monotonic()
+        for offset, event in self._messages:
+            delay = offset / self._speed - (time.monotonic() - started)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            yield event
+        self.exhausted.set()
+        # Stay open until the replayer has let tool calls finish, like the real socket would
+        await self._closed.wait()
+
+    async def send(self, message: str) -> None:
+        self.sent.append(message)
+
+    async def close(self) -> None:
+        self.open = False
+        self.close_code = 1000
+        self._closed.set()
+
+
+class ReplayToolRuntime:
+    """Returns recorded tool results, in order per tool, after their recorded duration."""
+
+    def __init__(self, entries: List[Dict[str, Any]], speed: float = 1.0):
+        self._results: Dict[str, Deque[Dict[str, Any]]] = defaultdict(deque)
+        for entry in entries:
+            if entry["d"] == "tool":
+                self._results[entry["e"]["name"]].append(entry["e"])
+        self._speed = speed
+
+    def __contains__(self, name: str) -> bool:
+        return True
+
+    async def invoke(self, name: str, arguments: Dict[str, Any]) -> Any:
+        from .tool_runtime import ToolUnavailable
+
+        recorded = self._results.get(name)
+        if not recorded:
+            raise ToolUnavailable(name, "replay", f"No recorded result for {name}")
+        entry = recorded.popleft()
+        await asyncio.sleep(entry.get("ms", 0) / 1000 / self._speed)
+        return entry["result"]
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: {"remaining": len(results)} for name, results in self._results.items()}
+
+    def shutdown(self) -> None:
+        pass
+
+
+async def replay(path: Path, speed: float = 1.0) -> Dict[str, Any]:
+    """Replay a capture through a fresh session and report what the fan-out produced."""
+    from .event_log import TOPICS
+    from .voice_live_client import VoiceLiveSession
+
+    entries = load_capture(path)
+    session = VoiceLiveSession(f"replay-{path.name.split('.')[0]}")
+    if session._recorder is not None:  # pylint: disable=protected-access
+        # Don't capture the replay itself
+        session._recorder.close()  # pylint: disable=protected-access
+        session._recorder.path.unlink(missing_ok=True)  # pylint: disable=protected-access
+        session._recorder = None  # pylint: disable=protected-access
+    session._tools = ReplayToolRuntime(entries, speed)  # pylint: disable=protected-access
+    socket = ReplaySocket(entries, speed)
+    session.ws = socket  # type: ignore[assignment]
+    session._connected_event.set()  # pylint: disable=protected-access
+    subscription = session.subscribe(topics=TOPICS)
+
+    downstream = {"events": 0, "bytes": 0}
+
+    def count(batch: List[Union[str, bytes]]) -> None:
+        for payload in batch:
+            downstream["events"] += 1
+            downstream["bytes"] += len(payload if isinstance(payload, bytes) else payload.encode("utf-8"))
+
+    async def drain() -> None:
+        while True:
+            count(await subscription.next_batch())
+
+    drain_task = asyncio.create_task(drain())
+    wall_started, cpu_started = time.perf_counter(), time.process_time()
+    receive_task = asyncio.create_task(session._receive_loop())  # pylint: disable=protected-access
+    await socket.exhausted.wait()
+    tool_tasks = list(session._tool_tasks)  # pylint: disable=protected-access
+    if tool_tasks:
+        await asyncio.gather(*tool_tasks, return_exceptions=True)
+    await socket.close()
+    await receive_task
+    drain_task.cancel()
+    # Whatever the receive loop logged after the drain task's last batch is there to read without waiting
+    while subscription.cursor < session.last_event_seq:
+        count(await subscription.next_batch())
+    wall, cpu = time.perf_counter() - wall_started, time.process_time() - cpu_started
+
+    recorded = defaultdict(int)
+    for entry in entries:
+        recorded[entry["d"]] += 1
+    return {
+        "capture": str(path),
+        "speed": speed,
+        "recorded_duration_s": round(entries[-1]["t"], 3) if entries else 0.0,
+        "replay_wall_s": round(wall, 3),
+        "replay_cpu_s": round(cpu, 3),
+        "upstream_in": recorded["in"],
+        "upstream_out": {"recorded": recorded["out"], "replayed": len(socket.sent)},
+        "downstream": {"recorded": recorded["down"], "replayed": downstream["events"], "bytes": downstream["bytes"]},
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    replay_cmd = commands.add_parser("replay", help="replay a capture without network access")
+    replay_cmd.add_argument("capture", type=Path)
+    replay_cmd.add_argument("--speed", type=float, default=1.0, help="time compression factor (default real time)")
+    args = parser.parse_args(argv)
+
+    # Replays never connect, but the session constructor insists on a configured endpoint
+    os.environ.setdefault("AZURE_VOICE_LIVE_ENDPOINT", "https://replay.invalid")
+    os.environ.setdefault("VOICE_LIVE_MODEL", "replay")
+    print(json.dumps(asyncio.run(replay(args.capture, args.speed)), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
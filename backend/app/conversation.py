@@ -0,0 +1,253 @@
+from __future__ import annotations
+
+import logging
+import os
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from .text_utils import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Rough audio token rates of the realtime models: 1 token per 100 ms of user audio, per 50 ms of assistant audio
+USER_AUDIO_TOKENS_PER_SECOND = 10
+ASSISTANT_AUDIO_TOKENS_PER_SECOND = 20
+SUMMARY_HEADER = "Summary of the earlier conversation (older turns were removed to save context):"
+_SUMMARY_LINE_CHARS = 160
+
+
+class ConversationItem:
+    """What the window knows about one upstream conversation item."""
+
+    __slots__ = ("item_id", "kind", "role", "call_id", "name", "text", "audio_ms", "pending_delete")
+
+    def __init__(self, item_id: str, kind: str):
+        self.item_id = item_id
+        self.kind = kind
+        self.role: Optional[str] = None
+        self.call_id: Optional[str] = None
+        self.name: Optional[str] = None
+        self.text = ""
+        self.audio_ms = 0.0
+        self.pending_delete = False
+
+    @property
+    def tokens(self) -> int:
+        rate = USER_AUDIO_TOKENS_PER_SECOND if self.role == "user" else ASSISTANT_AUDIO_TOKENS_PER_SECOND
+        return estimate_tokens(self.text) + int(self.audio_ms / 1000 * rate) + 4
+
+    def summary_line(self) -> Optional[str]:
+        if self.kind == "function_call":
+            return f"- Tool {self.name} was called with {self.text[:_SUMMARY_LINE_CHARS]}"
+        if self.kind != "message" or not self.text or self.item_id.startswith("summary_"):
+            return None
+        text = " ".join(self.text.split())
+        if len(text) > _SUMMARY_LINE_CHARS:
+            text = text[:_SUMMARY_LINE_CHARS] + "…"
+        return f"- {(self.role or 'assistant').capitalize()}: {text}"
+
+
+class ConversationWindow:
+    """Mirror of the upstream conversation, sized from events, that decides what to prune.
+
+    Pruning starts once the items exceed ``budget`` tokens and goes down to ``low_water``
+    of it, so it happens every few turns rather than on every one (each prune invalidates
+    the upstream prompt cache). The last ``keep_turns`` user turns are never touched; older
+    tool call/output pairs go first, then the earliest turns. Removed turns can be folded
+    into a short summary message at the start of the conversation.
+    """
+
+    def __init__(self, budget: int, keep_turns: int = 4, summary_tokens: int = 300, low_water: float = 0.75):
+        self.budget = budget
+        self.keep_turns = keep_turns
+        self.summary_tokens = summary_tokens
+        self.low_water = low_water
+        self._items: "OrderedDict[str, ConversationItem]" = OrderedDict()
+        self._user_audio_start: Dict[str, float] = {}
+        self._audio_ms: Dict[str, float] = {}
+        self._summary_lines: List[str] = []
+        self.last_input_tokens: Optional[int] = None
+        self.pruned_items = 0
+        self.prunes = 0
+
+    @classmethod
+    def from_env(cls) -> Optional["ConversationWindow"]:
+        """A window sized by CONVERSATION_TOKEN_BUDGET, or None when it is 0."""
+        budget = int(os.getenv("CONVERSATION_TOKEN_BUDGET", "8000"))
+        if budget <= 0:
+            return None
+        return cls(
+            budget,
+            keep_turns=int(os.getenv("CONVERSATION_KEEP_TURNS", "4")),
+            summary_tokens=int(os.getenv("CONVERSATION_SUMMARY_TOKENS", "300")),
+        )
+
+    @property
+    def tokens(self) -> int:
+        return sum(item.tokens for item in self._items.values() if not item.pending_delete)
+
+    def observe(self, event: Dict[str, Any]) -> None:
+        """Update the mirror from one upstream event; unrelated events are ignored."""
+        event_type = event.get("type")
+        if event_type == "conversation.item.created":
+            self._on_item(event.get("item") or {}, event.get("previous_item_id"))
+        elif event_type == "response.output_item.done":
+            self._on_item(event.get("item") or {})
+        elif event_type == "conversation.item.deleted":
+            self._items.pop(event.get("item_id"), None)
+        elif event_type == "conversation.item.input_audio_transcription.completed":
+            self._set_text(event.get("item_id"), event.get("transcript"))
+        elif event_type in ("response.audio_transcript.done", "response.text.done"):
+            self._set_text(event.get("item_id"), event.get("transcript") or event.get("text"))
+        elif event_type == "input_audio_buffer.speech_started":
+            self._user_audio_start[event.get("item_id")] = event.get("audio_start_ms") or 0
+        elif event_type == "input_audio_buffer.speech_stopped":
+            item_id = event.get("item_id")
+            started = self._user_audio_start.pop(item_id, None)
+            if started is not None and event.get("audio_end_ms") is not None:
+                self._set_audio_ms(item_id, event["audio_end_ms"] - started)
+        elif event_type == "conversation.item.truncated":
+            item = self._items.get(event.get("item_id"))
+            if item is not None and event.get("audio_end_ms") is not None:
+                item.audio_ms = float(event["audio_end_ms"])
+        elif event_type == "response.done":
+            usage = (event.get("response") or {}).get("usage") or {}
+            if isinstance(usage.get("input_tokens"), int):
+                self.last_input_tokens = usage["input_tokens"]
+
+    def add_assistant_audio(self, item_id: Optional[str], ms: float) -> None:
+        item = self._items.get(item_id) if item_id else None
+        if item is not None:
+            item.audio_ms += ms
+
+    def _set_text(self, item_id: Optional[str], text: Optional[str]) -> None:
+        item = self._items.get(item_id) if item_id else None
+        if item is not None and text:
+            item.text = text
+
+    def _set_audio_ms(self, item_id: Optional[str], ms: float) -> None:
+        item = self._items.get(item_id) if item_id else None
+        if item is not None:
+            item.audio_ms = ms
+        elif item_id:
+            # speech_stopped can arrive before the user item is created
+            self._audio_ms[item_id] = ms
+
+    def _on_item(self, raw: Dict[str, Any], previous_item_id: Optional[str] = None) -> None:
+        item_id = raw.get("id")
+        if not item_id:
+            return
+        item = self._items.get(item_id)
+        if item is None:
+            item = ConversationItem(item_id, raw.get("type") or "message")
+            item.audio_ms = self._audio_ms.pop(item_id, 0.0)
+            self._insert(item, previous_item_id)
+        item.role = raw.get("role") or item.role
+        item.call_id = raw.get("call_id") or item.call_id
+        item.name = raw.get("name") or item.name
+        if item.kind == "function_call":
+            item.text = raw.get("arguments") or item.text
+        elif item.kind == "function_call_output":
+            item.text = raw.get("output") or item.text
+        else:
+            parts = [
+                part.get("text") or part.get("transcript") or ""
+                for part in raw.get("content") or []
+                if isinstance(part, dict)
+            ]
+            item.text = "".join(parts) or item.text
+
+    def _insert(self, item: ConversationItem, previous_item_id: Optional[str]) -> None:
+        last_id = next(reversed(self._items), None)
+        self._items[item.item_id] = item
+        if previous_item_id == "root" or (previous_item_id is None and item.item_id.startswith("summary_")):
+            self._items.move_to_end(item.item_id, last=False)
+        elif previous_item_id in self._items and previous_item_id != last_id:
+            # Inserted mid-conversation: rebuild the order (rare, and the window is small)
+            ordered = [key for key in self._items if key != item.item_id]
+            ordered.insert(ordered.index(previous_item_id) + 1, item.item_id)
+            for key in ordered:
+                self._items.move_to_end(key)
+
+    def _protected_ids(self) -> set:
+        """Items from the ``keep_turns``-th most recent user message onwards."""
+        items = list(self._items.values())
+        user_turns = 0
+        for index in range(len(items) - 1, -1, -1):
+            if items[index].kind == "message" and items[index].role == "user":
+                user_turns += 1
+                if user_turns >= self.keep_turns:
+                    return {item.item_id for item in items[index:]}
+        return {item.item_id for item in items}
+
+    def plan_prune(self) -> Tuple[List[str], Optional[Dict[str, Any]]]:
+        """Item ids to delete and an optional summary item to create first; empty when within budget."""
+        used = self.tokens
+        if used <= self.budget:
+            return [], None
+        target = int(self.budget * self.low_water)
+        protected = self._protected_ids()
+        candidates = [
+            item
+            for item in self._items.values()
+            if item.item_id not in protected and not item.pending_delete and not item.item_id.startswith("summary_")
+        ]
+        by_call = {item.call_id: item for item in candidates if item.kind == "function_call" and item.call_id}
+        chosen: List[ConversationItem] = []
+        # Old tool results first (with their calls, so no call is left without an output), then whole turns
+        for item in candidates:
+            if used <= target:
+                break
+            if item.kind == "function_call_output":
+                for victim in (by_call.get(item.call_id), item):
+                    if victim is not None and victim not in chosen:
+                        chosen.append(victim)
+                        used -= victim.tokens
+        for item in candidates:
+            if used <= target:
+                break
+            if item not in chosen:
+                chosen.append(item)
+                used -= item.tokens
+        if not chosen:
+            return [], None
+        for item in chosen:
+            item.pending_delete = True
+        self.prunes += 1
+        self.pruned_items += len(chosen)
+        order = list(self._items)
+        chosen.sort(key=lambda item: order.index(item.item_id))
+        deletions = [item.item_id for item in chosen]
+        return deletions, self._summary_item(chosen, deletions)
+
+    def _summary_item(self, removed: List[ConversationItem], deletions: List[str]) -> Optional[Dict[str, Any]]:
+        if self.summary_tokens <= 0:
+            return None
+        lines = self._summary_lines + [line for line in (item.summary_line() for item in removed) if line]
+        if lines == self._summary_lines:
+            return None
+        # Oldest lines give way first when the summary outgrows its budget
+        while len(lines) > 1 and estimate_tokens("\n".join(lines)) > self.summary_tokens:
+            lines.pop(0)
+        self._summary_lines = lines
+        for item in self._items.values():
+            if item.item_id.startswith("summary_") and not item.pending_delete:
+                item.pending_delete = True
+                deletions.append(item.item_id)
+        return {
+            "id": f"summary_{uuid.uuid4().hex[:16]}",
+            "type": "message",
+            "role": "system",
+            "content": [{"type": "input_text", "text": "\n".join([SUMMARY_HEADER, *lines])}],
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "items": len(self._items),
+            "estimated_tokens": self.tokens,
+            "budget": self.budget,
+            "last_input_tokens": self.last_input_tokens,
+            "prunes": self.prunes,
+            "pruned_items": self.pruned_items,
+        }
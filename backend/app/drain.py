@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import signal
+import threading
+import time
+from types import FrameType
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .session_manager import SessionManager
+
+logger = logging.getLogger(__name__)
+
+# A client that dropped off may be reconnecting with ?last_seq=; give it this long before its session goes
+_ORPHAN_GRACE_SECONDS = 5.0
+_POLL_SECONDS = 1.0
+
+
+class DrainController:
+    """Takes the process out of rotation and winds its sessions down ahead of a shutdown.
+
+    While draining, new sessions are refused and readiness fails, so the ingress
+    sends new clients elsewhere. Each live session asks its client to migrate at
+    the next pause in the conversation; sessions whose client has gone are
+    removed, and whatever is left at DRAIN_TIMEOUT_SECONDS is closed.
+    """
+
+    def __init__(self, sessions: SessionManager, remove: Callable[[str], Awaitable[None]]):
+        self._sessions = sessions
+        self._remove = remove
+        self._task: Optional[asyncio.Task] = None
+        self._started_at: Optional[float] = None
+        self._deadline: Optional[float] = None
+
+    @property
+    def draining(self) -> bool:
+        return self._task is not None
+
+    def start(self, reason: str) -> asyncio.Task:
+        """Begin draining (once); the returned task finishes when no sessions are left."""
+        if self._task is None:
+            timeout = float(os.getenv("DRAIN_TIMEOUT_SECONDS", "120"))
+            self._started_at = time.monotonic()
+            self._deadline = self._started_at + timeout
+            logger.warning("Draining (%s): no new sessions, closing existing ones within %.0f s", reason, timeout)
+            self._task = asyncio.create_task(self._run())
+        return self._task
+
+    async def wait(self) -> None:
+        if self._task is not None:
+            await asyncio.shield(self._task)
+
+    async def _run(self) -> None:
+        jitter = float(os.getenv("DRAIN_MIGRATE_JITTER_SECONDS", "10"))
+        orphaned_since: Dict[str, float] = {}
+        asked = set()
+        while True:
+            session_ids = await self._sessions.list_session_ids()
+            now = time.monotonic()
+            if not session_ids or now >= self._deadline:  # type: ignore[operator]
+                break
+            for session_id in session_ids:
+                try:
+                    session = await self._sessions.get_session(session_id)
+                except KeyError:
+                    continue
+                if session_id not in asked:
+                    asked.add(session_id)
+                    session.request_migration(jitter)
+                if session.subscriber_count:
+                    orphaned_since.pop(session_id, None)
+                elif now - orphaned_since.setdefault(session_id, now) >= _ORPHAN_GRACE_SECONDS:
+                    await self._remove(session_id)
+            await asyncio.sleep(_POLL_SECONDS)
+        remaining = await self._sessions.list_session_ids()
+        if remaining:
+            logger.warning("Drain deadline reached, closing %d sessions", len(remaining))
+            await asyncio.gather(*(self._remove(session_id) for session_id in remaining))
+        logger.info("Drain complete after %.1f s", time.monotonic() - self._started_at)  # type: ignore[operator]
+
+    async def status(self) -> Dict[str, Any]:
+        session_ids = await self._sessions.list_session_ids()
+        status: Dict[str, Any] = {"draining": self.draining, "sessions": len(session_ids)}
+        if self.draining:
+            now = time.monotonic()
+            status["elapsed_s"] = round(now - self._started_at, 1)  # type: ignore[operator]
+            status["remaining_s"] = round(max(0.0, self._deadline - now), 1)  # type: ignore[operator]
+            status["done"] = self._task.done()  # type: ignore[union-attr]
+        return status
+
+    def install_sigterm_handler(self) -> None:
+        """Drain on SIGTERM before handing the signal to the server's own handler.
+
+        Call from the event loop in the main thread after the server has installed its
+        handlers (i.e. in lifespan startup). A second SIGTERM skips the rest of the drain.
+        """
+        if threading.current_thread() is not threading.main_thread():
+            return
+        loop = asyncio.get_running_loop()
+        previous = signal.getsignal(signal.SIGTERM)
+
+        def forward(frame: Optional[FrameType]) -> None:
+            if callable(previous):
+                previous(signal.SIGTERM, frame)
+            else:
+                signal.signal(signal.SIGTERM, previous)
+                signal.raise_signal(signal.SIGTERM)
+
+        received = False
+
+        def on_sigterm(signum: int, frame: Optional[FrameType]) -> None:  # pylint: disable=unused-argument
+            nonlocal received
+            if received:
+                forward(frame)
+                return
+            received = True
+
+            def begin() -> None:
+                self.start("SIGTERM").add_done_callback(lambda _: forward(None))
+
+            loop.call_soon_threadsafe(begin)
+
+        signal.signal(signal.SIGTERM, on_sigterm)
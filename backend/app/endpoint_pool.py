@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+# Probe coroutine: given an endpoint URL, complete one round trip or raise
+Probe = Callable[[str], Awaitable[None]]
+
+
+def websocket_base(endpoint: str) -> str:
+    endpoint = endpoint.rstrip("/")
+    if endpoint.startswith("https://"):
+        return "wss://" + endpoint[len("https://") :]
+    if endpoint.startswith("http://"):
+        return "ws://" + endpoint[len("http://") :]
+    return endpoint
+
+
+async def tcp_connect_probe(endpoint: str) -> None:
+    """One TCP connect to the endpoint: the network round trip, without TLS or HTTP."""
+    parts = urlsplit(websocket_base(endpoint))
+    port = parts.port or (443 if parts.scheme == "wss" else 80)
+    _, writer = await asyncio.open_connection(parts.hostname, port)
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+
+
+def handshake_status(exc: BaseException) -> Optional[int]:
+    """HTTP status of a refused websocket handshake, or None when there was no HTTP answer."""
+    # websockets >= 14 keeps the response on the exception, older versions the bare status
+    status = getattr(getattr(exc, "response", None), "status_code", None) or getattr(exc, "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+async def websocket_handshake_probe(endpoint: str) -> None:
+    """Open a websocket to the realtime path without credentials.
+
+    A 4xx refusal still measures what a session pays to connect (TCP, TLS and the
+    HTTP upgrade); only 5xx answers and network errors count as failures.
+    """
+    import websockets  # type: ignore[import]
+    from websockets.exceptions import InvalidHandshake  # type: ignore[import]
+
+    try:
+        async with websockets.connect(f"{websocket_base(endpoint)}/voice-live/realtime", close_timeout=1):
+            pass
+    except InvalidHandshake as exc:
+        status = handshake_status(exc)
+        if status is None or status >= 500:
+            raise
+
+
+class EndpointState:
+    """Health and latency of one Voice Live endpoint."""
+
+    def __init__(self, url: str, api_key: Optional[str] = None):
+        self.url = url
+        self.api_key = api_key
+        self.rtt_ms: Optional[float] = None
+        self.handshake_ms: Optional[float] = None
+        self.failures = 0
+        self.ejected_until = 0.0
+        self.ejections = 0
+        self.connects = 0
+        self.last_error: Optional[str] = None
+
+    def ejected(self, now: float) -> bool:
+        return now < self.ejected_until
+
+    def stats(self, now: float) -> Dict[str, Any]:
+        return {
+            "rtt_ms": None if self.rtt_ms is None else round(self.rtt_ms, 1),
+            "handshake_ms": None if self.handshake_ms is None else round(self.handshake_ms, 1),
+            "failures": self.failures,
+            "ejected_for_s": round(max(0.0, self.ejected_until - now), 1),
+            "ejections": self.ejections,
+            "connects": self.connects,
+            "last_error": self.last_error,
+        }
+
+
+def _ewma(previous: Optional[float], sample: float, alpha: float) -> float:
+    return sample if previous is None else previous + alpha * (sample - previous)
+
+
+class EndpointPool:
+    """Ranks Voice Live endpoints by probed handshake time and ejects failing ones for a cool-down.
+
+    With more than one endpoint, a background task probes each endpoint every
+    ``probe_interval`` seconds: a TCP connect (network RTT) and a websocket handshake
+    (what a new session pays). Both are smoothed with an EWMA. ``eject_after``
+    consecutive failures, from probes or from session connects, take an endpoint out
+    of rotation for ``cooldown`` seconds.
+    """
+
+    def __init__(
+        self,
+        endpoints: List[EndpointState],
+        probe_interval: float = 15.0,
+        probe_timeout: float = 5.0,
+        eject_after: int = 2,
+        cooldown: float = 60.0,
+        alpha: float = 0.3,
+        rtt_probe: Probe = tcp_connect_probe,
+        handshake_probe: Probe = websocket_handshake_probe,
+    ):
+        if not endpoints:
+            raise ValueError("EndpointPool needs at least one endpoint")
+        self.endpoints = endpoints
+        self.probe_interval = probe_interval
+        self.probe_timeout = probe_timeout
+        self.eject_after = eject_after
+        self.cooldown = cooldown
+        self.alpha = alpha
+        self._rtt_probe = rtt_probe
+        self._handshake_probe = handshake_probe
+        self._task: Optional[asyncio.Task] = None
+
+    def _rejoin_if_cooled_down(self, state: EndpointState, now: float) -> None:
+        # A fresh start after the cool-down: one more failure must not eject it straight away
+        if state.ejected_until and now >= state.ejected_until:
+            state.ejected_until = 0.0
+            state.failures = 0
+            logger.info("Voice Live endpoint %s is back in rotation", state.url)
+
+    def ranked(self) -> List[EndpointState]:
+        """Endpoints in the order to try: healthy by handshake time (unprobed after probed,
+        in configured order), then ejected ones by the end of their cool-down as a last resort."""
+        now = time.monotonic()
+        for state in self.endpoints:
+            self._rejoin_if_cooled_down(state, now)
+        order = {id(state): index for index, state in enumerate(self.endpoints)}
+        healthy = [state for state in self.endpoints if not state.ejected(now)]
+        ejected = [state for state in self.endpoints if state.ejected(now)]
+        healthy.sort(
+            key=lambda state: (state.handshake_ms is None, state.handshake_ms or 0.0, order[id(state)])
+        )
+        ejected.sort(key=lambda state: state.ejected_until)
+        return healthy + ejected
+
+    def report_success(self, state: EndpointState) -> None:
+        state.failures = 0
+        state.connects += 1
+
+    def report_failure(self, state: EndpointState, error: BaseException) -> None:
+        now = time.monotonic()
+        self._rejoin_if_cooled_down(state, now)
+        state.failures += 1
+        state.last_error = f"{type(error).__name__}: {error}"[:200]
+        if state.failures >= self.eject_after and not state.ejected(now):
+            state.ejected_until = now + self.cooldown
+            state.ejections += 1
+            logger.warning(
+                "Ejecting Voice Live endpoint %s for %.0f s after %d failures (%s)",
+                state.url,
+                self.cooldown,
+                state.failures,
+                state.last_error,
+            )
+
+    async def _timed(self, probe: Probe, url: str) -> float:
+        started = time.perf_counter()
+        await asyncio.wait_for(probe(url), timeout=self.probe_timeout)
+        return (time.perf_counter() - started) * 1000
+
+    async def probe(self, state: EndpointState) -> None:
+        try:
+            rtt_ms = await self._timed(self._rtt_probe, state.url)
+            handshake_ms = await self._timed(self._handshake_probe, state.url)
+        except Exception as exc:  # pylint: disable=broad-except
+            self.report_failure(state, exc)
+            return
+        state.rtt_ms = _ewma(state.rtt_ms, rtt_ms, self.alpha)
+        state.handshake_ms = _ewma(state.handshake_ms, handshake_ms, self.alpha)
+        state.failures = 0
+
+    async def probe_all(self) -> None:
+        await asyncio.gather(*(self.probe(state) for state in self.endpoints))
+
+    async def _probe_loop(self) -> None:
+        while True:
+            await self.probe_all()
+            await asyncio.sleep(self.probe_interval)
+
+    def start(self) -> None:
+        """Start background probing (idempotent); a single endpoint is never probed."""
+        if len(self.endpoints) > 1 and (self._task is None or self._task.done()):
+            self._task = asyncio.create_task(self._probe_loop())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        now = time.monotonic()
+        return {state.url: state.stats(now) for state in self.endpoints}
+
+
+def endpoints_from_env() -> List[EndpointState]:
+    """AZURE_VOICE_LIVE_ENDPOINTS (comma-separated), falling back to AZURE_VOICE_LIVE_ENDPOINT.
+
+    AZURE_OPENAI_API_KEYS may give one key per endpoint, in the same order.
+    """
+    urls = [url.strip() for url in os.getenv("AZURE_VOICE_LIVE_ENDPOINTS", "").split(",") if url.strip()]
+    if not urls and os.getenv("AZURE_VOICE_LIVE_ENDPOINT"):
+        urls = [os.getenv("AZURE_VOICE_LIVE_ENDPOINT", "")]
+    keys = [key.strip() for key in os.getenv("AZURE_OPENAI_API_KEYS", "").split(",")]
+    return [EndpointState(url, keys[index] if index < len(keys) and keys[index] else None) for index, url in enumerate(urls)]
+
+
+_pool: Optional[EndpointPool] = None
+
+
+def get_endpoint_pool() -> Optional[EndpointPool]:
+    """Process-wide pool, created on first use so it sees settings loaded from .env; None if unconfigured."""
+    global _pool  # pylint: disable=global-statement
+    if _pool is None:
+        endpoints = endpoints_from_env()
+        if not endpoints:
+            return None
+        _pool = EndpointPool(
+            endpoints,
+            probe_interval=float(os.getenv("AZURE_VOICE_LIVE_PROBE_INTERVAL_SECONDS", "15")),
+            eject_after=int(os.getenv("AZURE_VOICE_LIVE_EJECT_AFTER", "2")),
+            cooldown=float(os.getenv("AZURE_VOICE_LIVE_EJECT_SECONDS", "60")),
+        )
+    return _pool
+
+
+async def shutdown_endpoint_pool() -> None:
+    global _pool  # pylint: disable=global-statement
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
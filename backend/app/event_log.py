@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple, Union
+
+# Topics a WebSocket subscriber can ask for; events without a topic (errors, gaps) always go out
+TOPICS: FrozenSet[str] = frozenset({"audio", "transcripts", "tools", "session", "animation", "debug"})
+# What a client gets without ``?topics=``: every JSON event, as before topics existed
+DEFAULT_TOPICS: FrozenSet[str] = TOPICS - {"animation"}
+
+# A serialized event: JSON text, or bytes for binary frames
+Payload = Union[str, bytes]
+
+
+def parse_topics(value: Optional[str]) -> FrozenSet[str]:
+    """Parse a comma-separated ``topics`` query value; unknown names are ignored."""
+    if value is None:
+        return DEFAULT_TOPICS
+    return frozenset(name.strip() for name in value.split(",")) & TOPICS
+
+
+class EventLog:
+    """Bounded ring of sequence-numbered events shared by every subscriber of a session.
+
+    Appending is O(1) regardless of the number of subscribers; each subscriber
+    only keeps a cursor (the last sequence number it has seen). Events are
+    serialized once, on append.
+    """
+
+    def __init__(self, capacity: int = 512):
+        self._capacity = max(1, capacity)
+        self._ring: List[Optional[Tuple[Optional[str], Payload]]] = [None] * self._capacity
+        self._next_seq = 1
+        self._waiter: Optional[asyncio.Future] = None
+
+    @property
+    def last_seq(self) -> int:
+        return self._next_seq - 1
+
+    def append(self, event: Union[Dict[str, Any], bytes], topic: Optional[str] = None) -> int:
+        seq = self._next_seq
+        if isinstance(event, dict):
+            event["seq"] = seq
+            payload: Payload = json.dumps(event, separators=(",", ":"), ensure_ascii=False)
+        else:
+            payload = event
+        self._ring[seq % self._capacity] = (topic, payload)
+        self._next_seq += 1
+        waiter, self._waiter = self._waiter, None
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+        return seq
+
+    def read_after(self, cursor: int) -> tuple[List[Tuple[Optional[str], Payload]], int]:
+        """Return the retained events after ``cursor`` and how many were already evicted."""
+        oldest = max(1, self._next_seq - self._capacity)
+        start = max(cursor + 1, oldest)
+        events = [self._ring[seq % self._capacity] for seq in range(start, self._next_seq)]
+        return events, start - (cursor + 1)  # type: ignore[return-value]
+
+    async def wait_after(self, cursor: int) -> None:
+        """Wait until an event newer than ``cursor`` has been appended."""
+        if self.last_seq > cursor:
+            return
+        if self._waiter is None:
+            self._waiter = asyncio.get_running_loop().create_future()
+        # Shielded: a cancelled subscriber must not cancel the future the others share
+        await asyncio.shield(self._waiter)
+
+    def subscribe(
+        self, after_seq: Optional[int] = None, topics: FrozenSet[str] = DEFAULT_TOPICS
+    ) -> "EventSubscription":
+        """Follow the log from ``after_seq`` (replaying what is retained) or from now."""
+        cursor = self.last_seq if after_seq is None else min(max(0, after_seq), self.last_seq)
+        return EventSubscription(self, cursor, topics, replay_until=self.last_seq)
+
+
+class EventSubscription:
+    """Cursor into an :class:`EventLog`, filtered to a set of topics.
+
+    Binary frames carry no sequence number, so a client cannot tell which ones it
+    already has; they are left out of the replay up to ``replay_until`` (stale
+    animation is useless after a reconnect anyway).
+    """
+
+    def __init__(
+        self, log: EventLog, cursor: int, topics: FrozenSet[str] = DEFAULT_TOPICS, replay_until: int = 0
+    ):
+        self._log = log
+        self.cursor = cursor
+        self.topics = topics
+        self._replay_until = replay_until
+
+    async def next_batch(self) -> List[Payload]:
+        """Wait for and return every wanted event after the cursor, reporting evicted ones as a gap."""
+        await self._log.wait_after(self.cursor)
+        events, lost = self._log.read_after(self.cursor)
+        first_seq = self.cursor + 1 + lost
+        self.cursor = self._log.last_seq
+        batch = [
+            payload
+            for seq, (topic, payload) in enumerate(events, first_seq)
+            if (topic is None or topic in self.topics)
+            and not (isinstance(payload, bytes) and seq <= self._replay_until)
+        ]
+        if lost:
+            return [json.dumps({"type": "events_lost", "count": lost}), *batch]
+        return batch
@@ -0,0 +1,199 @@
+"""Local BM25 mirror of the knowledge-base search index.
+
+Build it from an exported snapshot of the Azure AI Search index::
+
+    python -m app.local_index export snapshot.jsonl
+    python -m app.local_index build snapshot.jsonl ./local_index
+
+and point ``LOCAL_INDEX_DIR`` at the output directory.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import math
+import os
+import sys
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+import numpy as np
+
+from .text_utils import tokenize
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+BM25_K1 = 1.2
+BM25_B = 0.75
+POSTING_DTYPE = np.dtype([("doc", "<u4"), ("tf", "<u4")])
+# Confidence weight of query terms the index has never seen. Mostly these are
+# bigrams spanning particles ("の期", "を教"), so they count for little.
+UNSEEN_TERM_WEIGHT = 0.5
+
+
+class LocalHit(NamedTuple):
+    document: Dict[str, Any]
+    score: float
+    confidence: float
+
+
+class LocalIndex:
+    """Read-only inverted index with memory-mapped postings and BM25 scoring."""
+
+    def __init__(self, directory: Path | str):
+        directory = Path(directory)
+        meta = json.loads((directory / "meta.json").read_text(encoding="utf-8"))
+        if meta.get("version") != INDEX_VERSION:
+            raise RuntimeError(f"Unsupported local index version {meta.get('version')} in {directory}")
+        self._doc_count: int = meta["doc_count"]
+        self._avg_doc_len: float = meta["avg_doc_len"] or 1.0
+        self._terms: Dict[str, List[int]] = json.loads((directory / "terms.json").read_text(encoding="utf-8"))
+        self._postings = np.load(directory / "postings.npy", mmap_mode="r")
+        self._doc_lengths = np.load(directory / "doc_lengths.npy", mmap_mode="r")
+        with (directory / "documents.jsonl").open(encoding="utf-8") as handle:
+            self._documents = [json.loads(line) for line in handle]
+
+    @staticmethod
+    def build(documents: Iterable[Dict[str, Any]], directory: Path | str) -> int:
+        """Write an index for ``documents`` (dicts with a ``content`` field) and return its size."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        postings_by_term: Dict[str, List[tuple]] = {}
+        doc_lengths: List[int] = []
+        with (directory / "documents.jsonl").open("w", encoding="utf-8") as handle:
+            for doc_id, document in enumerate(documents):
+                terms = tokenize(document.get("content") or "")
+                doc_lengths.append(len(terms))
+                for term, tf in Counter(terms).items():
+                    postings_by_term.setdefault(term, []).append((doc_id, tf))
+                handle.write(json.dumps(document, ensure_ascii=False) + "\n")
+
+        term_table: Dict[str, List[int]] = {}
+        postings = np.empty(sum(len(p) for p in postings_by_term.values()), dtype=POSTING_DTYPE)
+        offset = 0
+        for term in sorted(postings_by_term):
+            entries = postings_by_term[term]
+            postings[offset : offset + len(entries)] = entries
+            term_table[term] = [offset, len(entries)]
+            offset += len(entries)
+
+        np.save(directory / "postings.npy", postings)
+        np.save(directory / "doc_lengths.npy", np.asarray(doc_lengths, dtype="<u4"))
+        (directory / "terms.json").write_text(json.dumps(term_table, ensure_ascii=False), encoding="utf-8")
+        meta = {
+            "version": INDEX_VERSION,
+            "doc_count": len(doc_lengths),
+            "avg_doc_len": (sum(doc_lengths) / len(doc_lengths)) if doc_lengths else 0.0,
+        }
+        (directory / "meta.json").write_text(json.dumps(meta), encoding="utf-8")
+        return len(doc_lengths)
+
+    def _idf(self, doc_freq: int) -> float:
+        return math.log(1 + (self._doc_count - doc_freq + 0.5) / (doc_freq + 0.5))
+
+    def search(self, query: str, top: int = 2) -> List[LocalHit]:
+        """Return the best ``top`` documents; confidence is the idf-weighted share of query terms matched."""
+        query_terms = set(tokenize(query))
+        if not query_terms or not self._doc_count:
+            return []
+        scores = np.zeros(self._doc_count, dtype=np.float64)
+        matched_weight = np.zeros(self._doc_count, dtype=np.float64)
+        total_weight = 0.0
+        length_norm = BM25_K1 * (1 - BM25_B + BM25_B * self._doc_lengths / self._avg_doc_len)
+        for term in query_terms:
+            entry = self._terms.get(term)
+            if entry is None:
+                total_weight += UNSEEN_TERM_WEIGHT
+                continue
+            offset, doc_freq = entry
+            idf = self._idf(doc_freq)
+            total_weight += idf
+            postings = self._postings[offset : offset + doc_freq]
+            docs = postings["doc"]
+            tf = postings["tf"].astype(np.float64)
+            scores[docs] += idf * tf * (BM25_K1 + 1) / (tf + length_norm[docs])
+            matched_weight[docs] += idf
+        ranked = np.argsort(-scores)[:top]
+        return [
+            LocalHit(self._documents[doc], float(scores[doc]), float(matched_weight[doc] / total_weight))
+            for doc in ranked
+            if scores[doc] > 0
+        ]
+
+
+_index_lock = threading.Lock()
+_index_cache: Dict[str, LocalIndex] = {}
+
+
+def get_local_index() -> Optional[LocalIndex]:
+    """Load the index configured by LOCAL_INDEX_DIR once, or return None when it is not configured."""
+    directory = os.getenv("LOCAL_INDEX_DIR")
+    if not directory:
+        return None
+    with _index_lock:
+        if directory not in _index_cache:
+            try:
+                _index_cache[directory] = LocalIndex(directory)
+                logger.info("Loaded local knowledge index from %s", directory)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Failed to load local knowledge index from %s", directory)
+                return None
+        return _index_cache[directory]
+
+
+def _read_snapshot(path: Path) -> List[Dict[str, Any]]:
+    text = path.read_text(encoding="utf-8")
+    if text.lstrip().startswith("["):
+        return json.loads(text)
+    return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+
+def _export_snapshot(path: Path) -> int:
+    from azure.core.credentials import AzureKeyCredential
+    from azure.search.documents import SearchClient
+
+    client = SearchClient(
+        endpoint=os.environ["ai_search_url"],
+        index_name=os.environ["ai_index_name"],
+        credential=AzureKeyCredential(os.environ["ai_search_key"]),
+    )
+    count = 0
+    with path.open("w", encoding="utf-8") as handle:
+        for result in client.search(search_text="*", select=["content", "metadata_storage_name"]):
+            document = {"content": result.get("content", ""), "metadata_storage_name": result.get("metadata_storage_name")}
+            handle.write(json.dumps(document, ensure_ascii=False) + "\n")
+            count += 1
+    return count
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_cmd = commands.add_parser("export", help="download all documents from Azure AI Search")
+    export_cmd.add_argument("snapshot", type=Path)
+    build_cmd = commands.add_parser("build", help="build a local index from a JSON/JSONL snapshot")
+    build_cmd.add_argument("snapshot", type=Path)
+    build_cmd.add_argument("directory", type=Path)
+    query_cmd = commands.add_parser("query", help="run a query against a local index")
+    query_cmd.add_argument("directory", type=Path)
+    query_cmd.add_argument("query")
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        print(f"Exported {_export_snapshot(args.snapshot)} documents to {args.snapshot}")
+    elif args.command == "build":
+        count = LocalIndex.build(_read_snapshot(args.snapshot), args.directory)
+        print(f"Indexed {count} documents into {args.directory}")
+    else:
+        for hit in LocalIndex(args.directory).search(args.query):
+            name = hit.document.get("metadata_storage_name")
+            print(f"{hit.score:8.3f}  confidence={hit.confidence:.2f}  {name}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
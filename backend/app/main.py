@@ -1,40 +1,79 @@
 from __future__ import annotations
 
 import asyncio
+import hmac
+import json
 import logging
+import time
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator, Dict
+from typing import Any, AsyncGenerator, AsyncIterator, Dict, Literal, Optional, Set, Union
 
-from fastapi import Depends, FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import Depends, FastAPI, Header, HTTPException, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 import os
-import requests
 from pathlib import Path
 from dotenv import load_dotenv
 
+from .admission import AdmissionController, AdmissionRejected
+from .audio_pipeline import shutdown_transcode_executor
+from .audio_utils import TARGET_SAMPLE_RATE
+from .avatar_probe import validate_configured_avatar
+from .drain import DrainController
+from .endpoint_pool import get_endpoint_pool, shutdown_endpoint_pool
+from .event_log import parse_topics
+from .profiler import profile, profile_in_progress
 from .session_manager import SessionManager
+from .static_files import PrecompressedStaticFiles, SpaIndex
+from .tool_runtime import get_tool_runtime
+from .voice_live_client import TEXT_MODE, VOICE_MODE
 
 logger = logging.getLogger(__name__)
 logging.basicConfig(level=logging.INFO)
 
 
+class ClientHints(BaseModel):
+    viewport_width: Optional[float] = None
+    viewport_height: Optional[float] = None
+    device_pixel_ratio: Optional[float] = None
+    downlink_mbps: Optional[float] = None
+    save_data: bool = False
+    audio_only: bool = False
+    avatar_profile: Optional[str] = None
+
+
+class SessionRequest(ClientHints):
+    mode: Literal["voice", "text"] = VOICE_MODE
+
+
 class SessionResponse(BaseModel):
     session_id: str
+    avatar_profile: Optional[str] = None
+    mode: str = VOICE_MODE
 
 
 class AvatarOfferRequest(BaseModel):
     sdp: str
 
 
+class BootstrapRequest(ClientHints):
+    sdp: str
+
+
 class AvatarAnswerResponse(BaseModel):
     sdp: str
 
 
+class BootstrapResponse(BaseModel):
+    session_id: str
+    sdp: Optional[str] = None
+    avatar_profile: Optional[str] = None
+
+
 class TextMessageRequest(BaseModel):
     text: str
+    stream: bool = False
 
 
 class AudioCommitResponse(BaseModel):
@@ -42,17 +81,46 @@ class AudioCommitResponse(BaseModel):
 
 
 session_manager = SessionManager()
+admission = AdmissionController()
+
+
+async def _close_session(session_id: str) -> None:
+    await session_manager.remove_session(session_id)
+    admission.forget(session_id)
+
+
+drain = DrainController(session_manager, _close_session)
+_REAP_INTERVAL_SECONDS = 5.0
+_background_tasks: Set[asyncio.Task] = set()
+_warmup_task: Optional[asyncio.Task] = None
+_last_warmup = float("-inf")
 
 # Load environment variables
 load_dotenv(Path(__file__).resolve().parents[1] / ".env", override=False)
 
 
+def _spawn_background(coro) -> asyncio.Task:
+    """Run a coroutine in the background, keeping a reference until it finishes."""
+    task = asyncio.create_task(coro)
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+
+def _preload_tool_modules() -> None:
+    """Import the SDKs the tools use, so the first tool call does not pay for it."""
+    # pylint: disable=unused-import,import-outside-toplevel
+    import requests  # noqa: F401
+    from azure.search.documents import SearchClient  # noqa: F401
+
+
 async def warmup_ecom_api():
     """Warm up the ecom API by calling the /openapi endpoint"""
     ecom_api_url = os.getenv("ecom_api_url")
     if not ecom_api_url:
         logger.warning("ecom_api_url not configured, skipping API warmup")
         return
+    import requests  # pylint: disable=import-outside-toplevel
     
     warmup_url = f"{ecom_api_url.rstrip('/')}/openapi"
     
@@ -77,16 +145,59 @@ async def warmup_ecom_api():
         logger.error("Unexpected error during ecom API warmup: %s", str(e))
 
 
+def _request_warmup() -> None:
+    """Start an ecom API warmup unless one is running or started within ECOM_WARMUP_INTERVAL seconds."""
+    global _warmup_task, _last_warmup  # pylint: disable=global-statement
+    now = time.monotonic()
+    if _warmup_task is not None and not _warmup_task.done():
+        return
+    if now - _last_warmup < float(os.getenv("ECOM_WARMUP_INTERVAL", "300")):
+        return
+    _last_warmup = now
+    _warmup_task = _spawn_background(warmup_ecom_api())
+
+
+async def reap_idle_sessions() -> int:
+    """Close sessions whose clients have gone, freeing their capacity and rate-limit state."""
+    idle = await session_manager.idle_session_ids(
+        orphan_grace=float(os.getenv("SESSION_ORPHAN_GRACE_SECONDS", "30")),
+        text_idle_timeout=float(os.getenv("TEXT_SESSION_IDLE_TIMEOUT_SECONDS", "300")),
+    )
+    for session_id in idle:
+        logger.info("Reaping idle session %s", session_id)
+        await _close_session(session_id)
+    return len(idle)
+
+
+async def _reap_idle_sessions_forever() -> None:
+    while True:
+        await asyncio.sleep(_REAP_INTERVAL_SECONDS)
+        try:
+            await reap_idle_sessions()
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Idle session reaper failed")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:  # pylint: disable=unused-argument
     try:
-        # Startup: warm up the ecom API
-        await warmup_ecom_api()
+        # Startup work runs in the background so the server accepts traffic immediately
+        _request_warmup()
+        _spawn_background(asyncio.to_thread(_preload_tool_modules))
+        _spawn_background(_reap_idle_sessions_forever())
+        if os.getenv("AVATAR_VALIDATE_ON_STARTUP", "false").lower() == "true":
+            _spawn_background(validate_configured_avatar())
+        drain.install_sigterm_handler()
         yield
     finally:
+        for task in list(_background_tasks):
+            task.cancel()
         # ensure all sessions are cleaned up
         remaining = await session_manager.list_session_ids()
-        await asyncio.gather(*[session_manager.remove_session(session_id) for session_id in remaining])
+        await asyncio.gather(*[_close_session(session_id) for session_id in remaining])
+        get_tool_runtime().shutdown()
+        shutdown_transcode_executor()
+        await shutdown_endpoint_pool()
 
 
 app = FastAPI(title="Azure Voice Live Avatar Backend", lifespan=lifespan)
@@ -101,7 +212,17 @@ app.add_middleware(
 # Mount static files (frontend build) when in production
 static_dir = Path(__file__).parent.parent / "static"
 if static_dir.exists():
-    app.mount("/static", StaticFiles(directory=static_dir), name="static")
+    app.mount("/static", PrecompressedStaticFiles(directory=static_dir), name="static")
+spa_index = SpaIndex(static_dir / "index.html")
+
+
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request, exc: AdmissionRejected):  # pylint: disable=unused-argument
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": exc.detail},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
 
 
 @app.get("/health")
@@ -109,6 +230,66 @@ async def health_check():
     return {"status": "healthy", "service": "voice-live-avatar-backend"}
 
 
+@app.get("/health/ready")
+async def readiness_check():
+    """Fails while draining so the ingress stops sending new clients here."""
+    if drain.draining:
+        return JSONResponse(status_code=503, content={"status": "draining"})
+    return {"status": "ready"}
+
+
+@app.get("/metrics/tools")
+async def tool_metrics():
+    """Per-tool queue depth, latency percentiles, outcome counts and circuit state."""
+    return get_tool_runtime().stats()
+
+
+@app.get("/metrics/endpoints")
+async def endpoint_metrics():
+    """Probed RTT and handshake time, failures and ejection state of each Voice Live endpoint."""
+    pool = get_endpoint_pool()
+    return pool.stats() if pool is not None else {}
+
+
+def require_admin(x_admin_token: Optional[str] = Header(default=None)) -> None:
+    """Admin endpoints exist only when ADMIN_TOKEN is set, and require it in X-Admin-Token."""
+    expected = os.getenv("ADMIN_TOKEN")
+    if not expected:
+        raise HTTPException(status_code=404, detail="Not found")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token.encode(), expected.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+@app.post("/admin/profile", dependencies=[Depends(require_admin)])
+async def admin_profile(seconds: float = 10.0, interval_ms: float = 5.0, format: str = "json"):  # pylint: disable=redefined-builtin
+    """Sample every thread for ``seconds``; returns collapsed stacks plus a per-task CPU breakdown."""
+    if not 0 < seconds <= 60 or not 1 <= interval_ms <= 1000:
+        raise HTTPException(status_code=400, detail="seconds must be in (0, 60] and interval_ms in [1, 1000]")
+    if profile_in_progress():
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    result = await profile(seconds, interval_ms)
+    if format == "collapsed":
+        return PlainTextResponse(result["collapsed"])
+    return result
+
+
+@app.post("/admin/drain", dependencies=[Depends(require_admin)])
+async def admin_drain():
+    """Stop taking sessions and move the current ones elsewhere; the process keeps running."""
+    drain.start("admin request")
+    return await drain.status()
+
+
+@app.get("/admin/drain", dependencies=[Depends(require_admin)])
+async def admin_drain_status():
+    return await drain.status()
+
+
+def _reject_if_draining() -> None:
+    if drain.draining:
+        raise AdmissionRejected(503, "Server is draining", retry_after=1)
+
+
 async def _ensure_session(session_id: str):
     try:
         return await session_manager.get_session(session_id)
@@ -117,21 +298,57 @@ async def _ensure_session(session_id: str):
 
 
 @app.post("/sessions", response_model=SessionResponse)
-async def create_session() -> SessionResponse:
-    session = await session_manager.create_session()
-    return SessionResponse(session_id=session.session_id)
+async def create_session(request: Optional[SessionRequest] = None) -> SessionResponse:
+    _reject_if_draining()
+    mode = request.mode if request else VOICE_MODE
+    client_hints = request.model_dump(exclude={"mode"}, exclude_none=True) if request else None
+    active_sessions = await session_manager.count_sessions(mode)
+    max_sessions = admission.max_text_sessions if mode == TEXT_MODE else admission.max_sessions
+    async with admission.connect_slot(active_sessions, max_sessions, kind=mode):
+        session = await asyncio.wait_for(
+            session_manager.create_session(client_hints, mode), timeout=admission.connect_timeout
+        )
+    return SessionResponse(session_id=session.session_id, avatar_profile=session.avatar_profile, mode=session.mode)
+
+
+@app.post("/sessions/bootstrap", response_model=BootstrapResponse)
+async def bootstrap_session(request: BootstrapRequest) -> BootstrapResponse:
+    """Create a session and negotiate the avatar in one round trip."""
+    _reject_if_draining()
+    client_hints = request.model_dump(exclude={"sdp"}, exclude_none=True)
+    active_sessions = await session_manager.count_sessions(VOICE_MODE)
+    async with admission.connect_slot(active_sessions, timeout_detail="Session bootstrap timed out"):
+        session, server_sdp = await asyncio.wait_for(
+            session_manager.bootstrap_session(request.sdp, client_hints), timeout=admission.connect_timeout + 20
+        )
+    return BootstrapResponse(session_id=session.session_id, sdp=server_sdp, avatar_profile=session.avatar_profile)
 
 
 @app.post("/sessions/{session_id}/avatar-offer", response_model=AvatarAnswerResponse)
 async def handle_avatar_offer(session_id: str, request: AvatarOfferRequest) -> AvatarAnswerResponse:
     session = await _ensure_session(session_id)
+    if not session.avatar_enabled:
+        raise HTTPException(status_code=409, detail="Avatar is disabled for this session")
     server_sdp = await session.connect_avatar(request.sdp)
     return AvatarAnswerResponse(sdp=server_sdp)
 
 
-@app.post("/sessions/{session_id}/text")
-async def send_text_message(session_id: str, request: TextMessageRequest) -> Dict[str, str]:
+async def _sse(events: AsyncIterator[Dict[str, Any]]) -> AsyncIterator[str]:
+    async for event in events:
+        yield f"event: {event['type']}\ndata: {json.dumps(event, ensure_ascii=False)}\n\n"
+
+
+@app.post("/sessions/{session_id}/text", response_model=None)
+async def send_text_message(session_id: str, request: TextMessageRequest) -> Union[Dict[str, str], StreamingResponse]:
+    """Queue a user message; with ``stream`` the reply comes back here as Server-Sent Events."""
     session = await _ensure_session(session_id)
+    admission.check_text(session_id)
+    if request.stream:
+        return StreamingResponse(
+            _sse(session.stream_text_reply(request.text)),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
     await session.send_user_message(request.text)
     return {"status": "queued"}
 
@@ -144,7 +361,9 @@ async def commit_audio(session_id: str) -> AudioCommitResponse:
 
 
 @app.websocket("/ws/sessions/{session_id}")
-async def session_ws(websocket: WebSocket, session_id: str):
+async def session_ws(
+    websocket: WebSocket, session_id: str, last_seq: Optional[int] = None, topics: Optional[str] = None
+):
     await websocket.accept()
     try:
         session = await _ensure_session(session_id)
@@ -152,61 +371,93 @@ async def session_ws(websocket: WebSocket, session_id: str):
         await websocket.close(code=4404)
         return
 
-    queue = session.create_event_queue()
+    # A reconnecting client passes the last sequence number it saw to replay what it missed
+    # ?topics=audio,transcripts,... limits what is sent; "animation" opts in to binary frames (app/animation_codec.py)
+    subscription = session.subscribe(after_seq=last_seq, topics=parse_topics(topics))
+    await websocket.send_json(
+        {"type": "session_ready", "session_id": session_id, "last_seq": session.last_event_seq}
+    )
 
     async def emitter():
         try:
             while True:
-                event = await queue.get()
-                await websocket.send_json(event)
+                for payload in await subscription.next_batch():
+                    if isinstance(payload, bytes):
+                        await websocket.send_bytes(payload)
+                    else:
+                        await websocket.send_text(payload)
         except WebSocketDisconnect:
             logger.info("Websocket emitter disconnect for session %s", session_id)
         except Exception as exc:  # pylint: disable=broad-except
             logger.exception("Emitter failed: %s", exc)
 
     emitter_task = asyncio.create_task(emitter())
+    last_limit_notice = 0.0
 
-    await websocket.send_json({"type": "session_ready", "session_id": session_id})
+    async def notify_rate_limited(kind: str, retry_after: float = 1.0) -> None:
+        nonlocal last_limit_notice
+        now = asyncio.get_running_loop().time()
+        if now - last_limit_notice >= 1.0:
+            last_limit_notice = now
+            logger.warning("Rate limiting %s messages for session %s", kind, session_id)
+            await websocket.send_json({"type": "rate_limited", "kind": kind, "retry_after": retry_after})
 
     try:
         while True:
-            message = await websocket.receive_json()
+            raw_message = await websocket.receive()
+            if raw_message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(raw_message.get("code", 1000))
+            # Binary frames carry PCM16 microphone audio from the capture worklet
+            frame = raw_message.get("bytes")
+            if frame is not None:
+                if not admission.allow_audio(session_id, len(frame) / 2 / TARGET_SAMPLE_RATE):
+                    await notify_rate_limited("audio")
+                    continue
+                await session.send_audio_frame(frame)
+                continue
+            message = json.loads(raw_message.get("text") or "{}")
             msg_type = message.get("type")
             if msg_type == "audio_chunk":
-                audio_data = message.get("data")
+                audio_data = message.get("data") or ""
                 encoding = message.get("encoding", "float32")
+                sample_bytes = 4 if encoding == "float32" else 2
+                if not admission.allow_audio(session_id, len(audio_data) * 3 / 4 / sample_bytes / TARGET_SAMPLE_RATE):
+                    await notify_rate_limited("audio")
+                    continue
                 await session.send_audio_chunk(audio_data, encoding=encoding)
             elif msg_type == "commit_audio":
                 await session.commit_audio()
             elif msg_type == "clear_audio":
                 await session.clear_audio()
-            elif msg_type == "user_text":
-                await session.send_user_message(message.get("text", ""))
-            elif msg_type == "request_response":
-                await session.request_response()
+            elif msg_type in ("user_text", "request_response"):
+                try:
+                    admission.check_text(session_id)
+                except AdmissionRejected as exc:
+                    await notify_rate_limited("text", exc.retry_after)
+                    continue
+                if msg_type == "user_text":
+                    await session.send_user_message(message.get("text", ""))
+                else:
+                    await session.request_response()
             else:
                 logger.warning("Unknown WS message type: %s", msg_type)
     except WebSocketDisconnect:
         logger.info("Client disconnected from session %s", session_id)
     finally:
         emitter_task.cancel()
-        session.remove_event_queue(queue)
+        session.unsubscribe(subscription)
 
 
 # Serve React app for any unmatched routes (SPA fallback)
 @app.get("/{full_path:path}")
-async def serve_spa(full_path: str):
+async def serve_spa(full_path: str, request: Request):
     """Serve the React SPA for any non-API routes"""
-    static_dir = Path(__file__).parent.parent / "static"
-    
     # If static files exist and this isn't an API call, serve index.html
-    if static_dir.exists() and not full_path.startswith(("sessions", "ws", "health", "static")):
-        index_file = static_dir / "index.html"
-        if index_file.exists():
-            # Warm up the ecom API when serving the main page to prevent cold start delays
-            if full_path == "" or full_path == "index.html":
-                asyncio.create_task(warmup_ecom_api())
-            return FileResponse(index_file)
+    if not full_path.startswith(("sessions", "ws", "health", "metrics", "admin", "static")) and spa_index.exists():
+        # Warm up the ecom API when serving the main page to prevent cold start delays
+        if full_path == "" or full_path == "index.html":
+            _request_warmup()
+        return spa_index.response(request.headers)
     
     # Fallback 404 for missing routes
     raise HTTPException(status_code=404, detail="Not found")
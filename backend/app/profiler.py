@@ -0,0 +1,177 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from types import FrameType
+from typing import Any, Dict, List, Optional
+
+# Nothing here runs unless a profile is requested: the SIGPROF timer (or sampling thread)
+# only exists for the duration of a profile, and no tracing hooks are ever installed.
+
+_current_tasks = getattr(asyncio.tasks, "_current_tasks", {})
+_IDLE_FRAMES = {("selectors.py", "select"), ("selectors.py", "poll")}
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _stack(frame: Optional[FrameType]) -> List[str]:
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    labels.reverse()
+    return labels
+
+
+def _is_idle(frame: FrameType) -> bool:
+    return (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in _IDLE_FRAMES
+
+
+def _thread_cpu(ident: int) -> Optional[float]:
+    try:
+        return time.clock_gettime(time.pthread_getcpuclockid(ident))
+    except (AttributeError, OSError):
+        return None
+
+
+def _coro_name(task: asyncio.Task) -> str:
+    coro = task.get_coro()
+    return getattr(coro, "__qualname__", type(coro).__name__)
+
+
+class SamplingProfiler:
+    """Samples every thread's stack at a fixed interval and attributes event-loop samples to tasks.
+
+    When the event loop owns the main thread, samples are driven by SIGPROF so they land
+    wherever the loop is burning CPU; a sampling thread would only ever catch the loop at
+    GIL release points such as ``select``. Otherwise a sampling thread is used.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, loop_thread: int, interval: float):
+        self._loop = loop
+        self._loop_thread = loop_thread
+        self._interval = interval
+        self.stacks: Counter = Counter()
+        self.thread_samples: Counter = Counter()
+        self.task_samples: Counter = Counter()
+        self.samples = 0
+
+    def _thread_name(self, ident: int, names: Dict[int, str]) -> str:
+        return "event-loop" if ident == self._loop_thread else names.get(ident, f"thread-{ident}")
+
+    def sample(self, loop_frame: Optional[FrameType] = None, skip_thread: Optional[int] = None) -> None:
+        """Record one stack per thread; ``loop_frame`` replaces the loop thread's own (signal handler) frame."""
+        names = {thread.ident: thread.name for thread in threading.enumerate() if thread.ident}
+        running_task = _current_tasks.get(self._loop)
+        for ident, frame in sys._current_frames().items():  # pylint: disable=protected-access
+            if ident == skip_thread:
+                continue
+            thread_name = self._thread_name(ident, names)
+            prefix = [thread_name]
+            if ident == self._loop_thread:
+                frame = loop_frame or frame
+                if running_task is not None:
+                    # Keyed by coroutine so short-lived tasks of one kind (e.g. requests) add up
+                    label = _coro_name(running_task)
+                    self.task_samples[label] += 1
+                    prefix.append(f"task:{label}")
+                elif _is_idle(frame):
+                    prefix.append("<idle>")
+            self.stacks[";".join(prefix + _stack(frame))] += 1
+            self.thread_samples[thread_name] += 1
+        self.samples += 1
+
+    def run_in_thread(self, duration: float) -> None:
+        """Sample from the calling (worker) thread for ``duration`` seconds."""
+        own_ident = threading.get_ident()
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            self.sample(skip_thread=own_ident)
+            time.sleep(self._interval)
+
+    def thread_cpu(self) -> Dict[str, float]:
+        cpu = {}
+        for thread in threading.enumerate():
+            seconds = _thread_cpu(thread.ident) if thread.ident else None
+            if seconds is not None:
+                cpu[self._thread_name(thread.ident, {thread.ident: thread.name})] = seconds
+        return cpu
+
+    def collapsed(self) -> str:
+        """Brendan Gregg's collapsed-stack format, ready for flamegraph.pl or speedscope."""
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+
+def task_dump(loop: asyncio.AbstractEventLoop) -> List[Dict[str, Any]]:
+    """Every live task and where it is suspended."""
+    tasks = []
+    for task in asyncio.all_tasks(loop):
+        frames = task.get_stack(limit=1)
+        tasks.append(
+            {
+                "task": task.get_name(),
+                "coro": _coro_name(task),
+                "awaiting": _frame_label(frames[0]) if frames else None,
+            }
+        )
+    return tasks
+
+
+def task_cpu(task_samples: Counter, interval: float) -> List[Dict[str, Any]]:
+    """Event-loop CPU per task coroutine, estimated from the samples taken while it ran."""
+    return [
+        {"coro": coro, "samples": count, "est_cpu_ms": round(count * interval * 1000, 1)}
+        for coro, count in task_samples.most_common()
+    ]
+
+
+_profile_lock = asyncio.Lock()
+
+
+def profile_in_progress() -> bool:
+    return _profile_lock.locked()
+
+
+async def profile(seconds: float, interval_ms: float = 5.0) -> Dict[str, Any]:
+    """Sample the whole process for ``seconds``; call from the event loop."""
+    async with _profile_lock:
+        loop = asyncio.get_running_loop()
+        interval = interval_ms / 1000
+        profiler = SamplingProfiler(loop, threading.get_ident(), interval)
+        cpu_before = profiler.thread_cpu()
+        started = time.perf_counter()
+        if threading.current_thread() is threading.main_thread() and hasattr(signal, "setitimer"):
+            mode = "sigprof"
+            previous = signal.signal(signal.SIGPROF, lambda signum, frame: profiler.sample(frame))
+            signal.setitimer(signal.ITIMER_PROF, interval, interval)
+            try:
+                await asyncio.sleep(seconds)
+            finally:
+                signal.setitimer(signal.ITIMER_PROF, 0)
+                signal.signal(signal.SIGPROF, previous)
+        else:
+            mode = "thread"
+            await asyncio.to_thread(profiler.run_in_thread, seconds)
+        cpu_after = profiler.thread_cpu()
+        return {
+            "mode": mode,
+            "duration_s": round(time.perf_counter() - started, 3),
+            "interval_ms": interval_ms,
+            "samples": profiler.samples,
+            "threads": {
+                name: {"cpu_s": round(cpu_after[name] - cpu_before[name], 4), "samples": profiler.thread_samples[name]}
+                for name in cpu_after
+                if name in cpu_before
+            },
+            "task_cpu": task_cpu(profiler.task_samples, interval),
+            "tasks": task_dump(loop),
+            "collapsed": profiler.collapsed(),
+        }
@@ -2,10 +2,11 @@ from __future__ import annotations
 
 import asyncio
 import logging
+import time
 import uuid
-from typing import Dict
+from typing import Any, Dict, Optional, Tuple
 
-from .voice_live_client import VoiceLiveSession
+from .voice_live_client import TEXT_MODE, VOICE_MODE, VoiceLiveSession
 
 logger = logging.getLogger(__name__)
 
@@ -17,15 +18,38 @@ class SessionManager:
         self._sessions: Dict[str, VoiceLiveSession] = {}
         self._lock = asyncio.Lock()
 
-    async def create_session(self) -> VoiceLiveSession:
+    async def create_session(
+        self, client_hints: Optional[Dict[str, Any]] = None, mode: str = VOICE_MODE
+    ) -> VoiceLiveSession:
         session_id = str(uuid.uuid4())
-        session = VoiceLiveSession(session_id)
-        await session.connect()
+        session = VoiceLiveSession(session_id, client_hints, mode)
+        try:
+            await session.connect()
+        except BaseException:
+            # Cancelled or failed half-way (e.g. admission timeout): don't leak the upstream socket
+            await session.disconnect()
+            raise
         async with self._lock:
             self._sessions[session_id] = session
-        logger.info("Created Voice Live session %s", session_id)
+        logger.info("Created Voice Live %s session %s", mode, session_id)
         return session
 
+    async def bootstrap_session(
+        self, client_sdp: str, client_hints: Optional[Dict[str, Any]] = None
+    ) -> Tuple[VoiceLiveSession, Optional[str]]:
+        """Create a session with avatar negotiation pipelined behind the session config."""
+        session_id = str(uuid.uuid4())
+        session = VoiceLiveSession(session_id, client_hints)
+        try:
+            server_sdp = await session.bootstrap(client_sdp)
+        except BaseException:
+            await session.disconnect()
+            raise
+        async with self._lock:
+            self._sessions[session_id] = session
+        logger.info("Bootstrapped Voice Live session %s (avatar profile %s)", session_id, session.avatar_profile)
+        return session, server_sdp
+
     async def get_session(self, session_id: str) -> VoiceLiveSession:
         async with self._lock:
             if session_id not in self._sessions:
@@ -36,6 +60,29 @@ class SessionManager:
         async with self._lock:
             return list(self._sessions.keys())
 
+    async def count_sessions(self, mode: str) -> int:
+        async with self._lock:
+            return sum(1 for session in self._sessions.values() if session.mode == mode)
+
+    async def idle_session_ids(self, orphan_grace: float, text_idle_timeout: float) -> list[str]:
+        """Sessions nobody is using any more.
+
+        A voice session goes ``orphan_grace`` seconds after its last client left (long
+        enough for a WebSocket reconnect), or as soon as its upstream has closed with no
+        client. Text sessions have no WebSocket between requests, so they get
+        ``text_idle_timeout`` after the last streamed reply.
+        """
+        now = time.monotonic()
+        async with self._lock:
+            sessions = list(self._sessions.items())
+        idle = []
+        for session_id, session in sessions:
+            idle_seconds = session.idle_seconds(now)
+            grace = text_idle_timeout if session.mode == TEXT_MODE else orphan_grace
+            if idle_seconds >= grace or (session.mode == VOICE_MODE and idle_seconds > 0 and session.upstream_closed):
+                idle.append(session_id)
+        return idle
+
     async def remove_session(self, session_id: str) -> None:
         async with self._lock:
             session = self._sessions.pop(session_id, None)
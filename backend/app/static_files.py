@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import hashlib
+import mimetypes
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from fastapi.responses import FileResponse, HTMLResponse, Response
+from fastapi.staticfiles import StaticFiles
+from starlette.datastructures import Headers
+from starlette.staticfiles import NotModifiedResponse
+from starlette.types import Scope
+
+# Build-time variants written next to each asset by the precompress plugin in vite.config.prod.ts
+ENCODINGS: Tuple[Tuple[str, str], ...] = (("br", ".br"), ("gzip", ".gz"))
+
+# Vite emits content-hashed names such as assets/index-DiwrgTda.js
+_HASHED_ASSET = re.compile(r"(^|/)assets/.+-[A-Za-z0-9_-]{8}\.[A-Za-z0-9]+$")
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+
+def accepted_encodings(headers: Headers) -> List[str]:
+    """Content codings the client accepts (q=0 excluded), in our order of preference."""
+    accepted = set()
+    for part in headers.get("accept-encoding", "").split(","):
+        name, *params = part.split(";")
+        quality = 1.0
+        for param in params:
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            accepted.add(name.strip().lower())
+    return [encoding for encoding, _ in ENCODINGS if encoding in accepted or "*" in accepted]
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles that serves ``.br``/``.gz`` siblings when accepted and marks hashed assets immutable."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Assets never change inside a running container, so variant lookups are cached
+        self._variants: Dict[str, Dict[str, Tuple[str, os.stat_result]]] = {}
+
+    def _variants_for(self, full_path: str) -> Dict[str, Tuple[str, os.stat_result]]:
+        variants = self._variants.get(full_path)
+        if variants is None:
+            variants = {}
+            for encoding, suffix in ENCODINGS:
+                try:
+                    variants[encoding] = (full_path + suffix, os.stat(full_path + suffix))
+                except OSError:
+                    pass
+            self._variants[full_path] = variants
+        return variants
+
+    def file_response(self, full_path, stat_result, scope: Scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        path = str(full_path)
+        response: Optional[Response] = None
+        variants = self._variants_for(path)
+        for encoding in accepted_encodings(request_headers):
+            if encoding in variants:
+                variant_path, variant_stat = variants[encoding]
+                # media_type comes from the original name; each variant has its own ETag
+                response = FileResponse(
+                    variant_path,
+                    status_code=status_code,
+                    stat_result=variant_stat,
+                    media_type=mimetypes.guess_type(path)[0] or "text/plain",
+                    headers={"Content-Encoding": encoding},
+                )
+                break
+        if response is None:
+            response = FileResponse(path, status_code=status_code, stat_result=stat_result)
+        response.headers["Cache-Control"] = IMMUTABLE if _HASHED_ASSET.search(path.replace(os.sep, "/")) else REVALIDATE
+        if variants:
+            response.headers["Vary"] = "Accept-Encoding"
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+class SpaIndex:
+    """``index.html`` and its precompressed variants held in memory, revalidated by ETag."""
+
+    def __init__(self, path: Path):
+        self._path = path
+        self._variants: Optional[Dict[Optional[str], Tuple[bytes, str]]] = None
+
+    def _load(self) -> Dict[Optional[str], Tuple[bytes, str]]:
+        if self._variants is None:
+            identity = self._path.read_bytes()
+            digest = hashlib.sha256(identity).hexdigest()[:20]
+            variants: Dict[Optional[str], Tuple[bytes, str]] = {None: (identity, f'"{digest}"')}
+            for encoding, suffix in ENCODINGS:
+                variant = self._path.with_name(self._path.name + suffix)
+                if variant.exists():
+                    variants[encoding] = (variant.read_bytes(), f'"{digest}-{encoding}"')
+            self._variants = variants
+        return self._variants
+
+    def exists(self) -> bool:
+        return self._variants is not None or self._path.is_file()
+
+    def response(self, request_headers: Headers) -> Response:
+        variants = self._load()
+        encoding = next((name for name in accepted_encodings(request_headers) if name in variants), None)
+        body, etag = variants[encoding]
+        headers = {"ETag": etag, "Cache-Control": REVALIDATE, "Vary": "Accept-Encoding"}
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match and etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]:
+            return Response(status_code=304, headers=headers)
+        return HTMLResponse(body, headers=headers)
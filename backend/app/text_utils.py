@@ -0,0 +1,47 @@
+import re
+from typing import List
+
+
+_TERM_RE = re.compile(r"[a-z0-9]+|[^\W\da-z_]+")
+_SENTENCE_END_RE = re.compile(r"(?<=[。．！？!?])|(?<=\.\s)")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count: ~4 ASCII characters per token, one token per other character."""
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return ascii_chars // 4 + (len(text) - ascii_chars)
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into search terms: ASCII words plus character bigrams for CJK runs."""
+    terms: List[str] = []
+    for run in _TERM_RE.findall(text.lower()):
+        if run.isascii() or len(run) == 1:
+            terms.append(run)
+        else:
+            terms.extend(run[i : i + 2] for i in range(len(run) - 1))
+    return terms
+
+
+def split_passages(text: str, max_chars: int = 400) -> List[str]:
+    """Split a document into paragraph-sized passages of at most ``max_chars`` characters."""
+    passages: List[str] = []
+    for paragraph in re.split(r"\n\s*\n|\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(paragraph) <= max_chars:
+            passages.append(paragraph)
+            continue
+        current = ""
+        for sentence in _SENTENCE_END_RE.split(paragraph):
+            if current and len(current) + len(sentence) > max_chars:
+                passages.append(current.strip())
+                current = ""
+            current += sentence
+            while len(current) > max_chars:
+                passages.append(current[:max_chars])
+                current = current[max_chars:]
+        if current.strip():
+            passages.append(current.strip())
+    return passages
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import json
+import logging
+import os
+import re
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from .text_utils import estimate_tokens, split_passages, tokenize
+
+logger = logging.getLogger(__name__)
+
+TOOL_OUTPUT_MAX_FIELD_CHARS = 200
+
+PRODUCT_FIELDS = ("id", "product_id", "name", "title", "category", "price", "stock", "description")
+ORDER_FIELDS = ("id", "order_id", "product_id", "name", "quantity", "price", "total", "status", "message")
+_LIST_KEYS = ("products", "orders", "items", "data", "results", "value")
+
+DOCUMENT_START = " --- Document context start ---"
+DOCUMENT_END = "\n ---End of Document ---\n"
+_DOCUMENT_RE = re.compile(re.escape(DOCUMENT_START.strip()) + r"(.*?)" + re.escape(DOCUMENT_END.strip()), re.S)
+
+
+def _project_record(record: Any, fields: Sequence[str]) -> Any:
+    if not isinstance(record, dict):
+        return record
+    projected = {key: record[key] for key in fields if key in record}
+    if not projected:
+        # Unknown schema: keep the scalar fields and drop lists
+        projected = {key: value for key, value in record.items() if not isinstance(value, (dict, list))}
+    for key, value in record.items():
+        if isinstance(value, dict) and key not in projected:
+            projected[key] = _project_record(value, fields)
+    for key, value in projected.items():
+        if isinstance(value, str) and len(value) > TOOL_OUTPUT_MAX_FIELD_CHARS:
+            projected[key] = value[:TOOL_OUTPUT_MAX_FIELD_CHARS] + "…"
+    return projected
+
+
+def _compact_records(records: List[Any], fields: Sequence[str], budget: int) -> Any:
+    max_items = int(os.getenv("TOOL_OUTPUT_MAX_ITEMS", "10"))
+    items = [_project_record(record, fields) for record in records[:max_items]]
+    while len(items) > 1 and estimate_tokens(json.dumps(items, ensure_ascii=False)) > budget:
+        items.pop()
+    omitted = len(records) - len(items)
+    if not omitted:
+        return items
+    return {"items": items, "total_count": len(records), "omitted_count": omitted}
+
+
+def _compact_json_payload(fields: Sequence[str]) -> Callable[[Any, Dict[str, Any], int], Any]:
+    def compact(result: Any, arguments: Dict[str, Any], budget: int) -> Any:  # pylint: disable=unused-argument
+        if isinstance(result, list):
+            return _compact_records(result, fields, budget)
+        if isinstance(result, dict):
+            for key in _LIST_KEYS:
+                if isinstance(result.get(key), list):
+                    compacted = {k: v for k, v in result.items() if not isinstance(v, (dict, list))}
+                    compacted[key] = _compact_records(result[key], fields, budget)
+                    return compacted
+            return _project_record(result, fields)
+        return result
+
+    return compact
+
+
+def compact_search_result(result: Any, arguments: Dict[str, Any], budget: int) -> Any:
+    """Keep only the passages most relevant to the query, in document order."""
+    if not isinstance(result, str):
+        return result
+    documents = [match.strip() for match in _DOCUMENT_RE.findall(result)] or [result]
+    query_terms = set(tokenize(str(arguments.get("query", ""))))
+
+    candidates = []
+    for doc_index, document in enumerate(documents):
+        for passage_index, passage in enumerate(split_passages(document)):
+            overlap = len(query_terms.intersection(tokenize(passage)))
+            candidates.append((overlap, doc_index, passage_index, passage))
+    # Highest overlap first; earlier documents and passages win ties
+    candidates.sort(key=lambda item: (-item[0], item[1], item[2]))
+
+    selected = []
+    used = 0
+    for candidate in candidates:
+        cost = estimate_tokens(candidate[3])
+        if selected and used + cost > budget:
+            continue
+        selected.append(candidate)
+        used += cost
+    selected.sort(key=lambda item: (item[1], item[2]))
+
+    by_document: Dict[int, List[str]] = {}
+    for _, doc_index, _, passage in selected:
+        by_document.setdefault(doc_index, []).append(passage)
+    return "".join(
+        DOCUMENT_START + "\n".join(passages) + DOCUMENT_END for passages in by_document.values()
+    )
+
+
+TOOL_OUTPUT_COMPACTORS: Dict[str, Callable[[Any, Dict[str, Any], int], Any]] = {
+    "perform_search_based_qna": compact_search_result,
+    "get_products_by_category": _compact_json_payload(PRODUCT_FIELDS),
+    "search_products_by_category_and_price": _compact_json_payload(PRODUCT_FIELDS),
+    "order_products": _compact_json_payload(ORDER_FIELDS),
+}
+
+
+def _serialize(result: Any) -> str:
+    if isinstance(result, str):
+        return result
+    return json.dumps(result, ensure_ascii=False)
+
+
+def compact_tool_output(name: str, arguments: Dict[str, Any], result: Any, budget: Optional[int] = None) -> str:
+    """Shrink a tool result to the token budget and serialize it for function_call_output."""
+    if budget is None:
+        # Approximate token budget for a single function_call_output; 0 disables compaction
+        budget = int(os.getenv("TOOL_OUTPUT_TOKEN_BUDGET", "1500"))
+    if budget <= 0:
+        return _serialize(result)
+    compactor = TOOL_OUTPUT_COMPACTORS.get(name)
+    try:
+        payload = _serialize(compactor(result, arguments, budget) if compactor else result)
+    except Exception:  # pylint: disable=broad-except
+        logger.exception("Compaction failed for %s; sending the raw result", name)
+        payload = _serialize(result)
+    tokens = estimate_tokens(payload)
+    if tokens > budget:
+        # Last resort: cut the text proportionally to the budget
+        keep = max(1, len(payload) * budget // tokens)
+        payload = payload[:keep] + "…(truncated)"
+    logger.info("Tool output for %s: ~%d tokens after compaction", name, min(tokens, budget))
+    return payload
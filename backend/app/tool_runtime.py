@@ -0,0 +1,330 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, Optional
+
+from .tools import AVAILABLE_FUNCTIONS, TOOL_POLICIES
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POLICY: Dict[str, Any] = {
+    "max_concurrency": 4,
+    "queue_limit": 8,
+    "timeout": 20.0,
+    "idempotent": False,
+    "hedge": False,
+    "coalesce": False,
+}
+
+
+class ToolUnavailable(Exception):
+    """A tool call was refused or abandoned by the runtime rather than failing in the tool itself."""
+
+    def __init__(self, tool: str, reason: str, detail: str):
+        super().__init__(detail)
+        self.tool = tool
+        self.reason = reason
+        self.detail = detail
+
+    def to_output(self) -> Dict[str, Any]:
+        return {"error": self.detail, "reason": self.reason, "tool": self.tool}
+
+
+class CircuitBreaker:
+    """Opens after consecutive failures and lets a single probe through after a cool-down."""
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self.state = "half_open"
+            self._probe_in_flight = False
+        if self.state == "half_open" and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self._failures = 0
+        self._probe_in_flight = False
+
+    def release_probe(self) -> None:
+        """Let the next call probe instead: this one ended without telling us anything (e.g. cancelled)."""
+        if self.state == "half_open":
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self.state == "half_open" or self._failures >= self.failure_threshold:
+            self.state = "open"
+            self._opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+    def retry_in(self) -> float:
+        if self.state != "open":
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+
+class _SharedCall:
+    """One in-flight execution and the number of callers waiting on it."""
+
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+
+
+class ToolExecutor:
+    """Runs one tool on its own bounded thread pool with a deadline and a circuit breaker."""
+
+    def __init__(self, name: str, func: Callable[..., Any], policy: Dict[str, Any]):
+        self.name = name
+        self._func = func
+        self.max_concurrency = int(policy["max_concurrency"])
+        self.queue_limit = int(policy["queue_limit"])
+        self.timeout = float(policy["timeout"])
+        self.hedge = bool(policy["hedge"])
+        self.coalesce = bool(policy["coalesce"])
+        if (self.hedge or self.coalesce) and not policy["idempotent"]:
+            raise ValueError(f"Tool {name} enables hedging or coalescing but is not declared idempotent")
+        self._hedge_percentile = float(os.getenv("TOOL_HEDGE_PERCENTILE", "95"))
+        self._hedge_min_samples = int(os.getenv("TOOL_HEDGE_MIN_SAMPLES", "20"))
+        self._hedge_default_delay = float(os.getenv("TOOL_HEDGE_DEFAULT_DELAY_MS", "1500")) / 1000
+        # Each call earns this fraction of a hedge, capping extra load at that ratio
+        self._hedge_budget = float(os.getenv("TOOL_HEDGE_BUDGET", "0.1"))
+        self._hedge_credit = 1.0
+        self._pool = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix=f"tool-{name}")
+        self.breaker = CircuitBreaker(
+            failure_threshold=int(os.getenv("TOOL_BREAKER_FAILURES", "5")),
+            reset_timeout=float(os.getenv("TOOL_BREAKER_RESET_SECONDS", "30")),
+        )
+        self._counter_lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._latencies: Deque[float] = deque(maxlen=256)
+        self._counts = {"calls": 0, "succeeded": 0, "failed": 0, "timed_out": 0, "rejected": 0, "short_circuited": 0}
+        self._counts.update({"hedged": 0, "hedge_wins": 0, "coalesced": 0})
+        # Identical concurrent calls share one execution, keyed by canonical JSON of the arguments
+        self._inflight: Dict[str, _SharedCall] = {}
+
+    def _run(self, arguments: Dict[str, Any]) -> Any:
+        with self._counter_lock:
+            self._queued -= 1
+            self._running += 1
+        try:
+            return self._func(**arguments)
+        finally:
+            with self._counter_lock:
+                self._running -= 1
+
+    def _on_done(self, future: Future) -> None:
+        if future.cancelled():
+            # Abandoned before a worker picked it up, so _run never decremented the queue
+            with self._counter_lock:
+                self._queued -= 1
+
+    def _submit(self, arguments: Dict[str, Any]) -> asyncio.Future:
+        with self._counter_lock:
+            self._queued += 1
+        future = self._pool.submit(functools.partial(self._run, arguments))
+        future.add_done_callback(self._on_done)
+        return asyncio.wrap_future(future)
+
+    async def call(self, arguments: Dict[str, Any]) -> Any:
+        if not self.coalesce:
+            return await self._execute(arguments)
+        key = json.dumps(arguments, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+        shared = self._inflight.get(key)
+        if shared is None:
+            shared = _SharedCall(asyncio.ensure_future(self._execute(arguments)))
+            self._inflight[key] = shared
+            shared.task.add_done_callback(lambda _: self._forget_inflight(key, shared))
+        else:
+            self._counts["coalesced"] += 1
+        shared.waiters += 1
+        try:
+            # Shielded: one caller's barge-in must not cancel the execution others wait on
+            return await asyncio.shield(shared.task)
+        except asyncio.CancelledError:
+            if shared.waiters == 1 and not shared.task.done():
+                # Last one waiting: abandon the execution and let later callers start afresh
+                self._forget_inflight(key, shared)
+                shared.task.cancel()
+            raise
+        finally:
+            shared.waiters -= 1
+
+    def _forget_inflight(self, key: str, shared: "_SharedCall") -> None:
+        if self._inflight.get(key) is shared:
+            del self._inflight[key]
+
+    async def _execute(self, arguments: Dict[str, Any]) -> Any:
+        self._counts["calls"] += 1
+        # Threads still busy with abandoned (timed out) calls count against the limit too. Checked before
+        # the breaker so a rejected call never takes the half-open probe.
+        if self._queued + self._running >= self.max_concurrency + self.queue_limit:
+            self._counts["rejected"] += 1
+            raise ToolUnavailable(self.name, "overloaded", f"{self.name} is overloaded")
+        if not self.breaker.allow():
+            self._counts["short_circuited"] += 1
+            raise ToolUnavailable(
+                self.name,
+                "circuit_open",
+                f"{self.name} is temporarily unavailable; retry in {self.breaker.retry_in():.0f}s",
+            )
+        probing = self.breaker.state == "half_open"
+
+        started = time.monotonic()
+        deadline = asyncio.timeout(self.timeout)
+        try:
+            async with deadline:
+                result = await self._attempt(arguments)
+        except asyncio.CancelledError:
+            if probing:
+                self.breaker.release_probe()
+            raise
+        except TimeoutError as exc:
+            # asyncio.TimeoutError is the builtin one: only our own deadline makes this a timeout
+            if not deadline.expired():
+                self._counts["failed"] += 1
+                self.breaker.record_failure()
+                raise
+            self._counts["timed_out"] += 1
+            self.breaker.record_failure()
+            raise ToolUnavailable(self.name, "timeout", f"{self.name} did not answer within {self.timeout:.0f}s") from exc
+        except Exception:
+            self._counts["failed"] += 1
+            self.breaker.record_failure()
+            raise
+        # Only successful calls feed the hedge delay: fast failures and cancellations would drag p95 down
+        self._latencies.append(time.monotonic() - started)
+        self._counts["succeeded"] += 1
+        self.breaker.record_success()
+        return result
+
+    def _hedge_delay(self) -> Optional[float]:
+        if not self.hedge:
+            return None
+        if len(self._latencies) < self._hedge_min_samples:
+            return self._hedge_default_delay
+        return self.latency_percentile(self._hedge_percentile)
+
+    def _take_hedge_credit(self) -> bool:
+        # Only hedge onto an idle worker, and only while the budget allows it
+        if self._queued + self._running >= self.max_concurrency or self._hedge_credit < 1.0:
+            return False
+        self._hedge_credit -= 1.0
+        return True
+
+    async def _attempt(self, arguments: Dict[str, Any]) -> Any:
+        """Run the call, firing one hedged duplicate if it is slower than the hedge delay."""
+        primary = self._submit(arguments)
+        pending = {primary}
+        hedge_delay = self._hedge_delay()
+        if hedge_delay is not None:
+            self._hedge_credit = min(1.0, self._hedge_credit + self._hedge_budget)
+        try:
+            if hedge_delay is not None:
+                done, _ = await asyncio.wait(pending, timeout=hedge_delay)
+                if not done and self._take_hedge_credit():
+                    self._counts["hedged"] += 1
+                    pending.add(self._submit(arguments))
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    if future.exception() is None:
+                        if future is not primary:
+                            self._counts["hedge_wins"] += 1
+                        return future.result()
+                    error = future.exception()
+            assert error is not None
+            raise error
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def latency_percentile(self, percentile: float) -> Optional[float]:
+        if not self._latencies:
+            return None
+        ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * percentile / 100))
+        return ordered[index]
+
+    def stats(self) -> Dict[str, Any]:
+        def ms(value: Optional[float]) -> Optional[float]:
+            return None if value is None else round(value * 1000, 1)
+
+        return {
+            **self._counts,
+            "queue_depth": self._queued,
+            "coalescing_keys": len(self._inflight),
+            "running": self._running,
+            "max_concurrency": self.max_concurrency,
+            "circuit": self.breaker.state,
+            "latency_ms": {
+                "p50": ms(self.latency_percentile(50)),
+                "p95": ms(self.latency_percentile(95)),
+                "p99": ms(self.latency_percentile(99)),
+            },
+        }
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class ToolRuntime:
+    """Dispatches tool calls to per-tool executors, isolating a slow backend from the rest."""
+
+    def __init__(
+        self,
+        functions: Optional[Dict[str, Callable[..., Any]]] = None,
+        policies: Optional[Dict[str, Dict[str, Any]]] = None,
+    ):
+        functions = AVAILABLE_FUNCTIONS if functions is None else functions
+        policies = TOOL_POLICIES if policies is None else policies
+        self._executors = {
+            name: ToolExecutor(name, func, {**DEFAULT_POLICY, **policies.get(name, {})})
+            for name, func in functions.items()
+        }
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._executors
+
+    async def invoke(self, name: str, arguments: Dict[str, Any]) -> Any:
+        return await self._executors[name].call(arguments)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: executor.stats() for name, executor in self._executors.items()}
+
+    def shutdown(self) -> None:
+        for executor in self._executors.values():
+            executor.shutdown()
+
+
+_runtime: Optional[ToolRuntime] = None
+
+
+def get_tool_runtime() -> ToolRuntime:
+    """Process-wide runtime, created on first use so it sees settings loaded from .env."""
+    global _runtime  # pylint: disable=global-statement
+    if _runtime is None:
+        _runtime = ToolRuntime()
+    return _runtime
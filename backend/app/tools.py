@@ -3,11 +3,9 @@ from __future__ import annotations
 import json
 import logging
 import os
-from typing import Any, Callable, Dict
+from typing import Any, Callable, Dict, List
 
-import requests
-from azure.core.credentials import AzureKeyCredential
-from azure.search.documents import SearchClient
+from .local_index import get_local_index
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +18,10 @@ logic_app_url_call_log_analysis = os.getenv("logic_app_url_call_log_analysis")
 ecom_api_url = os.getenv("ecom_api_url")
 
 
+# requests and the Azure Search SDK are imported inside the tools that use
+# them, so they stay off the container cold-start path.
+
+
 def _ensure_env(var_name: str) -> str:
     value = os.getenv(var_name)
     if not value:
@@ -27,8 +29,46 @@ def _ensure_env(var_name: str) -> str:
     return value
 
 
+def _http_timeout() -> float:
+    return float(os.getenv("TOOL_HTTP_TIMEOUT_SECONDS", "30"))
+
+
+def _format_documents(contents: List[str]) -> str:
+    return "".join(
+        " --- Document context start ---" + content + "\n ---End of Document ---\n" for content in contents
+    )
+
+
 def perform_search_based_qna(query: str) -> str:
     logger.info("perform_search_based_qna - query: %s", query)
+    local_hits = []
+    local_index = get_local_index()
+    if local_index is not None:
+        # Answer locally when the best hit is confident enough, else ask Azure AI Search
+        local_index_min_confidence = float(os.getenv("LOCAL_INDEX_MIN_CONFIDENCE", "0.3"))
+        local_index_fallback = os.getenv("LOCAL_INDEX_FALLBACK", "true").lower() == "true"
+        local_hits = local_index.search(query, top=2)
+        best = local_hits[0].confidence if local_hits else 0.0
+        if local_hits and (best >= local_index_min_confidence or not local_index_fallback):
+            logger.info("Answered from local index (confidence %.2f)", best)
+            return _format_documents([hit.document.get("content", "") for hit in local_hits])
+        if not local_hits and not local_index_fallback:
+            return ""
+        logger.info("Local index confidence %.2f below threshold, querying Azure AI Search", best)
+
+    try:
+        return _search_azure(query)
+    except Exception:
+        if not local_hits:
+            raise
+        logger.exception("Azure AI Search failed, answering from local index")
+        return _format_documents([hit.document.get("content", "") for hit in local_hits])
+
+
+def _search_azure(query: str) -> str:
+    from azure.core.credentials import AzureKeyCredential  # pylint: disable=import-outside-toplevel
+    from azure.search.documents import SearchClient  # pylint: disable=import-outside-toplevel
+
     endpoint = _ensure_env("ai_search_url")
     key = _ensure_env("ai_search_key")
     index = _ensure_env("ai_index_name")
@@ -42,27 +82,33 @@ def perform_search_based_qna(query: str) -> str:
         semantic_configuration_name=semantic,
     )
 
-    response_docs = []
+    contents = []
     for counter, result in enumerate(response):
         logger.debug("Search hit %s: %s", counter, result.get("metadata_storage_name"))
-        response_docs.append(
-            " --- Document context start ---"
-            + result.get("content", "")
-            + "\n ---End of Document ---\n"
-        )
+        contents.append(result.get("content", ""))
         if counter >= 1:
             break
-    logger.info("Search aggregation complete with %d documents", len(response_docs))
-    return "".join(response_docs)
+    logger.info("Search aggregation complete with %d documents", len(contents))
+    return _format_documents(contents)
 
 
 def _post_json(url: str, payload: Dict[str, Any]) -> str:
+    import requests  # pylint: disable=import-outside-toplevel
+
     logger.info("POST %s payload_keys=%s", url, list(payload.keys()))
-    response = requests.post(url, json=payload, timeout=30)
+    response = requests.post(url, json=payload, timeout=_http_timeout())
     response.raise_for_status()
     return response.text
 
 
+def _get_json(url: str) -> Any:
+    import requests  # pylint: disable=import-outside-toplevel
+
+    response = requests.get(url, timeout=_http_timeout())
+    response.raise_for_status()
+    return response.json()
+
+
 def create_delivery_order(order_id: str, destination: str) -> str:
     api_url = _ensure_env("logic_app_url_shipment_orders")
     return json.dumps(_post_json(api_url, {"order_id": order_id, "destination": destination}))
@@ -82,27 +128,17 @@ def perform_call_log_analysis(call_log: str) -> str:
 
 def get_products_by_category(category: str) -> Any:
     api = _ensure_env("ecom_api_url")
-    response = requests.get(f"{api}/api/products/category/{category}", timeout=30)
-    response.raise_for_status()
-    return response.json()
+    return _get_json(f"{api}/api/products/category/{category}")
 
 
 def search_products_by_category_and_price(category: str, price: float) -> Any:
     api = _ensure_env("ecom_api_url")
-    response = requests.get(
-        f"{api}/api/products/search?category={category}&price={price}", timeout=30
-    )
-    response.raise_for_status()
-    return response.json()
+    return _get_json(f"{api}/api/products/search?category={category}&price={price}")
 
 
 def order_products(product_id: str, quantity: int) -> Any:
     api = _ensure_env("ecom_api_url")
-    response = requests.get(
-        f"{api}/api/orders/?id={product_id}&quantity={quantity}", timeout=30
-    )
-    response.raise_for_status()
-    return response.json()
+    return _get_json(f"{api}/api/orders/?id={product_id}&quantity={quantity}")
 
 
 TOOLS_LIST = [
@@ -181,6 +217,29 @@ TOOLS_LIST = [
     },
 ]
 
+# Execution policy per tool (see tool_runtime): thread pool size, extra queued
+# calls allowed beyond it, the overall deadline in seconds, whether repeating a
+# call is safe (idempotent), whether slow calls may be hedged, and whether
+# identical concurrent calls (across sessions) may share one execution. Hedging
+# and coalescing are only allowed for idempotent tools; never for orders or deliveries.
+TOOL_POLICIES: Dict[str, Dict[str, Any]] = {
+    "perform_search_based_qna": {
+        "max_concurrency": 8, "queue_limit": 16, "timeout": 15.0, "idempotent": True, "hedge": True,
+        "coalesce": True,
+    },
+    "create_delivery_order": {"max_concurrency": 4, "queue_limit": 8, "timeout": 30.0, "idempotent": False},
+    "perform_call_log_analysis": {"max_concurrency": 2, "queue_limit": 4, "timeout": 45.0, "idempotent": False},
+    "get_products_by_category": {
+        "max_concurrency": 8, "queue_limit": 16, "timeout": 15.0, "idempotent": True, "hedge": True,
+        "coalesce": True,
+    },
+    "search_products_by_category_and_price": {
+        "max_concurrency": 8, "queue_limit": 16, "timeout": 15.0, "idempotent": True, "hedge": True,
+        "coalesce": True,
+    },
+    "order_products": {"max_concurrency": 4, "queue_limit": 8, "timeout": 20.0, "idempotent": False},
+}
+
 AVAILABLE_FUNCTIONS: Dict[str, Callable[..., Any]] = {
     "perform_search_based_qna": perform_search_based_qna,
     "create_delivery_order": create_delivery_order,
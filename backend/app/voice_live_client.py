@@ -7,26 +7,63 @@ import datetime as dt
 import json
 import logging
 import os
+import random
+import time
 import uuid
 from collections import defaultdict
 from pathlib import Path
-from typing import Any, Dict, Optional, Set
+from typing import Any, AsyncIterator, Callable, Dict, FrozenSet, List, Optional, Set, Union
 
 import websockets  # type: ignore[import]
-from azure.identity import DefaultAzureCredential
 from websockets import WebSocketClientProtocol  # type: ignore[import]
+from websockets.exceptions import InvalidHandshake  # type: ignore[import]
 
 try:
     from websockets.protocol import State as WebSocketState  # type: ignore[import]
 except ImportError:  # pragma: no cover - older websockets versions
     WebSocketState = None  # type: ignore[assignment]
 
-from .audio_utils import float_frame_base64_to_pcm16_base64
-from .tools import AVAILABLE_FUNCTIONS, TOOLS_LIST
+from .animation_codec import encode_blendshapes, encode_visemes
+from .audio_pipeline import AudioPipeline
+from .avatar_probe import avatar_capability, known_valid_avatar
+from .avatar_profiles import AUDIO_ONLY, AVATAR_PROFILES, default_avatar_profile, select_avatar_profile
+from .capture import SessionRecorder, recorder_for
+from .conversation import ConversationWindow
+from .endpoint_pool import EndpointState, get_endpoint_pool, handshake_status, websocket_base
+from .event_log import DEFAULT_TOPICS, EventLog, EventSubscription
+from .tool_output import compact_tool_output
+from .tool_runtime import ToolUnavailable, get_tool_runtime
+from .tools import TOOLS_LIST
 from dotenv import load_dotenv
 
 logger = logging.getLogger(__name__)
 
+VOICE_MODE = "voice"
+# Text in, text out: no audio, VAD, TTS or avatar upstream
+TEXT_MODE = "text"
+SESSION_MODES = (VOICE_MODE, TEXT_MODE)
+
+# Subscription topic of each event sent to browsers; unlisted types (errors, session_migrate) always go out
+_EVENT_TOPICS: Dict[str, str] = {
+    "assistant_audio_delta": "audio",
+    "assistant_audio_done": "audio",
+    "assistant_audio_flush": "audio",
+    "speech_started": "audio",
+    "speech_stopped": "audio",
+    "input_audio_committed": "audio",
+    "assistant_transcript_delta": "transcripts",
+    "assistant_transcript_done": "transcripts",
+    "assistant_text_delta": "transcripts",
+    "assistant_text_done": "transcripts",
+    "user_transcript_completed": "transcripts",
+    "function_call_completed": "tools",
+    "function_call_cancelled": "tools",
+    "session_updated": "session",
+    "avatar_connecting": "session",
+    "response_status": "session",
+    "event": "debug",
+}
+
 # Ensure .env from backend root is loaded when module is imported
 load_dotenv(Path(__file__).resolve().parents[1] / ".env", override=False)
 
@@ -51,77 +88,75 @@ SYSTEM_INSTRUCTIONS = """
 class VoiceLiveSession:
     """Manage a single Voice Live realtime session and broadcast events to subscribers."""
 
-    def __init__(self, session_id: str):
+    def __init__(self, session_id: str, client_hints: Optional[Dict[str, Any]] = None, mode: str = VOICE_MODE):
+        if mode not in SESSION_MODES:
+            raise ValueError(f"Unknown session mode {mode!r}")
         self.session_id = session_id
+        self.mode = mode
         self.ws: Optional[WebSocketClientProtocol] = None
-        self._listeners: Set[asyncio.Queue] = set()
+        # Events for browser clients; reconnecting clients replay what they missed from here
+        self._events = EventLog(int(os.getenv("SESSION_EVENT_LOG_SIZE", "512")))
+        self._subscriptions: Set[EventSubscription] = set()
+        # Text sessions mostly answer over SSE: nothing is logged for topics until a WebSocket client asks
+        self._wanted_topics: FrozenSet[str] = DEFAULT_TOPICS if mode == VOICE_MODE else frozenset()
         self._lock = asyncio.Lock()
         self._receive_task: Optional[asyncio.Task] = None
         self._avatar_future: Optional[asyncio.Future] = None
         self._connected_event = asyncio.Event()
-
-        endpoint = os.getenv("AZURE_VOICE_LIVE_ENDPOINT")
+        self._active_response_id: Optional[str] = None
+        self._cancelled_response_ids: Set[str] = set()
+        self._assistant_audio: Optional[Dict[str, Any]] = None
+        self._tool_tasks: Set[asyncio.Task] = set()
+        # Mirror of the upstream conversation, pruned under CONVERSATION_TOKEN_BUDGET
+        self._conversation = ConversationWindow.from_env()
+        # From speech_started until the model starts answering
+        self._user_turn_open = False
+        # Set while the server drains; see request_migration
+        self._migration_jitter: Optional[float] = None
+        self._migration_task: Optional[asyncio.Task] = None
+        self.migration_sent = False
+        # Streamed text replies (POST /sessions/{id}/text with stream); one at a time per session
+        self._reply_listeners: Set[asyncio.Queue] = set()
+        self._reply_lock = asyncio.Lock()
+        # Longest wait for the next reply event (a tool call can take a while) before giving up
+        self._reply_timeout = float(os.getenv("TEXT_REPLY_TIMEOUT_SECONDS", "60"))
+        # When the last subscriber or reply listener left; idle sessions are reaped (see SessionManager.idle_session_ids)
+        self._idle_since: Optional[float] = time.monotonic()
+        self._tools = get_tool_runtime()
+        # Microphone audio is converted off the event loop; see AUDIO_TRANSCODE_EXECUTOR
+        self._audio = AudioPipeline(self._append_audio)
+        # Set when VOICE_LIVE_CAPTURE_DIR is configured; see app/capture.py
+        self._recorder: Optional[SessionRecorder] = recorder_for(session_id)
+
+        endpoints = get_endpoint_pool()
         model = os.getenv("VOICE_LIVE_MODEL")
-        if not endpoint or not model:
-            raise RuntimeError("AZURE_VOICE_LIVE_ENDPOINT and VOICE_LIVE_MODEL must be set")
-        self._endpoint = endpoint
+        if endpoints is None or not model:
+            raise RuntimeError("AZURE_VOICE_LIVE_ENDPOINT (or AZURE_VOICE_LIVE_ENDPOINTS) and VOICE_LIVE_MODEL must be set")
+        # Sessions connect, and reconnect, to the fastest healthy endpoint; see app/endpoint_pool.py
+        self._endpoints = endpoints
+        self.endpoint: Optional[str] = None
+        # Short enough to fail over quickly; with nowhere to fail over to, the websockets default
+        default_timeout = "5" if len(endpoints.endpoints) > 1 else "10"
+        self._connect_timeout = float(os.getenv("AZURE_VOICE_LIVE_CONNECT_TIMEOUT_SECONDS", default_timeout))
         self._model = model
         self._api_version = os.getenv("AZURE_VOICE_LIVE_API_VERSION", "2025-05-01-preview")
         self._api_key = os.getenv("AZURE_OPENAI_API_KEY")
-        self._use_api_key = bool(self._api_key)
 
         # Check if avatar is enabled via environment variable
-        self._avatar_enabled = os.getenv("AZURE_VOICE_AVATAR_ENABLED", "true").lower() == "true"
+        self._avatar_enabled = mode == VOICE_MODE and os.getenv("AZURE_VOICE_AVATAR_ENABLED", "true").lower() == "true"
+        # Cancel the in-flight response when the user starts talking over the assistant
+        self._barge_in_enabled = os.getenv("AZURE_VOICE_BARGE_IN_ENABLED", "true").lower() == "true"
         
+        # Per-client video profile; weak links or tiny viewports fall back to audio-only
+        self.avatar_profile: Optional[str] = None
         if self._avatar_enabled:
-            self._session_config = {
-                "modalities": ["text", "audio", "avatar", "animation"],
-                "input_audio_sampling_rate": 24000,
-                "instructions": SYSTEM_INSTRUCTIONS,
-                "turn_detection": {
-                    "type": "server_vad",
-                    "threshold": 0.5,
-                    "prefix_padding_ms": 300,
-                    "silence_duration_ms": 500,
-                },
-                "tools": TOOLS_LIST,
-                "tool_choice": "auto",
-                "input_audio_noise_reduction": {"type": "azure_deep_noise_suppression"},
-                "input_audio_echo_cancellation": {"type": "server_echo_cancellation"},
-                "voice": {
-                    "name": os.getenv("AZURE_TTS_VOICE", "ja-JP-AoiNeural"),
-                    "type": "azure-standard",
-                    "temperature": 0.8,
-                },
-                "input_audio_transcription": {"model": "whisper-1"},
-                "avatar": self._build_avatar_config(),
-                "animation": {"model_name": "default", "outputs": ["blendshapes", "viseme_id"]},
-            }
-        else:
-            # Audio-only mode (no avatar)
-            self._session_config = {
-                "modalities": ["text", "audio"],
-                "input_audio_sampling_rate": 24000,
-                "instructions": SYSTEM_INSTRUCTIONS,
-                "turn_detection": {
-                    "type": "server_vad",
-                    "threshold": 0.5,
-                    "prefix_padding_ms": 300,
-                    "silence_duration_ms": 500,
-                },
-                "tools": TOOLS_LIST,
-                "tool_choice": "auto",
-                "input_audio_noise_reduction": {"type": "azure_deep_noise_suppression"},
-                "input_audio_echo_cancellation": {"type": "server_echo_cancellation"},
-                "voice": {
-                    "name": os.getenv("AZURE_TTS_VOICE", "ja-JP-AoiNeural"),
-                    "type": "azure-standard",
-                    "temperature": 0.8,
-                },
-                "input_audio_transcription": {"model": "whisper-1"},
-            }
+            self.avatar_profile = select_avatar_profile(client_hints)
+            if self.avatar_profile == AUDIO_ONLY:
+                self._avatar_enabled = False
+            logger.info("[%s] Avatar profile: %s", session_id, self.avatar_profile)
+        self._session_config = self._build_session_config()
         self._response_config = {
-            "modalities": ["text", "audio"],
+            "modalities": ["text"] if mode == TEXT_MODE else ["text", "audio"],
         }
 
     def _ws_is_open(self) -> bool:
@@ -170,12 +205,63 @@ class VoiceLiveSession:
         if not self._ws_is_open():
             raise RuntimeError("Session websocket is not connected")
 
-    def _build_avatar_config(self) -> Dict[str, Any]:
+    def _build_session_config(self) -> Dict[str, Any]:
+        if self.mode == TEXT_MODE:
+            return {
+                "modalities": ["text"],
+                "instructions": SYSTEM_INSTRUCTIONS,
+                "turn_detection": None,
+                "tools": TOOLS_LIST,
+                "tool_choice": "auto",
+            }
+        config: Dict[str, Any] = {
+            "modalities": ["text", "audio"],
+            "input_audio_sampling_rate": 24000,
+            "instructions": SYSTEM_INSTRUCTIONS,
+            "turn_detection": {
+                "type": "server_vad",
+                "threshold": 0.5,
+                "prefix_padding_ms": 300,
+                "silence_duration_ms": 500,
+            },
+            "tools": TOOLS_LIST,
+            "tool_choice": "auto",
+            "input_audio_noise_reduction": {"type": "azure_deep_noise_suppression"},
+            "input_audio_echo_cancellation": {"type": "server_echo_cancellation"},
+            "voice": {
+                "name": os.getenv("AZURE_TTS_VOICE", "ja-JP-AoiNeural"),
+                "type": "azure-standard",
+                "temperature": 0.8,
+            },
+            "input_audio_transcription": {"model": "whisper-1"},
+        }
+        if self._avatar_enabled:
+            config["modalities"] = ["text", "audio", "avatar", "animation"]
+            config["avatar"] = self._build_avatar_config(self.avatar_profile or default_avatar_profile())
+            config["animation"] = {"model_name": "default", "outputs": ["blendshapes", "viseme_id"]}
+        return config
+
+    def _build_avatar_config(self, profile_name: str) -> Dict[str, Any]:
         character = os.getenv("AZURE_VOICE_AVATAR_CHARACTER", "lisa")
         style = os.getenv("AZURE_VOICE_AVATAR_STYLE")
-        video_width = int(os.getenv("AZURE_VOICE_AVATAR_WIDTH", "1280"))
-        video_height = int(os.getenv("AZURE_VOICE_AVATAR_HEIGHT", "720"))
-        bitrate = int(os.getenv("AZURE_VOICE_AVATAR_BITRATE", "2000000"))
+        profile = AVATAR_PROFILES[profile_name]
+        video_width, video_height, bitrate = profile["width"], profile["height"], profile["bitrate"]
+        if profile_name == default_avatar_profile():
+            # Explicit sizes still pin the default profile for existing deployments
+            video_width = int(os.getenv("AZURE_VOICE_AVATAR_WIDTH", str(video_width)))
+            video_height = int(os.getenv("AZURE_VOICE_AVATAR_HEIGHT", str(video_height)))
+            bitrate = int(os.getenv("AZURE_VOICE_AVATAR_BITRATE", str(bitrate)))
+        if avatar_capability(character, style, video_width, video_height) is False:
+            # A startup or CLI probe already saw the service reject this combination
+            fallback = known_valid_avatar(video_width, video_height)
+            if fallback is not None:
+                logger.warning(
+                    "Avatar %s/%s failed validation at %dx%d; using %s/%s",
+                    character, style, video_width, video_height, *fallback,
+                )
+                character, style = fallback
+            else:
+                logger.warning("Avatar %s/%s failed validation at %dx%d", character, style, video_width, video_height)
         config: Dict[str, Any] = {
             "character": character,
             "customized": False,
@@ -190,43 +276,109 @@ class VoiceLiveSession:
             ]
         return config
 
-    async def connect(self) -> None:
+    async def connect(self, avatar_sdp: Optional[str] = None) -> None:
+        """Open the upstream socket and apply the session config.
+
+        With ``avatar_sdp`` the avatar negotiation is pipelined right behind
+        ``session.update``; the answer resolves ``self._avatar_future``.
+        """
         async with self._lock:
             if self._ws_is_open():
                 return
-            headers = {"x-ms-client-request-id": str(uuid.uuid4())}
-            if self._use_api_key:
-                ws_url = self._build_ws_url()
-                headers["api-key"] = self._api_key  # Azure OpenAI key
+            self._endpoints.start()
+            token: Optional[str] = None
+            last_error: Optional[BaseException] = None
+            for endpoint in self._endpoints.ranked():
+                api_key = endpoint.api_key or self._api_key
+                if not api_key and token is None:
+                    token = await self._get_token()
+                try:
+                    self.ws = await self._open_upstream(endpoint, api_key, token)
+                except (OSError, asyncio.TimeoutError, InvalidHandshake) as exc:
+                    logger.warning("[%s] Connect to %s failed: %s", self.session_id, endpoint.url, exc)
+                    last_error = exc
+                    status = handshake_status(exc)
+                    if status == 429:
+                        # Rate limiting is not ill health: failing over would only spread the load; admission backs off
+                        raise
+                    # Like the pool's probe, only network errors, timeouts and 5xx answers count against an endpoint
+                    if status is None or status >= 500:
+                        self._endpoints.report_failure(endpoint, exc)
+                    continue
+                self._endpoints.report_success(endpoint)
+                self.endpoint = endpoint.url
+                break
             else:
-                token = await self._get_token()
-                ws_url = self._build_ws_url(token)
-                headers["Authorization"] = f"Bearer {token}"
-            self.ws = await websockets.connect(ws_url, additional_headers=headers)
-            logger.info("[%s] Connected to Azure Voice Live", self.session_id)
+                assert last_error is not None
+                raise last_error
+            logger.info("[%s] Connected to Azure Voice Live at %s", self.session_id, self.endpoint)
             self._receive_task = asyncio.create_task(self._receive_loop())
             await self._send("session.update", {"session": self._session_config}, allow_reconnect=False)
+            if avatar_sdp is not None:
+                await self._send("session.avatar.connect", self._avatar_connect_payload(avatar_sdp), allow_reconnect=False)
             self._connected_event.set()
 
+    @property
+    def avatar_enabled(self) -> bool:
+        return self._avatar_enabled
+
+    async def bootstrap(self, client_sdp: str) -> Optional[str]:
+        """Connect, configure and start the avatar in one sequence; return the server SDP.
+
+        Returns None when this session was downgraded to audio-only.
+        """
+        if not self._avatar_enabled:
+            await self.connect()
+            return None
+        future: asyncio.Future = asyncio.get_event_loop().create_future()
+        self._avatar_future = future
+        try:
+            await self.connect(avatar_sdp=client_sdp)
+            return await asyncio.wait_for(future, timeout=20)
+        finally:
+            self._avatar_future = None
+
     async def disconnect(self) -> None:
         async with self._lock:
             if self._ws_is_open():
                 await self.ws.close()
             if self._receive_task:
                 self._receive_task.cancel()
+            for task in list(self._tool_tasks):
+                task.cancel()
+            if self._migration_task is not None:
+                self._migration_task.cancel()
+            self._notify_reply({"type": "error", "payload": {"message": "Session closed"}})
+            self._audio.close()
             self.ws = None
             self._connected_event.clear()
+            if self._recorder is not None:
+                self._recorder.close()
+                self._recorder = None
             logger.info("[%s] Disconnected session", self.session_id)
 
     async def _get_token(self) -> str:
+        from azure.identity import DefaultAzureCredential  # imported lazily: slow, and only needed without an API key
+
         credential = DefaultAzureCredential()
         scope = "https://ai.azure.com/.default"
         token = await asyncio.get_event_loop().run_in_executor(None, credential.get_token, scope)
         return token.token
 
-    def _build_ws_url(self, agent_token: Optional[str] = None) -> str:
-        azure_ws_endpoint = self._endpoint.rstrip("/").replace("https://", "wss://")
-        base = f"{azure_ws_endpoint}/voice-live/realtime?api-version={self._api_version}&model={self._model}"
+    async def _open_upstream(
+        self, endpoint: EndpointState, api_key: Optional[str], token: Optional[str]
+    ) -> WebSocketClientProtocol:
+        headers = {"x-ms-client-request-id": str(uuid.uuid4())}
+        if api_key:
+            ws_url = self._build_ws_url(endpoint.url)
+            headers["api-key"] = api_key  # Azure OpenAI key
+        else:
+            ws_url = self._build_ws_url(endpoint.url, token)
+            headers["Authorization"] = f"Bearer {token}"
+        return await websockets.connect(ws_url, additional_headers=headers, open_timeout=self._connect_timeout)
+
+    def _build_ws_url(self, endpoint: str, agent_token: Optional[str] = None) -> str:
+        base = f"{websocket_base(endpoint)}/voice-live/realtime?api-version={self._api_version}&model={self._model}"
         if agent_token:
             return f"{base}&agent-access-token={agent_token}"
         return base
@@ -248,7 +400,10 @@ class VoiceLiveSession:
         payload = {"event_id": self._generate_id("evt_"), "type": event_type}
         if data:
             payload.update(data)
-        await self.ws.send(json.dumps(payload))
+        message = json.dumps(payload)
+        if self._recorder is not None:
+            self._recorder.record_raw("out", message)
+        await self.ws.send(message)
 
     @staticmethod
     def _generate_id(prefix: str) -> str:
@@ -259,6 +414,13 @@ class VoiceLiveSession:
         payload = json.dumps({"type": "offer", "sdp": client_sdp})
         return base64.b64encode(payload.encode("utf-8")).decode("ascii")
 
+    @classmethod
+    def _avatar_connect_payload(cls, client_sdp: str) -> Dict[str, Any]:
+        return {
+            "client_sdp": cls._encode_client_sdp(client_sdp),
+            "rtc_configuration": {"bundle_policy": "max-bundle"},
+        }
+
     @staticmethod
     def _decode_server_sdp(server_sdp_raw: Optional[str]) -> Optional[str]:
         if not server_sdp_raw:
@@ -283,22 +445,87 @@ class VoiceLiveSession:
                 return sdp_value
         return decoded_text
 
-    def create_event_queue(self) -> asyncio.Queue:
-        queue: asyncio.Queue = asyncio.Queue(maxsize=200)
-        self._listeners.add(queue)
-        return queue
-
-    def remove_event_queue(self, queue: asyncio.Queue) -> None:
-        self._listeners.discard(queue)
-
-    async def _broadcast(self, event: Dict[str, Any]) -> None:
-        if not self._listeners:
+    def subscribe(self, after_seq: Optional[int] = None, topics: FrozenSet[str] = DEFAULT_TOPICS) -> EventSubscription:
+        subscription = self._events.subscribe(after_seq, topics)
+        self._subscriptions.add(subscription)
+        self._refresh_topics()
+        self._update_idle()
+        return subscription
+
+    def unsubscribe(self, subscription: EventSubscription) -> None:
+        self._subscriptions.discard(subscription)
+        # With nobody left, a voice session keeps logging what the last client wanted so a reconnect
+        # can replay it; a text session stops logging until someone subscribes again
+        if self._subscriptions or self.mode == TEXT_MODE:
+            self._refresh_topics()
+        self._update_idle()
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscriptions) + len(self._reply_listeners)
+
+    def _update_idle(self) -> None:
+        if self.subscriber_count:
+            self._idle_since = None
+        elif self._idle_since is None:
+            self._idle_since = time.monotonic()
+
+    def idle_seconds(self, now: float) -> float:
+        """How long the session has had no subscriber or reply listener; 0 while it has one."""
+        return 0.0 if self._idle_since is None else now - self._idle_since
+
+    @property
+    def upstream_closed(self) -> bool:
+        """The upstream socket has closed since connecting (it reopens on the next send)."""
+        return self._receive_task is not None and self._receive_task.done() and not self._ws_is_open()
+
+    def request_migration(self, max_jitter: float) -> None:
+        """Ask the client to move to a new session at the next pause in the conversation."""
+        self._migration_jitter = max_jitter
+        self._schedule_migration()
+
+    def _is_idle(self) -> bool:
+        return self._active_response_id is None and not self._tool_tasks and not self._user_turn_open
+
+    def _schedule_migration(self) -> None:
+        if self._migration_jitter is None or self.migration_sent or not self._is_idle():
             return
-        for queue in list(self._listeners):
-            try:
-                queue.put_nowait(event)
-            except asyncio.QueueFull:
-                logger.warning("[%s] Dropping event %s due to slow consumer", self.session_id, event.get("type"))
+        if self._migration_task is None or self._migration_task.done():
+            self._migration_task = asyncio.create_task(self._send_migration(self._migration_jitter))
+
+    async def _send_migration(self, max_jitter: float) -> None:
+        audio = self._assistant_audio
+        remaining_ms = audio["sent_ms"] - self._played_audio_ms() if audio is not None else 0.0
+        # Let the answer finish playing, then spread clients out so they don't all reconnect at once
+        await asyncio.sleep(max(0.0, remaining_ms) / 1000 + random.uniform(0, max_jitter))
+        if not self._is_idle():
+            return  # the conversation picked up again; retried after the next response.done
+        self.migration_sent = True
+        logger.info("[%s] Asking client to migrate", self.session_id)
+        await self._broadcast({"type": "session_migrate", "reason": "drain"})
+
+    def _refresh_topics(self) -> None:
+        self._wanted_topics = frozenset().union(*(subscription.topics for subscription in self._subscriptions))
+
+    def _wants(self, topic: str) -> bool:
+        return topic in self._wanted_topics
+
+    @property
+    def last_event_seq(self) -> int:
+        return self._events.last_seq
+
+    async def _broadcast(self, event: Union[Dict[str, Any], bytes], topic: Optional[str] = None) -> None:
+        """Log an event for subscribers; events of a topic nobody wants are dropped before serialization."""
+        if self.mode == TEXT_MODE and not self._subscriptions:
+            # Its replies reach the caller through stream_text_reply; nobody would ever read the log
+            return
+        if isinstance(event, dict):
+            topic = topic or _EVENT_TOPICS.get(event["type"])
+        if topic is not None and topic not in self._wanted_topics:
+            return
+        self._events.append(event, topic)
+        if self._recorder is not None:
+            self._recorder.record("down", event)
 
     async def send_user_message(self, text: str) -> None:
         await self._connected_event.wait()
@@ -315,23 +542,55 @@ class VoiceLiveSession:
         )
         await self._send("response.create", {"response": self._response_config})
 
+    async def stream_text_reply(self, text: str) -> AsyncIterator[Dict[str, Any]]:
+        """Send a user message and yield the reply as it streams, ending with ``reply_done`` or ``error``."""
+        async with self._reply_lock:
+            queue: asyncio.Queue = asyncio.Queue()
+            self._reply_listeners.add(queue)
+            self._update_idle()
+            try:
+                await self.send_user_message(text)
+                while True:
+                    try:
+                        event = await asyncio.wait_for(queue.get(), timeout=self._reply_timeout)
+                    except asyncio.TimeoutError:
+                        logger.warning("[%s] No reply event within %.0f s", self.session_id, self._reply_timeout)
+                        event = {"type": "error", "payload": {"message": f"No reply within {self._reply_timeout:.0f}s"}}
+                    yield event
+                    if event["type"] in ("reply_done", "error"):
+                        return
+            finally:
+                self._reply_listeners.discard(queue)
+                self._update_idle()
+
+    def _notify_reply(self, event: Dict[str, Any]) -> None:
+        for queue in self._reply_listeners:
+            queue.put_nowait(event)
+
     async def send_audio_chunk(self, audio_b64: str, encoding: str = "float32") -> None:
         await self._connected_event.wait()
         await self._ensure_connection()
-        if encoding == "float32":
-            pcm_b64 = float_frame_base64_to_pcm16_base64(audio_b64)
-        else:
-            pcm_b64 = audio_b64
+        await self._audio.submit(audio_b64, encoding)
+
+    async def send_audio_frame(self, pcm16: bytes) -> None:
+        """Queue a binary PCM16 frame from the capture worklet."""
+        await self._connected_event.wait()
+        await self._ensure_connection()
+        await self._audio.submit(pcm16, "pcm16")
+
+    async def _append_audio(self, pcm_b64: str) -> None:
         await self._send("input_audio_buffer.append", {"audio": pcm_b64})
 
     async def commit_audio(self) -> None:
         await self._connected_event.wait()
         await self._ensure_connection()
+        await self._audio.flush()
         await self._send("input_audio_buffer.commit")
 
     async def clear_audio(self) -> None:
         await self._connected_event.wait()
         await self._ensure_connection()
+        self._audio.clear()
         await self._send("input_audio_buffer.clear")
 
     async def request_response(self) -> None:
@@ -344,12 +603,7 @@ class VoiceLiveSession:
         await self._ensure_connection()
         future: asyncio.Future = asyncio.get_event_loop().create_future()
         self._avatar_future = future
-        encoded_sdp = self._encode_client_sdp(client_sdp)
-        payload = {
-            "client_sdp": encoded_sdp,
-            "rtc_configuration": {"bundle_policy": "max-bundle"},
-        }
-        await self._send("session.avatar.connect", payload)
+        await self._send("session.avatar.connect", self._avatar_connect_payload(client_sdp))
         try:
             server_sdp = await asyncio.wait_for(future, timeout=20)
             return server_sdp
@@ -364,17 +618,44 @@ class VoiceLiveSession:
             async for message in ws:
                 try:
                     event = json.loads(message)
-                except json.JSONDecodeError:
-                    logger.warning("[%s] Failed to decode message", self.session_id)
+                    if not isinstance(event, dict):
+                        raise ValueError(f"expected a JSON object, got {type(event).__name__}")
+                except ValueError as exc:  # JSONDecodeError and UnicodeDecodeError included
+                    logger.warning("[%s] Failed to decode message: %s", self.session_id, exc)
+                    if self._recorder is not None:
+                        self._recorder.record_undecodable("in", message)
                     continue
+                if self._recorder is not None:
+                    self._recorder.record_raw("in", message)
                 event_type = event.get("type")
+                if self._conversation is not None:
+                    self._conversation.observe(event)
+                if event.get("response_id") in self._cancelled_response_ids:
+                    # Deltas still in flight for a response cancelled by barge-in
+                    continue
                 if event_type == "error":
+                    self._notify_reply({"type": "error", "payload": event.get("error", event)})
                     await self._broadcast({"type": "error", "payload": event})
+                elif event_type == "response.created":
+                    self._active_response_id = event.get("response", {}).get("id")
+                    self._user_turn_open = False
+                    await self._broadcast({"type": "event", "payload": event})
                 elif event_type == "response.audio.delta":
+                    self._track_assistant_audio(event)
                     await self._broadcast({"type": "assistant_audio_delta", "delta": event.get("delta")})
                 elif event_type == "response.audio.done":
                     await self._broadcast({"type": "assistant_audio_done", "payload": event})
+                elif event_type == "response.text.delta":
+                    self._notify_reply({"type": "text_delta", "delta": event.get("delta")})
+                    await self._broadcast(
+                        {"type": "assistant_text_delta", "delta": event.get("delta"), "item_id": event.get("item_id")}
+                    )
+                elif event_type == "response.text.done":
+                    await self._broadcast(
+                        {"type": "assistant_text_done", "text": event.get("text"), "item_id": event.get("item_id")}
+                    )
                 elif event_type == "response.audio_transcript.delta":
+                    self._notify_reply({"type": "text_delta", "delta": event.get("delta")})
                     await self._broadcast(
                         {
                             "type": "assistant_transcript_delta",
@@ -399,6 +680,13 @@ class VoiceLiveSession:
                         }
                     )
                 elif event_type == "input_audio_buffer.speech_started":
+                    self._user_turn_open = True
+                    if self._barge_in_enabled:
+                        try:
+                            await self._handle_barge_in()
+                        except Exception:  # pylint: disable=broad-except
+                            # A failed cancel must not end the receive loop; the reply just plays out
+                            logger.warning("[%s] Barge-in handling failed", self.session_id, exc_info=True)
                     await self._broadcast({"type": "speech_started"})
                 elif event_type == "input_audio_buffer.speech_stopped":
                     await self._broadcast({"type": "speech_stopped"})
@@ -415,46 +703,182 @@ class VoiceLiveSession:
                     await self._broadcast({"type": "avatar_connecting"})
                 elif event_type == "response.done":
                     await self._handle_response_done(event)
-                else:
+                    await self._prune_conversation()
+                    self._schedule_migration()
+                elif event_type == "response.animation_blendshapes.delta":
+                    # Dozens of floats per frame at video rate: packed as float16, and only if someone listens
+                    if self._wants("animation"):
+                        await self._broadcast_animation(encode_blendshapes, event)
+                elif event_type == "response.animation_viseme.delta":
+                    if self._wants("animation"):
+                        await self._broadcast_animation(encode_visemes, [event])
+                elif event_type in ("response.animation_blendshapes.done", "response.animation_viseme.done"):
+                    pass
+                elif event_type == "session.updated":
+                    session = event.get("session") or {}
+                    await self._broadcast({"type": "session_updated", "ice_servers": self._session_ice_servers(session)})
+                elif self._wants("debug"):
                     await self._broadcast({"type": "event", "payload": event})
         except Exception as exc:  # pylint: disable=broad-except
             logger.exception("[%s] Azure Voice Live websocket receive loop ended with error", self.session_id)
+            self._notify_reply({"type": "error", "payload": {"message": str(exc)}})
             await self._broadcast({"type": "error", "payload": {"message": str(exc)}})
         finally:
             if self.ws is ws:
                 self.ws = None
+            # A streamed reply still waiting would otherwise never end
+            self._notify_reply({"type": "error", "payload": {"message": "Voice Live connection closed"}})
             logger.info("[%s] Azure Voice Live websocket closed", self.session_id)
 
+    async def _broadcast_animation(self, encode: Callable[[Any], bytes], event: Any) -> None:
+        try:
+            frame = encode(event)
+        except ValueError as exc:
+            # One bad frame is a glitch in the avatar's face, not a reason to end the session
+            logger.warning("[%s] Dropping animation frame: %s", self.session_id, exc)
+            return
+        await self._broadcast(frame, topic="animation")
+
+    @staticmethod
+    def _session_ice_servers(session: Dict[str, Any]) -> Optional[List[Any]]:
+        """ICE servers the avatar service handed out, wherever this API version puts them."""
+        for candidate in (
+            (session.get("avatar") or {}).get("ice_servers"),
+            (session.get("rtc") or {}).get("ice_servers"),
+            session.get("ice_servers"),
+        ):
+            if isinstance(candidate, list):
+                return candidate
+        return None
+
+    def _track_assistant_audio(self, event: Dict[str, Any]) -> None:
+        """Record how much assistant audio has been streamed for the current item."""
+        delta = event.get("delta") or ""
+        # base64 PCM16 at 24 kHz: 4 chars -> 3 bytes, 2 bytes per sample
+        delta_ms = len(delta) * 3 / 4 / 2 / 24
+        audio = self._assistant_audio
+        if audio is None or audio["item_id"] != event.get("item_id"):
+            audio = {
+                "item_id": event.get("item_id"),
+                "content_index": event.get("content_index", 0),
+                "started_at": time.monotonic(),
+                "sent_ms": 0.0,
+            }
+            self._assistant_audio = audio
+        audio["sent_ms"] += delta_ms
+        if self._conversation is not None:
+            self._conversation.add_assistant_audio(event.get("item_id"), delta_ms)
+
+    def _played_audio_ms(self) -> int:
+        """Estimate how much of the current assistant item the user has heard."""
+        audio = self._assistant_audio
+        if audio is None:
+            return 0
+        elapsed_ms = (time.monotonic() - audio["started_at"]) * 1000
+        return int(min(elapsed_ms, audio["sent_ms"]))
+
+    async def _handle_barge_in(self) -> None:
+        response_id = self._active_response_id
+        audio = self._assistant_audio
+        played_ms = self._played_audio_ms()
+        still_playing = audio is not None and played_ms < audio["sent_ms"]
+        if response_id is None and not still_playing and not self._tool_tasks:
+            return
+        logger.info(
+            "[%s] Barge-in: cancelling response=%s tools=%d played_ms=%d",
+            self.session_id,
+            response_id,
+            len(self._tool_tasks),
+            played_ms,
+        )
+        if response_id is not None:
+            self._cancelled_response_ids.add(response_id)
+            self._active_response_id = None
+            await self._send("response.cancel")
+        if audio is not None and still_playing:
+            await self._send(
+                "conversation.item.truncate",
+                {
+                    "item_id": audio["item_id"],
+                    "content_index": audio["content_index"],
+                    "audio_end_ms": played_ms,
+                },
+            )
+        self._assistant_audio = None
+        for task in list(self._tool_tasks):
+            task.cancel()
+        await self._broadcast({"type": "assistant_audio_flush"})
+
     async def _handle_response_done(self, event: Dict[str, Any]) -> None:
         response = event.get("response", {})
+        response_id = response.get("id")
+        if response_id == self._active_response_id:
+            self._active_response_id = None
+        self._cancelled_response_ids.discard(response_id)
         status = response.get("status")
+        output_items = response.get("output") or [{}]
+        first_item = output_items[0]
+        if status == "completed" and first_item.get("type") == "function_call":
+            # Run the tool off the receive loop so barge-in can still be observed and cancel it
+            task = asyncio.create_task(self._run_function_call(first_item))
+            self._tool_tasks.add(task)
+            task.add_done_callback(self._on_tool_task_done)
+            return
+        self._notify_reply({"type": "reply_done", "status": status})
         if status != "completed":
             await self._broadcast({"type": "response_status", "status": status})
+
+    async def _prune_conversation(self) -> None:
+        """Between turns, delete old items once the conversation outgrows its token budget."""
+        if self._conversation is None or not self._is_idle():
             return
-        output_items = response.get("output", [])
-        if not output_items:
+        deletions, summary = self._conversation.plan_prune()
+        if not deletions:
             return
-        first_item = output_items[0]
-        if first_item.get("type") != "function_call":
-            return
-        function_name = first_item.get("name")
-        arguments = json.loads(first_item.get("arguments", "{}"))
-        call_id = first_item.get("call_id")
+        logger.info(
+            "[%s] Pruning %d conversation items, ~%d tokens left (last input %s)",
+            self.session_id,
+            len(deletions),
+            self._conversation.tokens,
+            self._conversation.last_input_tokens,
+        )
+        if summary is not None:
+            await self._send("conversation.item.create", {"previous_item_id": "root", "item": summary})
+        for item_id in deletions:
+            await self._send("conversation.item.delete", {"item_id": item_id})
+
+    def _on_tool_task_done(self, task: asyncio.Task) -> None:
+        self._tool_tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("[%s] Function call task failed", self.session_id, exc_info=task.exception())
+            self._notify_reply({"type": "error", "payload": {"message": str(task.exception())}})
+
+    async def _run_function_call(self, item: Dict[str, Any]) -> None:
+        function_name = item.get("name")
+        call_id = item.get("call_id")
         logger.info("[%s] Function call requested: %s", self.session_id, function_name)
-        func = AVAILABLE_FUNCTIONS.get(function_name)
-        if not func:
+        if function_name not in self._tools:
             logger.error("Function %s is not registered", function_name)
+            self._notify_reply({"type": "reply_done", "status": "failed"})
             return
+        started = time.perf_counter()
         try:
-            loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(None, lambda: func(**arguments))
-        except Exception as exc:  # pylint: disable=broad-except
-            logger.exception("Function %s failed", function_name)
-            result = json.dumps({"error": str(exc)})
-        if not isinstance(result, str):
-            result_payload = json.dumps(result)
+            arguments = json.loads(item.get("arguments") or "{}")
+            if not isinstance(arguments, dict):
+                raise ValueError("arguments must be a JSON object")
+        except ValueError as exc:
+            # Malformed model output: answer the call with an error so the model can retry or apologise
+            logger.warning("[%s] Invalid arguments for %s: %s", self.session_id, function_name, exc)
+            arguments = {}
+            result = json.dumps({"error": f"Invalid arguments: {exc}"})
         else:
-            result_payload = result
+            result = await self._invoke_tool(function_name, call_id, arguments)
+        if self._recorder is not None:
+            elapsed_ms = round((time.perf_counter() - started) * 1000)
+            self._recorder.record(
+                "tool", {"name": function_name, "arguments": arguments, "result": result, "ms": elapsed_ms}
+            )
+        result_payload = compact_tool_output(function_name, arguments, result)
         await self._send(
             "conversation.item.create",
             {
@@ -466,4 +890,38 @@ class VoiceLiveSession:
             },
         )
         await self._send("response.create", {"response": self._response_config})
+        self._notify_reply({"type": "tool", "name": function_name})
         await self._broadcast({"type": "function_call_completed", "name": function_name})
+
+    async def _invoke_tool(self, function_name: str, call_id: Optional[str], arguments: Dict[str, Any]) -> Any:
+        try:
+            return await self._tools.invoke(function_name, arguments)
+        except ToolUnavailable as exc:
+            logger.warning("[%s] Function %s unavailable: %s", self.session_id, function_name, exc.detail)
+            return json.dumps(exc.to_output())
+        except asyncio.CancelledError:
+            logger.info("[%s] Function call %s cancelled", self.session_id, function_name)
+            # Answer the call anyway, or the conversation keeps an unanswered function_call item. Shielded so a
+            # second cancellation cannot skip it; no response.create, the user has the floor.
+            try:
+                await asyncio.shield(
+                    self._send(
+                        "conversation.item.create",
+                        {
+                            "item": {
+                                "type": "function_call_output",
+                                "call_id": call_id,
+                                "output": json.dumps({"error": "cancelled: user interrupted"}),
+                            }
+                        },
+                        allow_reconnect=False,
+                    )
+                )
+            except Exception:  # pylint: disable=broad-except
+                logger.warning("[%s] Could not answer cancelled call %s", self.session_id, call_id, exc_info=True)
+            self._notify_reply({"type": "reply_done", "status": "cancelled"})
+            await self._broadcast({"type": "function_call_cancelled", "name": function_name})
+            raise
+        except Exception as exc:  # pylint: disable=broad-except
+            logger.exception("Function %s failed", function_name)
+            return json.dumps({"error": str(exc)})
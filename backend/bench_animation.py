@@ -0,0 +1,111 @@
+"""
+Animation stream benchmark.
+Compares the generic JSON forwarding of avatar blendshape/viseme events with the
+packed binary frames from app/animation_codec.py: downstream bytes per second of
+animation and the CPU spent encoding them. Run from the backend directory:
+
+    python bench_animation.py --seconds 30 --fps 60
+"""
+import argparse
+import json
+import random
+import time
+
+from app.animation_codec import decode, encode_blendshapes, encode_visemes
+
+BLENDSHAPE_COUNT = 52  # ARKit-style blendshape set
+
+
+def synthetic_events(seconds: int, fps: int, frames_per_delta: int, visemes_per_second: int):
+    rng = random.Random(7)
+    events = []
+    for frame_index in range(0, seconds * fps, frames_per_delta):
+        events.append(
+            {
+                "type": "response.animation_blendshapes.delta",
+                "event_id": f"event_{frame_index}",
+                "response_id": "resp_bench",
+                "item_id": "item_bench",
+                "output_index": 0,
+                "content_index": 0,
+                "frame_index": frame_index,
+                "frames": [
+                    [round(rng.random(), 6) for _ in range(BLENDSHAPE_COUNT)] for _ in range(frames_per_delta)
+                ],
+            }
+        )
+    for index in range(seconds * visemes_per_second):
+        events.append(
+            {
+                "type": "response.animation_viseme.delta",
+                "event_id": f"viseme_{index}",
+                "response_id": "resp_bench",
+                "item_id": "item_bench",
+                "output_index": 0,
+                "content_index": 0,
+                "audio_offset_ms": index * 1000 // visemes_per_second,
+                "viseme_id": rng.randrange(22),
+            }
+        )
+    return events
+
+
+def run_json(events):
+    total = 0
+    started = time.process_time()
+    for seq, event in enumerate(events):
+        total += len(json.dumps({"type": "event", "payload": event, "seq": seq}).encode("utf-8"))
+    return total, time.process_time() - started
+
+
+def run_binary(events):
+    total = 0
+    started = time.process_time()
+    for event in events:
+        if event["type"] == "response.animation_blendshapes.delta":
+            total += len(encode_blendshapes(event))
+        else:
+            total += len(encode_visemes([event]))
+    return total, time.process_time() - started
+
+
+def max_error(events) -> float:
+    worst = 0.0
+    for event in events:
+        if event["type"] != "response.animation_blendshapes.delta":
+            continue
+        _, decoded = decode(encode_blendshapes(event))
+        for original, packed in zip(event["frames"], decoded["frames"]):
+            worst = max(worst, max(abs(a - float(b)) for a, b in zip(original, packed)))
+    return worst
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=int, default=30)
+    parser.add_argument("--fps", type=int, default=60)
+    parser.add_argument("--frames-per-delta", type=int, default=1)
+    parser.add_argument("--visemes-per-second", type=int, default=12)
+    args = parser.parse_args()
+
+    events = synthetic_events(args.seconds, args.fps, args.frames_per_delta, args.visemes_per_second)
+    json_bytes, json_cpu = run_json(events)
+    binary_bytes, binary_cpu = run_binary(events)
+    print(
+        json.dumps(
+            {
+                "events": len(events),
+                "json_bytes_per_sec": round(json_bytes / args.seconds),
+                "binary_bytes_per_sec": round(binary_bytes / args.seconds),
+                "bytes_saved_pct": round(100 * (1 - binary_bytes / json_bytes), 1),
+                "json_cpu_ms_per_sec": round(1000 * json_cpu / args.seconds, 3),
+                "binary_cpu_ms_per_sec": round(1000 * binary_cpu / args.seconds, 3),
+                "float16_max_abs_error": round(max_error(events), 6),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+"""
+Audio transcode offload benchmark.
+Streams microphone frames from N concurrent sessions through app/audio_pipeline.py
+and measures event-loop lag (how late a 5 ms timer fires) with transcoding inline
+on the loop, on a thread pool and on a process pool. ``--input binary`` sends raw
+PCM16 frames, as the capture worklet does; ``--input float32`` sends the legacy
+base64 float32 JSON chunks. Run from the backend directory:
+
+    python bench_audio_offload.py --input binary --streams 10 50 100 --seconds 5
+"""
+import argparse
+import asyncio
+import base64
+import json
+import statistics
+import time
+
+import numpy as np
+
+from app.audio_pipeline import AudioPipeline, _create_executor
+from app.audio_utils import TARGET_SAMPLE_RATE
+
+PROBE_INTERVAL = 0.005
+
+
+def make_frame(frame_ms: int, kind: str):
+    """(data, encoding) of one frame as the backend receives it."""
+    rng = np.random.default_rng(7)
+    samples = rng.uniform(-1.0, 1.0, TARGET_SAMPLE_RATE * frame_ms // 1000).astype(np.float32)
+    if kind == "binary":
+        return (samples * 32767).astype(np.int16).tobytes(), "pcm16"
+    return base64.b64encode(samples.tobytes()).decode("ascii"), "float32"
+
+
+async def measure(executor, streams: int, seconds: float, frame_ms: int, frame):
+    loop = asyncio.get_running_loop()
+    lags = []
+    appends = 0
+    running = True
+
+    async def probe() -> None:
+        while running:
+            expected = loop.time() + PROBE_INTERVAL
+            await asyncio.sleep(PROBE_INTERVAL)
+            lags.append(max(0.0, loop.time() - expected))
+
+    async def send(pcm_b64: str) -> None:
+        nonlocal appends
+        appends += 1
+        await asyncio.sleep(0)  # stands in for the upstream websocket write
+
+    async def stream(offset: float) -> None:
+        pipeline = AudioPipeline(send, executor)
+        started = loop.time() + offset
+        for index in range(int(seconds * 1000 / frame_ms)):
+            delay = started + index * frame_ms / 1000 - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await pipeline.submit(*frame)
+        await pipeline.flush()
+
+    probe_task = asyncio.create_task(probe())
+    cpu_started = time.process_time()
+    # Staggered so frames from different sessions don't all land on the same tick
+    await asyncio.gather(*(stream(i * frame_ms / 1000 / streams) for i in range(streams)))
+    cpu = time.process_time() - cpu_started
+    running = False
+    await probe_task
+    ordered = sorted(lags)
+    return {
+        "lag_p50_ms": round(1000 * statistics.median(ordered), 2),
+        "lag_p99_ms": round(1000 * ordered[int(len(ordered) * 0.99)], 2),
+        "lag_max_ms": round(1000 * ordered[-1], 2),
+        "appends": appends,
+        "process_cpu_s": round(cpu, 2),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--streams", type=int, nargs="+", default=[10, 25, 50])
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--frame-ms", type=int, default=20)
+    parser.add_argument("--modes", nargs="+", default=["inline", "thread", "process"])
+    parser.add_argument("--input", choices=["binary", "float32"], default="binary")
+    args = parser.parse_args()
+
+    frame = make_frame(args.frame_ms, args.input)
+    results = {}
+    for mode in args.modes:
+        executor = _create_executor(mode)
+        if executor is not None:
+            # Start the workers before measuring
+            executor.submit(int).result()
+        try:
+            for streams in args.streams:
+                results[f"{mode}/{streams}"] = asyncio.run(
+                    measure(executor, streams, args.seconds, args.frame_ms, frame)
+                )
+        finally:
+            if executor is not None:
+                executor.shutdown()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Endpoint pool benchmark.
+Starts local stand-in Voice Live websocket servers with injected handshake latency,
+points AZURE_VOICE_LIVE_ENDPOINTS at them and connects sessions through
+VoiceLiveSession. It reports connect times with a single (slow) endpoint and with
+the pool. It then stops the fastest stand-in to show failover and ejection, and
+restarts it to show it rejoining after the cool-down. Run from the backend directory:
+
+    python bench_endpoints.py --latency-ms 120 30 60 --sessions 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import time
+
+from websockets.asyncio.server import serve
+
+
+class StandIn:
+    """A websocket server that accepts after ``latency_ms`` and ignores whatever it is sent."""
+
+    def __init__(self, port: int, latency_ms: float):
+        self.port = port
+        self.latency_ms = latency_ms
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    async def _process_request(self, connection, request):  # pylint: disable=unused-argument
+        await asyncio.sleep(self.latency_ms / 1000)
+
+    @staticmethod
+    async def _handler(websocket):
+        async for _ in websocket:
+            pass
+
+    async def start(self) -> None:
+        self._server = await serve(self._handler, "127.0.0.1", self.port, process_request=self._process_request)
+
+    async def stop(self) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+
+
+async def connect_times(count: int):
+    from app.voice_live_client import VoiceLiveSession
+
+    times, endpoints = [], []
+    for index in range(count):
+        session = VoiceLiveSession(f"bench-{index}")
+        started = time.perf_counter()
+        await session.connect()
+        times.append((time.perf_counter() - started) * 1000)
+        endpoints.append(session.endpoint)
+        await session.disconnect()
+    return {
+        "connect_ms_p50": round(statistics.median(times), 1),
+        "connect_ms_max": round(max(times), 1),
+        "endpoints": {url: endpoints.count(url) for url in dict.fromkeys(endpoints)},
+    }
+
+
+async def run(latencies, sessions: int, base_port: int, cooldown: float):
+    from app import endpoint_pool
+
+    standins = [StandIn(base_port + index, latency) for index, latency in enumerate(latencies)]
+    for standin in standins:
+        await standin.start()
+    results = {}
+    try:
+        os.environ["AZURE_VOICE_LIVE_ENDPOINTS"] = standins[0].url
+        results["single_endpoint"] = await connect_times(sessions)
+        await endpoint_pool.shutdown_endpoint_pool()
+
+        os.environ["AZURE_VOICE_LIVE_ENDPOINTS"] = ",".join(standin.url for standin in standins)
+        pool = endpoint_pool.get_endpoint_pool()
+        pool.start()
+        await pool.probe_all()
+        results["pool"] = await connect_times(sessions)
+
+        fastest = pool.ranked()[0]
+        standin = next(standin for standin in standins if standin.url == fastest.url)
+        await standin.stop()
+        results["fastest_down"] = await connect_times(sessions)
+        results["fastest_down"]["stats"] = pool.stats()[fastest.url]
+
+        await standin.start()
+        await asyncio.sleep(cooldown + pool.probe_interval)
+        results["fastest_back"] = await connect_times(sessions)
+        results["pool_stats"] = pool.stats()
+    finally:
+        await endpoint_pool.shutdown_endpoint_pool()
+        for standin in standins:
+            try:
+                await standin.stop()
+            except Exception:  # pylint: disable=broad-except
+                pass
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency-ms", type=float, nargs="+", default=[120, 30, 60], help="first one is the baseline")
+    parser.add_argument("--sessions", type=int, default=10)
+    parser.add_argument("--base-port", type=int, default=18700)
+    parser.add_argument("--cooldown", type=float, default=3.0)
+    args = parser.parse_args()
+
+    os.environ.update(
+        {
+            "VOICE_LIVE_MODEL": "stand-in",
+            "AZURE_OPENAI_API_KEY": "stand-in",
+            "AZURE_VOICE_AVATAR_ENABLED": "false",
+            "AZURE_VOICE_LIVE_PROBE_INTERVAL_SECONDS": "0.5",
+            "AZURE_VOICE_LIVE_EJECT_SECONDS": str(args.cooldown),
+        }
+    )
+    os.environ.pop("VOICE_LIVE_CAPTURE_DIR", None)
+    print(json.dumps(asyncio.run(run(args.latency_ms, args.sessions, args.base_port, args.cooldown)), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Startup benchmark for the backend container.
+Measures time from process start to the first 200 from /health, and can print
+an import-time profile of app.main. Run from the backend directory:
+
+    python bench_startup.py --runs 5
+    python bench_startup.py --importtime
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def time_to_ready(timeout: float) -> float:
+    """Start uvicorn and return seconds until /health answers 200."""
+    port = _free_port()
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port)],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError(f"uvicorn exited with code {proc.returncode}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except OSError:
+                pass
+            time.sleep(0.01)
+        raise TimeoutError(f"/health not ready after {timeout}s")
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def import_profile(top: int) -> None:
+    """Print the slowest modules (cumulative microseconds) imported by app.main."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = [part.strip() for part in line[len("import time:"):].split("|")]
+        rows.append((int(cumulative_us), int(self_us), name))
+    rows.sort(reverse=True)
+    print(f"{'cumulative ms':>14} {'self ms':>8}  module")
+    for cumulative_us, self_us, name in rows[:top]:
+        print(f"{cumulative_us / 1000:14.1f} {self_us / 1000:8.1f}  {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backend startup benchmark")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--importtime", action="store_true", help="print an import-time profile instead")
+    parser.add_argument("--top", type=int, default=25)
+    args = parser.parse_args()
+
+    if args.importtime:
+        import_profile(args.top)
+        return
+
+    samples = []
+    for run in range(args.runs):
+        elapsed = time_to_ready(args.timeout)
+        samples.append(elapsed)
+        print(f"run {run + 1}: {elapsed * 1000:.0f} ms to first /health 200")
+    print(
+        json.dumps(
+            {
+                "metric": "time_to_ready_ms",
+                "median": round(statistics.median(samples) * 1000, 1),
+                "min": round(min(samples) * 1000, 1),
+                "max": round(max(samples) * 1000, 1),
+                "runs": len(samples),
+            }
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,12 @@
+import pytest
+
+
+@pytest.fixture
+def voice_live_env(monkeypatch):
+    """Settings for sessions against a local stand-in; the test points AZURE_VOICE_LIVE_ENDPOINTS at it."""
+    monkeypatch.setenv("VOICE_LIVE_MODEL", "stand-in")
+    monkeypatch.setenv("AZURE_OPENAI_API_KEY", "stand-in")
+    monkeypatch.setenv("AZURE_VOICE_AVATAR_ENABLED", "false")
+    monkeypatch.delenv("AZURE_VOICE_LIVE_ENDPOINT", raising=False)
+    monkeypatch.delenv("VOICE_LIVE_CAPTURE_DIR", raising=False)
+    return monkeypatch
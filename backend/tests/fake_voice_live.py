@@ -0,0 +1,61 @@
+"""A local stand-in for the Voice Live realtime websocket, scripted per test."""
+import asyncio
+import json
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from websockets.asyncio.server import ServerConnection, serve
+
+from app.endpoint_pool import shutdown_endpoint_pool
+
+# Called with the connection and each client event; may send events back
+Script = Callable[[ServerConnection, Dict[str, Any]], Awaitable[None]]
+
+
+class FakeVoiceLive:
+    def __init__(self, script: Optional[Script] = None, refuse_with: Optional[int] = None):
+        self.script = script
+        # Answer every handshake with this HTTP status instead of upgrading
+        self.refuse_with = refuse_with
+        self.received: List[Dict[str, Any]] = []
+        self.connections: List[ServerConnection] = []
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        port = self._server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}"
+
+    async def _handler(self, connection: ServerConnection) -> None:
+        self.connections.append(connection)
+        async for message in connection:
+            event = json.loads(message)
+            self.received.append(event)
+            if self.script is not None:
+                await self.script(connection, event)
+
+    def _process_request(self, connection: ServerConnection, request):
+        if self.refuse_with is not None:
+            return connection.respond(self.refuse_with, "refused\n")
+        return None
+
+    def sent(self, event_type: str) -> List[Dict[str, Any]]:
+        return [event for event in self.received if event["type"] == event_type]
+
+    async def __aenter__(self) -> "FakeVoiceLive":
+        await shutdown_endpoint_pool()
+        self._server = await serve(self._handler, "127.0.0.1", 0, process_request=self._process_request)
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+        await shutdown_endpoint_pool()
+
+
+async def send_event(connection: ServerConnection, event_type: str, **fields: Any) -> None:
+    await connection.send(json.dumps({"type": event_type, **fields}))
+
+
+async def settle(seconds: float = 0.05) -> None:
+    """Let the session's receive loop catch up with what the stand-in sent."""
+    await asyncio.sleep(seconds)
@@ -0,0 +1,52 @@
+import asyncio
+
+import pytest
+
+from app.admission import AdmissionController, AdmissionRejected
+
+
+def test_concurrent_connects_cannot_exceed_session_cap():
+    admission = AdmissionController()
+    admission.max_sessions = 2
+    registered = []
+
+    async def create():
+        async with admission.connect_slot(len(registered)):
+            await asyncio.sleep(0.05)
+            registered.append(object())
+
+    async def scenario():
+        return await asyncio.gather(*(create() for _ in range(6)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    rejected = [result for result in results if isinstance(result, AdmissionRejected)]
+    assert len(registered) == 2
+    assert len(rejected) == 4
+    assert {result.detail for result in rejected} == {"Session capacity reached"}
+
+
+def test_reservations_are_released_after_failed_connects():
+    admission = AdmissionController()
+    admission.max_sessions = 1
+
+    async def scenario():
+        for _ in range(3):
+            with pytest.raises(RuntimeError):
+                async with admission.connect_slot(0):
+                    raise RuntimeError("upstream refused")
+        async with admission.connect_slot(0):
+            pass
+
+    asyncio.run(scenario())
+
+
+def test_timeout_in_the_body_uses_the_callers_message():
+    admission = AdmissionController()
+
+    async def scenario():
+        async with admission.connect_slot(0, timeout_detail="Session bootstrap timed out"):
+            await asyncio.wait_for(asyncio.sleep(1), timeout=0.01)
+
+    with pytest.raises(AdmissionRejected) as rejected:
+        asyncio.run(scenario())
+    assert rejected.value.detail == "Session bootstrap timed out"
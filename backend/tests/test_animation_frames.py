@@ -0,0 +1,45 @@
+import asyncio
+import json
+
+import pytest
+
+from app import animation_codec
+from app.event_log import TOPICS
+from app.voice_live_client import VoiceLiveSession
+from fake_voice_live import FakeVoiceLive, send_event
+
+
+def test_encode_blendshapes_rejects_ragged_frames():
+    with pytest.raises(ValueError):
+        animation_codec.encode_blendshapes({"frames": [[0.1, 0.2], [0.3]]})
+    with pytest.raises(ValueError):
+        animation_codec.encode_blendshapes({"frames": [["a", None]]})
+
+
+def test_ragged_frames_do_not_end_the_receive_loop(voice_live_env):
+    async def reply(connection, event):
+        if event["type"] == "response.create":
+            await send_event(connection, "response.animation_blendshapes.delta", frames=[[0.1, 0.2], [0.3]])
+            await send_event(connection, "response.animation_blendshapes.delta", frames=[[0.5, 0.25]], frame_index=7)
+            await send_event(connection, "response.audio_transcript.delta", delta="hello", item_id="item_1")
+
+    async def scenario():
+        async with FakeVoiceLive(reply) as upstream:
+            voice_live_env.setenv("AZURE_VOICE_LIVE_ENDPOINTS", upstream.url)
+            session = VoiceLiveSession("animation-test")
+            await session.connect()
+            try:
+                subscription = session.subscribe(topics=TOPICS)
+                await session.send_user_message("hi")
+                received = []
+                while not any(isinstance(payload, str) and "hello" in payload for payload in received):
+                    received += await asyncio.wait_for(subscription.next_batch(), timeout=2)
+                frames = [payload for payload in received if isinstance(payload, bytes)]
+                assert len(frames) == 1
+                kind, decoded = animation_codec.decode(frames[0])
+                assert kind == animation_codec.KIND_BLENDSHAPES and decoded["frame_index"] == 7
+                assert "error" not in [json.loads(p)["type"] for p in received if isinstance(p, str)]
+            finally:
+                await session.disconnect()
+
+    asyncio.run(scenario())
@@ -0,0 +1,74 @@
+import asyncio
+import base64
+import json
+
+from aiortc import RTCPeerConnection, RTCSessionDescription
+from websockets.asyncio.server import serve
+
+from app import avatar_probe
+from app.avatar_probe import CapabilityCache, probe_many
+
+
+async def mock_voice_live(connection):
+    """Accepts "lisa", rejects "nobody", never answers for "slow" and fails transiently for "flaky"."""
+    await connection.send(json.dumps({"type": "session.created"}))
+    character = None
+    async for message in connection:
+        event = json.loads(message)
+        if event["type"] == "session.update":
+            character = event["session"]["avatar"]["character"]
+            await connection.send(json.dumps({"type": "session.updated", "session": event["session"]}))
+        elif event["type"] == "session.avatar.connect":
+            if character == "nobody":
+                error = {"code": "avatar_verification_failed", "message": "Character not found"}
+                await connection.send(json.dumps({"type": "error", "error": error}))
+            elif character == "flaky":
+                error = {"code": "internal_error", "message": "Service temporarily unavailable"}
+                await connection.send(json.dumps({"type": "error", "error": error}))
+            elif character == "lisa":
+                offer = json.loads(base64.b64decode(event["client_sdp"]))
+                pc = RTCPeerConnection()
+                await pc.setRemoteDescription(RTCSessionDescription(sdp=offer["sdp"], type="offer"))
+                await pc.setLocalDescription(await pc.createAnswer())
+                answer = json.dumps({"type": "answer", "sdp": pc.localDescription.sdp})
+                await connection.send(
+                    json.dumps({"type": "session.avatar.connecting", "server_sdp": base64.b64encode(answer.encode()).decode()})
+                )
+                await pc.close()
+
+
+def test_probe_caches_only_verdicts_on_the_character(tmp_path):
+    cache = CapabilityCache(tmp_path / "capabilities.json", ttl_seconds=3600)
+
+    async def scenario():
+        async with serve(mock_voice_live, "127.0.0.1", 0) as server:
+            endpoint = f"ws://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+            combinations = [(name, "casual", 1280, 720) for name in ("lisa", "nobody", "slow", "flaky")]
+            results = await probe_many(combinations, cache=cache, endpoint=endpoint, api_key="test", timeout=0.5)
+            return endpoint, {outcome.character: outcome for outcome in results}
+
+    endpoint, results = asyncio.run(scenario())
+    assert results["lisa"].valid and results["lisa"].definite
+    assert not results["nobody"].valid and results["nobody"].message.startswith("Not found")
+    assert results["slow"].message.startswith("Timeout")
+    assert results["flaky"].message == "Error: Service temporarily unavailable"
+
+    assert cache.get(endpoint, "lisa", "casual", 1280, 720)["valid"] is True
+    assert cache.get(endpoint, "nobody", "casual", 1280, 720)["valid"] is False
+    assert cache.get(endpoint, "slow", "casual", 1280, 720) is None
+    assert cache.get(endpoint, "flaky", "casual", 1280, 720) is None
+    assert json.loads((tmp_path / "capabilities.json").read_text())
+
+
+def test_capability_covers_every_pool_endpoint(tmp_path, monkeypatch):
+    cache = CapabilityCache(tmp_path / "capabilities.json", ttl_seconds=3600)
+    monkeypatch.setattr(avatar_probe, "_cache", cache)
+    monkeypatch.delenv("AZURE_VOICE_LIVE_ENDPOINT", raising=False)
+    monkeypatch.setenv("AZURE_VOICE_LIVE_ENDPOINTS", "https://east.example,https://west.example")
+    cache.put("https://east.example", avatar_probe.ProbeResult("lisa", None, 1280, 720, False, "Not found", True))
+    assert avatar_probe.avatar_capability("lisa", None, 1280, 720) is False
+
+    cache.put("https://west.example", avatar_probe.ProbeResult("lisa", None, 1280, 720, True, "Valid", True))
+    assert avatar_probe.avatar_capability("lisa", None, 1280, 720) is True
+    assert avatar_probe.known_valid_avatar(1280, 720) == ("lisa", None)
+    assert avatar_probe.avatar_capability("james", None, 1280, 720) is None
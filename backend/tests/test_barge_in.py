@@ -0,0 +1,58 @@
+import asyncio
+import json
+
+from app.voice_live_client import VoiceLiveSession
+from fake_voice_live import FakeVoiceLive, send_event, settle
+
+
+class HangingTools:
+    """A tool runtime whose calls never finish on their own."""
+
+    def __contains__(self, name: str) -> bool:
+        return True
+
+    async def invoke(self, name, arguments):
+        await asyncio.Event().wait()
+
+
+def test_barge_in_answers_the_cancelled_tool_call(voice_live_env):
+    responses = []
+
+    async def script(connection, event):
+        if event["type"] == "response.create" and not responses:
+            responses.append(event)
+            await send_event(
+                connection,
+                "response.done",
+                response={
+                    "id": "resp-1",
+                    "status": "completed",
+                    "output": [{"type": "function_call", "name": "search", "call_id": "call-1", "arguments": "{}"}],
+                },
+            )
+
+    async def scenario():
+        async with FakeVoiceLive(script) as upstream:
+            voice_live_env.setenv("AZURE_VOICE_LIVE_ENDPOINTS", upstream.url)
+            session = VoiceLiveSession("barge-in")
+            session._tools = HangingTools()  # pylint: disable=protected-access
+            await session.connect()
+            try:
+                await session.send_user_message("look this up")
+                await settle()
+                assert session._tool_tasks  # pylint: disable=protected-access
+                await send_event(upstream.connections[0], "input_audio_buffer.speech_started")
+                await settle()
+                assert not session._tool_tasks  # pylint: disable=protected-access
+            finally:
+                await session.disconnect()
+
+            created = [event["item"] for event in upstream.sent("conversation.item.create")]
+            outputs = [item for item in created if item["type"] == "function_call_output"]
+            assert len(outputs) == 1
+            assert outputs[0]["call_id"] == "call-1"
+            assert json.loads(outputs[0]["output"]) == {"error": "cancelled: user interrupted"}
+            # The user has the floor: no new response after the cancelled call
+            assert len(upstream.sent("response.create")) == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,105 @@
+from app.conversation import SUMMARY_HEADER, ConversationWindow
+
+# 400 ASCII characters estimate to 100 tokens, plus 4 per item
+TEXT = "a" * 400
+ITEM_TOKENS = 104
+
+
+def _message(window: ConversationWindow, item_id: str, role: str, text: str = TEXT) -> None:
+    content_type = "input_text" if role == "user" else "text"
+    window.observe(
+        {
+            "type": "conversation.item.created",
+            "item": {"id": item_id, "type": "message", "role": role, "content": [{"type": content_type, "text": text}]},
+        }
+    )
+
+
+def _tool_call(window: ConversationWindow, call_id: str) -> None:
+    window.observe(
+        {
+            "type": "conversation.item.created",
+            "item": {"id": f"fc_{call_id}", "type": "function_call", "name": "search", "call_id": call_id, "arguments": TEXT},
+        }
+    )
+    window.observe(
+        {
+            "type": "conversation.item.created",
+            "item": {"id": f"fo_{call_id}", "type": "function_call_output", "call_id": call_id, "output": TEXT},
+        }
+    )
+
+
+def _apply(window: ConversationWindow, deletions, summary) -> None:
+    """Echo what Voice Live answers to the events the session sends for a prune."""
+    if summary is not None:
+        window.observe({"type": "conversation.item.created", "previous_item_id": "root", "item": summary})
+    for item_id in deletions:
+        window.observe({"type": "conversation.item.deleted", "item_id": item_id})
+
+
+def test_window_within_budget_is_left_alone():
+    window = ConversationWindow(budget=4 * ITEM_TOKENS, keep_turns=1)
+    for turn in range(2):
+        _message(window, f"u{turn}", "user")
+        _message(window, f"a{turn}", "assistant")
+    assert window.tokens == window.budget
+
+    assert window.plan_prune() == ([], None)
+    assert window.prunes == 0
+    assert window.stats()["items"] == 4
+
+
+def test_protected_turns_are_never_pruned():
+    window = ConversationWindow(budget=ITEM_TOKENS, keep_turns=2)
+    _message(window, "u0", "user")
+    _message(window, "a0", "assistant")
+    _message(window, "u1", "user")
+
+    assert window.plan_prune() == ([], None)
+
+
+def test_tool_pairs_go_first_and_deletions_follow_conversation_order():
+    window = ConversationWindow(budget=5 * ITEM_TOKENS, keep_turns=1)
+    _message(window, "u0", "user")
+    _message(window, "a0", "assistant")
+    _tool_call(window, "c0")
+    _message(window, "u1", "user")
+    _message(window, "a1", "assistant")
+
+    deletions, summary = window.plan_prune()
+
+    # The call and its output leave together; then the oldest turn until below the low-water mark
+    assert deletions == ["u0", "fc_c0", "fo_c0"]
+    assert window.tokens <= int(window.budget * window.low_water)
+    text = summary["content"][0]["text"]
+    assert text.startswith(SUMMARY_HEADER)
+    assert "- User: " in text and "- Tool search was called with " in text
+    assert window.plan_prune() == ([], None)
+
+
+def test_summary_is_replaced_not_stacked():
+    window = ConversationWindow(budget=3 * ITEM_TOKENS, keep_turns=1)
+    _message(window, "u0", "user", "first question")
+    _message(window, "a0", "assistant")
+    _message(window, "u1", "user")
+    _message(window, "a1", "assistant")
+
+    deletions, first = window.plan_prune()
+    assert deletions == ["u0", "a0"]
+    _apply(window, deletions, first)
+    assert next(iter(window._items)) == first["id"]  # pylint: disable=protected-access
+
+    _message(window, "u2", "user", "second question")
+    _message(window, "a2", "assistant")
+    deletions, second = window.plan_prune()
+
+    # The old summary goes with this round's deletions and its lines move into the new one
+    assert deletions[-1] == first["id"]
+    assert second["id"] != first["id"]
+    text = second["content"][0]["text"]
+    assert text.count(SUMMARY_HEADER) == 1
+    assert "first question" in text
+    _apply(window, deletions, second)
+    summaries = [item_id for item_id in window._items if item_id.startswith("summary_")]  # pylint: disable=protected-access
+    assert summaries == [second["id"]]
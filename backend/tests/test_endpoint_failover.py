@@ -0,0 +1,56 @@
+import asyncio
+
+import pytest
+from websockets.exceptions import InvalidStatus
+
+from app.endpoint_pool import get_endpoint_pool
+from app.voice_live_client import VoiceLiveSession
+from fake_voice_live import FakeVoiceLive
+
+
+def _state(url: str):
+    return next(state for state in get_endpoint_pool().endpoints if state.url == url)
+
+
+def test_server_error_fails_over_and_counts_against_the_endpoint(voice_live_env):
+    async def scenario():
+        async with FakeVoiceLive(refuse_with=503) as broken, FakeVoiceLive() as healthy:
+            voice_live_env.setenv("AZURE_VOICE_LIVE_ENDPOINTS", f"{broken.url},{healthy.url}")
+            session = VoiceLiveSession("failover-503")
+            await session.connect()
+            try:
+                assert session.endpoint == healthy.url
+                assert _state(broken.url).failures == 1
+            finally:
+                await session.disconnect()
+
+    asyncio.run(scenario())
+
+
+def test_rate_limited_endpoint_is_not_ejected_or_failed_over(voice_live_env):
+    async def scenario():
+        async with FakeVoiceLive(refuse_with=429) as throttled, FakeVoiceLive() as other:
+            voice_live_env.setenv("AZURE_VOICE_LIVE_ENDPOINTS", f"{throttled.url},{other.url}")
+            for attempt in range(3):
+                session = VoiceLiveSession(f"throttled-{attempt}")
+                with pytest.raises(InvalidStatus):
+                    await session.connect()
+                assert session.endpoint is None
+            assert _state(throttled.url).failures == 0
+
+    asyncio.run(scenario())
+
+
+def test_refused_credentials_try_the_next_endpoint_without_ejecting(voice_live_env):
+    async def scenario():
+        async with FakeVoiceLive(refuse_with=401) as refusing, FakeVoiceLive() as other:
+            voice_live_env.setenv("AZURE_VOICE_LIVE_ENDPOINTS", f"{refusing.url},{other.url}")
+            session = VoiceLiveSession("refused-401")
+            await session.connect()
+            try:
+                assert session.endpoint == other.url
+                assert _state(refusing.url).failures == 0
+            finally:
+                await session.disconnect()
+
+    asyncio.run(scenario())
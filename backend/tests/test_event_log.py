@@ -0,0 +1,92 @@
+import asyncio
+import json
+
+import pytest
+
+from app.event_log import DEFAULT_TOPICS, TOPICS, EventLog, parse_topics
+
+
+def _batch(subscription):
+    return asyncio.run(asyncio.wait_for(subscription.next_batch(), timeout=1))
+
+
+def _decoded(batch):
+    return [payload if isinstance(payload, bytes) else json.loads(payload) for payload in batch]
+
+
+def test_events_are_numbered_and_serialized_once():
+    log = EventLog()
+    first = {"type": "speech_started"}
+    assert log.append(first, "session") == 1
+    assert log.append({"type": "speech_stopped"}, "session") == 2
+    assert first["seq"] == 1 and log.last_seq == 2
+
+    batch = _decoded(_batch(log.subscribe(after_seq=0)))
+    assert [event["seq"] for event in batch] == [1, 2]
+
+
+def test_overflow_is_reported_as_a_gap_before_what_is_retained():
+    log = EventLog(capacity=4)
+    for index in range(6):
+        log.append({"type": "tick", "index": index}, "session")
+
+    batch = _decoded(_batch(log.subscribe(after_seq=0)))
+
+    assert batch[0] == {"type": "events_lost", "count": 2}
+    assert [event["seq"] for event in batch[1:]] == [3, 4, 5, 6]
+
+
+def test_subscribers_only_get_their_topics_and_untopical_events():
+    log = EventLog()
+    log.append({"type": "assistant_audio_delta"}, "audio")
+    log.append({"type": "user_transcript_completed"}, "transcripts")
+    log.append({"type": "error"})
+
+    batch = _decoded(_batch(log.subscribe(after_seq=0, topics=frozenset({"transcripts"}))))
+
+    assert [event["type"] for event in batch] == ["user_transcript_completed", "error"]
+
+
+def test_replay_skips_binary_frames_but_live_ones_go_out():
+    log = EventLog()
+    log.append({"type": "assistant_text_delta"}, "transcripts")
+    log.append(b"\x01stale-frame", "animation")
+    log.append({"type": "assistant_text_done"}, "transcripts")
+    subscription = log.subscribe(after_seq=1, topics=TOPICS)
+
+    assert [event["seq"] for event in _decoded(_batch(subscription))] == [3]
+
+    log.append(b"\x01live-frame", "animation")
+    assert _batch(subscription) == [b"\x01live-frame"]
+
+
+def test_subscribing_without_last_seq_starts_from_now():
+    log = EventLog()
+    log.append({"type": "old"}, "session")
+    subscription = log.subscribe()
+
+    async def scenario():
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(subscription.next_batch(), timeout=0.05)
+        asyncio.get_running_loop().call_soon(log.append, {"type": "new"}, "session")
+        return await asyncio.wait_for(subscription.next_batch(), timeout=1)
+
+    assert [event["type"] for event in _decoded(asyncio.run(scenario()))] == ["new"]
+
+
+def test_last_seq_ahead_of_the_log_is_clamped():
+    # A client resuming against a restarted session must not wait for sequence numbers that never come
+    log = EventLog()
+    log.append({"type": "first"}, "session")
+    subscription = log.subscribe(after_seq=100)
+    assert subscription.cursor == 1
+
+    log.append({"type": "second"}, "session")
+    assert [event["seq"] for event in _decoded(_batch(subscription))] == [2]
+
+
+def test_parse_topics():
+    assert parse_topics(None) == DEFAULT_TOPICS
+    assert "animation" not in DEFAULT_TOPICS
+    assert parse_topics("animation, audio,bogus") == frozenset({"animation", "audio"})
+    assert parse_topics("") == frozenset()
@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+from app import main
+from app.admission import AdmissionRejected
+from fake_voice_live import FakeVoiceLive
+
+
+def test_closed_sessions_free_capacity(voice_live_env):
+    voice_live_env.setenv("SESSION_ORPHAN_GRACE_SECONDS", "0")
+    voice_live_env.setattr(main.admission, "max_sessions", 3)
+
+    async def scenario():
+        async with FakeVoiceLive() as upstream:
+            voice_live_env.setenv("AZURE_VOICE_LIVE_ENDPOINTS", upstream.url)
+            try:
+                for _ in range(3 * main.admission.max_sessions):
+                    created = await main.create_session(None)
+                    session = await main.session_manager.get_session(created.session_id)
+                    # A page that connects its WebSocket and goes away
+                    session.unsubscribe(session.subscribe())
+                    main.admission.check_text(created.session_id)
+                    assert await main.reap_idle_sessions() == 1
+                assert await main.session_manager.list_session_ids() == []
+                assert not main.admission._text_buckets  # pylint: disable=protected-access
+            finally:
+                for session_id in await main.session_manager.list_session_ids():
+                    await main._close_session(session_id)  # pylint: disable=protected-access
+
+    asyncio.run(scenario())
+
+
+def test_connected_sessions_still_count(voice_live_env):
+    voice_live_env.setenv("SESSION_ORPHAN_GRACE_SECONDS", "30")
+    voice_live_env.setattr(main.admission, "max_sessions", 2)
+
+    async def scenario():
+        async with FakeVoiceLive() as upstream:
+            voice_live_env.setenv("AZURE_VOICE_LIVE_ENDPOINTS", upstream.url)
+            try:
+                for _ in range(2):
+                    created = await main.create_session(None)
+                    (await main.session_manager.get_session(created.session_id)).subscribe()
+                assert await main.reap_idle_sessions() == 0
+                with pytest.raises(AdmissionRejected):
+                    await main.create_session(None)
+            finally:
+                for session_id in await main.session_manager.list_session_ids():
+                    await main._close_session(session_id)  # pylint: disable=protected-access
+
+    asyncio.run(scenario())
+
+
+def test_session_whose_upstream_closed_is_reaped_without_grace(voice_live_env):
+    voice_live_env.setenv("SESSION_ORPHAN_GRACE_SECONDS", "30")
+
+    async def scenario():
+        async with FakeVoiceLive() as upstream:
+            voice_live_env.setenv("AZURE_VOICE_LIVE_ENDPOINTS", upstream.url)
+            created = await main.create_session(None)
+            session = await main.session_manager.get_session(created.session_id)
+            session.unsubscribe(session.subscribe())
+            await upstream.connections[0].close()
+            await asyncio.sleep(0.1)
+            assert session.upstream_closed
+            assert await main.reap_idle_sessions() == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,68 @@
+import asyncio
+
+from app.voice_live_client import TEXT_MODE, VoiceLiveSession
+from fake_voice_live import FakeVoiceLive, send_event
+
+
+async def _collect(session: VoiceLiveSession, text: str):
+    return [event async for event in session.stream_text_reply(text)]
+
+
+def test_reply_ends_when_upstream_closes_mid_reply(voice_live_env):
+    async def script(connection, event):
+        if event["type"] == "response.create":
+            await send_event(connection, "response.text.delta", delta="Hel", item_id="item-1")
+            await connection.close()
+
+    async def scenario():
+        async with FakeVoiceLive(script) as upstream:
+            voice_live_env.setenv("AZURE_VOICE_LIVE_ENDPOINTS", upstream.url)
+            session = VoiceLiveSession("text-close", mode=TEXT_MODE)
+            await session.connect()
+            try:
+                events = await asyncio.wait_for(_collect(session, "hello"), timeout=5)
+            finally:
+                await session.disconnect()
+        assert [event["type"] for event in events] == ["text_delta", "error"]
+        assert events[0]["delta"] == "Hel"
+
+    asyncio.run(scenario())
+
+
+def test_reply_times_out_when_upstream_goes_quiet(voice_live_env):
+    voice_live_env.setenv("TEXT_REPLY_TIMEOUT_SECONDS", "0.2")
+
+    async def scenario():
+        async with FakeVoiceLive() as upstream:
+            voice_live_env.setenv("AZURE_VOICE_LIVE_ENDPOINTS", upstream.url)
+            session = VoiceLiveSession("text-quiet", mode=TEXT_MODE)
+            await session.connect()
+            try:
+                events = await asyncio.wait_for(_collect(session, "hello"), timeout=5)
+            finally:
+                await session.disconnect()
+        assert [event["type"] for event in events] == ["error"]
+
+    asyncio.run(scenario())
+
+
+def test_text_session_without_subscribers_logs_nothing(voice_live_env):
+    async def script(connection, event):
+        if event["type"] == "response.create":
+            await send_event(connection, "response.text.delta", delta="Hi", item_id="item-1")
+            await send_event(connection, "response.text.done", text="Hi", item_id="item-1")
+            await send_event(connection, "response.done", response={"status": "completed"})
+
+    async def scenario():
+        async with FakeVoiceLive(script) as upstream:
+            voice_live_env.setenv("AZURE_VOICE_LIVE_ENDPOINTS", upstream.url)
+            session = VoiceLiveSession("text-quiet-log", mode=TEXT_MODE)
+            await session.connect()
+            try:
+                events = await asyncio.wait_for(_collect(session, "hello"), timeout=5)
+            finally:
+                await session.disconnect()
+        assert events[-1] == {"type": "reply_done", "status": "completed"}
+        assert session.last_event_seq == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,275 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.tool_runtime import DEFAULT_POLICY, ToolExecutor, ToolUnavailable
+
+
+def _executor(func, **policy) -> ToolExecutor:
+    executor = ToolExecutor("stand_in", func, {**DEFAULT_POLICY, **policy})
+    executor.breaker.failure_threshold = 2
+    executor.breaker.reset_timeout = 0.05
+    return executor
+
+
+def test_breaker_opens_then_probes_and_closes():
+    healthy = threading.Event()
+
+    def flaky():
+        if not healthy.is_set():
+            raise RuntimeError("backend down")
+        return "ok"
+
+    executor = _executor(flaky)
+
+    async def scenario():
+        for _ in range(2):
+            with pytest.raises(RuntimeError):
+                await executor.call({})
+        assert executor.breaker.state == "open"
+        with pytest.raises(ToolUnavailable) as refused:
+            await executor.call({})
+        assert refused.value.reason == "circuit_open"
+
+        await asyncio.sleep(0.06)
+        healthy.set()
+        assert await executor.call({}) == "ok"
+        assert executor.breaker.state == "closed"
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        executor.shutdown()
+    assert executor.stats()["short_circuited"] == 1
+
+
+def test_failed_probe_reopens_the_breaker():
+    def broken():
+        raise RuntimeError("still down")
+
+    executor = _executor(broken)
+
+    async def scenario():
+        for _ in range(2):
+            with pytest.raises(RuntimeError):
+                await executor.call({})
+        await asyncio.sleep(0.06)
+        with pytest.raises(RuntimeError):
+            await executor.call({})
+        assert executor.breaker.state == "open"
+        with pytest.raises(ToolUnavailable):
+            await executor.call({})
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        executor.shutdown()
+
+
+def test_cancelled_probe_lets_the_next_call_probe():
+    release = threading.Event()
+    calls = []
+
+    def slow():
+        calls.append(1)
+        if len(calls) == 1:
+            release.wait(5)
+        return "ok"
+
+    executor = _executor(slow)
+
+    async def scenario():
+        executor.breaker.record_failure()
+        executor.breaker.record_failure()
+        await asyncio.sleep(0.06)
+        probe = asyncio.create_task(executor.call({}))
+        await asyncio.sleep(0.05)
+        assert executor.breaker.state == "half_open"
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+        release.set()
+        assert await executor.call({}) == "ok"
+        assert executor.breaker.state == "closed"
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        release.set()
+        executor.shutdown()
+
+
+def test_overloaded_call_does_not_take_the_probe():
+    release = threading.Event()
+
+    def blocking():
+        release.wait(5)
+        return "ok"
+
+    executor = _executor(blocking, max_concurrency=1, queue_limit=0)
+
+    async def scenario():
+        executor.breaker.record_failure()
+        executor.breaker.record_failure()
+        # A worker still busy with an abandoned call
+        leftover = executor._submit({})  # pylint: disable=protected-access
+        await asyncio.sleep(0.06)
+        with pytest.raises(ToolUnavailable) as refused:
+            await executor.call({})
+        assert refused.value.reason == "overloaded"
+
+        release.set()
+        await leftover
+        assert await executor.call({}) == "ok"
+        assert executor.breaker.state == "closed"
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        release.set()
+        executor.shutdown()
+
+
+def _hedged(func) -> ToolExecutor:
+    executor = _executor(func, idempotent=True, hedge=True)
+    executor._hedge_default_delay = 0.1  # pylint: disable=protected-access
+    return executor
+
+
+def test_hedge_fires_after_the_delay_and_its_win_is_counted():
+    started = []
+    release = threading.Event()
+
+    def stuck_then_fast():
+        started.append(time.monotonic())
+        if len(started) == 1:
+            release.wait(5)
+            return "primary"
+        return "hedge"
+
+    executor = _hedged(stuck_then_fast)
+    try:
+        assert asyncio.run(executor.call({})) == "hedge"
+    finally:
+        release.set()
+        executor.shutdown()
+    assert len(started) == 2
+    # Not before the hedge delay (less the event loop's clock resolution)
+    assert started[1] - started[0] >= 0.09
+    stats = executor.stats()
+    assert stats["hedged"] == 1 and stats["hedge_wins"] == 1
+
+
+def test_fast_call_is_not_hedged():
+    calls = []
+    executor = _hedged(lambda: calls.append(1) or "ok")
+    try:
+        assert asyncio.run(executor.call({})) == "ok"
+    finally:
+        executor.shutdown()
+    assert len(calls) == 1
+    assert executor.stats()["hedged"] == 0
+
+
+def test_no_hedge_without_credit():
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.2)
+        return "ok"
+
+    executor = _hedged(slow)
+    executor._hedge_credit = 0.0  # pylint: disable=protected-access
+    try:
+        assert asyncio.run(executor.call({})) == "ok"
+    finally:
+        executor.shutdown()
+    assert len(calls) == 1
+    assert executor.stats()["hedged"] == 0
+
+
+def _coalescing(func) -> ToolExecutor:
+    return _executor(func, idempotent=True, coalesce=True)
+
+
+def _blocking_counter():
+    calls = []
+    release = threading.Event()
+
+    def lookup(query):
+        calls.append(query)
+        release.wait(5)
+        return f"result for {query}"
+
+    return lookup, calls, release
+
+
+def test_identical_calls_share_one_execution():
+    lookup, calls, release = _blocking_counter()
+    executor = _coalescing(lookup)
+
+    async def scenario():
+        waiters = [asyncio.create_task(executor.call({"query": "opening hours"})) for _ in range(3)]
+        other = asyncio.create_task(executor.call({"query": "parking"}))
+        await asyncio.sleep(0.05)
+        release.set()
+        return await asyncio.gather(*waiters), await other
+
+    try:
+        shared, other = asyncio.run(scenario())
+    finally:
+        release.set()
+        executor.shutdown()
+    assert shared == ["result for opening hours"] * 3
+    assert other == "result for parking"
+    assert sorted(calls) == ["opening hours", "parking"]
+    assert executor.stats()["coalesced"] == 2
+    assert executor.stats()["coalescing_keys"] == 0
+
+
+def test_one_waiter_cancelling_leaves_the_others_their_result():
+    lookup, calls, release = _blocking_counter()
+    executor = _coalescing(lookup)
+
+    async def scenario():
+        leaving = asyncio.create_task(executor.call({"query": "menu"}))
+        staying = asyncio.create_task(executor.call({"query": "menu"}))
+        await asyncio.sleep(0.05)
+        leaving.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        assert await staying == "result for menu"
+        assert leaving.cancelled()
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        release.set()
+        executor.shutdown()
+    assert calls == ["menu"]
+
+
+def test_last_waiter_cancelling_drops_the_shared_call():
+    lookup, calls, release = _blocking_counter()
+    executor = _coalescing(lookup)
+
+    async def scenario():
+        only = asyncio.create_task(executor.call({"query": "menu"}))
+        await asyncio.sleep(0.05)
+        only.cancel()
+        await asyncio.sleep(0)
+        assert executor.stats()["coalescing_keys"] == 0
+        release.set()
+        # A later caller starts afresh instead of joining the abandoned execution
+        assert await executor.call({"query": "menu"}) == "result for menu"
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        release.set()
+        executor.shutdown()
+    assert calls == ["menu", "menu"]
+    assert executor.stats()["coalesced"] == 0
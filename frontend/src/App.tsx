@@ -1,5 +1,7 @@
 import { useCallback, useEffect, useRef, useState } from "react";
 import ReactMarkdown from 'react-markdown';
+import captureWorkletUrl from "./audio/captureProcessor.ts?worker&url";
+import playbackWorkletUrl from "./audio/playbackProcessor.ts?worker&url";
 
 type LogEntry = { id: string; text: string };
 
@@ -7,63 +9,60 @@ type WsEvent = {
     type: string;
     delta?: string;
     transcript?: string;
+    text?: string;
     item_id?: string;
     status?: string;
     payload?: unknown;
     session_id?: string;
     name?: string;
+    seq?: number;
+    last_seq?: number;
+    count?: number;
+    kind?: string;
+    ice_servers?: unknown[] | null;
 };
 
 const BACKEND_HTTP_BASE = (import.meta.env.VITE_BACKEND_BASE as string | undefined) ?? window.location.origin;
 const BACKEND_WS_BASE = BACKEND_HTTP_BASE.replace(/^http/, "ws");
 const TARGET_SAMPLE_RATE = 24000;
-const INT16_MAX = 32767;
-
-function float32ToBase64(data: Float32Array): string {
-    const buffer = new Uint8Array(data.buffer);
-    let result = "";
-    for (let i = 0; i < buffer.length; i += 1) {
-        result += String.fromCharCode(buffer[i]);
-    }
-    return btoa(result);
+// Microphone frame length posted by the capture worklet, clamped to 10-40 ms.
+const MIC_FRAME_MS = Math.min(40, Math.max(10, Number(import.meta.env.VITE_MIC_FRAME_MS ?? 20) || 20));
+// Audio the playback worklet buffers before starting (or resuming after an underrun).
+const PLAYBACK_JITTER_MS = Number(import.meta.env.VITE_PLAYBACK_JITTER_MS ?? 60) || 60;
+const PLAYBACK_CAPACITY_MS = 30000;
+const MAX_WS_RECONNECT_ATTEMPTS = 6;
+// Event topics this page renders; add "debug" to see every raw upstream event in the log
+const WS_TOPICS = (import.meta.env.VITE_WS_TOPICS as string | undefined) ?? "audio,transcripts,tools,session";
+// Negotiate the avatar while the session is created, in a single request
+const AVATAR_BOOTSTRAP = import.meta.env.VITE_AVATAR_BOOTSTRAP === "true";
+const DEFAULT_ICE_SERVERS: RTCIceServer[] = [
+    { urls: "stun:stun.l.google.com:19302" },
+    { urls: "stun:stun1.l.google.com:19302" },
+];
+
+type NetworkInformationLike = { downlink?: number; saveData?: boolean };
+
+// Lets the backend pick an avatar video profile (or audio-only) that fits this device and link
+function clientHints() {
+    const connection = (navigator as Navigator & { connection?: NetworkInformationLike }).connection;
+    return {
+        viewport_width: window.innerWidth,
+        viewport_height: window.innerHeight,
+        device_pixel_ratio: window.devicePixelRatio || 1,
+        downlink_mbps: connection?.downlink || undefined,
+        save_data: Boolean(connection?.saveData),
+    };
 }
 
-function downsampleBuffer(buffer: Float32Array, inputRate: number, targetRate: number): Float32Array {
-    if (targetRate === inputRate) {
-        return buffer;
-    }
-    const ratio = inputRate / targetRate;
-    const newLength = Math.round(buffer.length / ratio);
-    const result = new Float32Array(newLength);
-    let offsetResult = 0;
-    let offsetBuffer = 0;
-    while (offsetResult < result.length) {
-        const nextOffsetBuffer = Math.round((offsetResult + 1) * ratio);
-        let accum = 0;
-        let count = 0;
-        for (let i = offsetBuffer; i < nextOffsetBuffer && i < buffer.length; i += 1) {
-            accum += buffer[i];
-            count += 1;
-        }
-        result[offsetResult] = count > 0 ? accum / count : 0;
-        offsetResult += 1;
-        offsetBuffer = nextOffsetBuffer;
-    }
-    return result;
-}
-
-function pcm16Base64ToFloat32(b64: string): Float32Array<ArrayBuffer> {
-    const binary = atob(b64);
-    const len = binary.length / 2;
-    const result = new Float32Array(len) as Float32Array<ArrayBuffer>;
-    for (let i = 0; i < len; i += 1) {
-        const index = i * 2;
-        const sample = (binary.charCodeAt(index + 1) << 8) | binary.charCodeAt(index);
-        const signed = sample >= 0x8000 ? sample - 0x10000 : sample;
-        result[i] = signed / INT16_MAX;
-    }
-    return result;
-}
+type PlaybackStats = {
+    type: "stats";
+    bufferedMs: number;
+    playedMs: number;
+    flushedMs: number;
+    underruns: number;
+    underrunMs: number;
+    overflowMs: number;
+};
 
 function useLog(): [LogEntry[], (message: string) => void] {
     const [entries, setEntries] = useState<LogEntry[]>([]);
@@ -84,27 +83,33 @@ function App() {
     const [avatarReady, setAvatarReady] = useState(false);
     const [avatarLoading, setAvatarLoading] = useState(false);
     const [avatarPaused, setAvatarPaused] = useState(false);
+    const [avatarProfile, setAvatarProfile] = useState<string | null>(null);
     const [assistantTranscript, setAssistantTranscript] = useState("");
     const [userTranscript, setUserTranscript] = useState("");
     const [entries, appendLog] = useLog();
     const [avatarIceServers, setAvatarIceServers] = useState<RTCIceServer[]>([]);
 
     const wsRef = useRef<WebSocket | null>(null);
+    // Last event sequence number seen; null until the first session_ready
+    const lastSeqRef = useRef<number | null>(null);
+    const reconnectAttemptsRef = useRef<number>(0);
+    const migrateRef = useRef<() => void>(() => undefined);
+    const resumeAvatarRef = useRef<boolean>(false);
     const pcRef = useRef<RTCPeerConnection | null>(null);
     const videoRef = useRef<HTMLVideoElement | null>(null);
     const remoteAudioRef = useRef<HTMLAudioElement | null>(null);
 
     const mediaStreamRef = useRef<MediaStream | null>(null);
     const audioCtxRef = useRef<AudioContext | null>(null);
-    const processorRef = useRef<ScriptProcessorNode | null>(null);
+    const processorRef = useRef<AudioWorkletNode | null>(null);
 
     const playbackCtxRef = useRef<AudioContext | null>(null);
-    const playbackCursorRef = useRef<number>(0);
+    const playerRef = useRef<Promise<AudioWorkletNode> | null>(null);
+    const lastUnderrunsRef = useRef<number>(0);
 
     const ensurePlaybackContext = useCallback(() => {
         if (!playbackCtxRef.current) {
             playbackCtxRef.current = new AudioContext({ sampleRate: TARGET_SAMPLE_RATE });
-            playbackCursorRef.current = playbackCtxRef.current.currentTime;
         }
         const ctx = playbackCtxRef.current;
         if (ctx?.state === "suspended") {
@@ -113,27 +118,61 @@ function App() {
         return playbackCtxRef.current;
     }, []);
 
+    const ensurePlayer = useCallback(() => {
+        if (!playerRef.current) {
+            const audioCtx = ensurePlaybackContext();
+            playerRef.current = audioCtx.audioWorklet.addModule(playbackWorkletUrl).then(() => {
+                const node = new AudioWorkletNode(audioCtx, "pcm-playback", {
+                    numberOfInputs: 0,
+                    numberOfOutputs: 1,
+                    outputChannelCount: [1],
+                    processorOptions: { capacityMs: PLAYBACK_CAPACITY_MS, jitterTargetMs: PLAYBACK_JITTER_MS },
+                });
+                node.port.onmessage = (event: MessageEvent<PlaybackStats>) => {
+                    const stats = event.data;
+                    if (stats.underruns > lastUnderrunsRef.current) {
+                        appendLog(
+                            `Playback underruns: ${stats.underruns} (${stats.underrunMs.toFixed(0)} ms of silence inserted)`
+                        );
+                        lastUnderrunsRef.current = stats.underruns;
+                    }
+                };
+                node.connect(audioCtx.destination);
+                return node;
+            });
+        }
+        return playerRef.current;
+    }, [appendLog, ensurePlaybackContext]);
+
+    // Commands share one promise, so they reach the worklet in the order they were issued.
+    const postToPlayer = useCallback(
+        (command: { type: "push"; data: string } | { type: "end" } | { type: "flush" }) => {
+            ensurePlayer()
+                .then((node: AudioWorkletNode) => node.port.postMessage(command))
+                .catch(() => undefined);
+        },
+        [ensurePlayer]
+    );
+
     const schedulePlayback = useCallback(
         (deltaB64: string) => {
-            const audioCtx = ensurePlaybackContext();
-            const floatSamples = pcm16Base64ToFloat32(deltaB64);
-            if (!floatSamples.length) {
-                return;
-            }
-            const buffer = audioCtx.createBuffer(1, floatSamples.length, TARGET_SAMPLE_RATE);
-            buffer.copyToChannel(floatSamples, 0);
-            const source = audioCtx.createBufferSource();
-            source.buffer = buffer;
-            source.connect(audioCtx.destination);
-            const startAt = Math.max(playbackCursorRef.current, audioCtx.currentTime + 0.02);
-            source.start(startAt);
-            playbackCursorRef.current = startAt + buffer.duration;
+            ensurePlaybackContext();
+            postToPlayer({ type: "push", data: deltaB64 });
         },
-        [ensurePlaybackContext]
+        [ensurePlaybackContext, postToPlayer]
     );
 
+    const flushPlayback = useCallback(() => {
+        if (playerRef.current) {
+            postToPlayer({ type: "flush" });
+        }
+    }, [postToPlayer]);
+
     const teardownMic = useCallback(() => {
-        processorRef.current?.disconnect();
+        if (processorRef.current) {
+            processorRef.current.port.onmessage = null;
+            processorRef.current.disconnect();
+        }
         audioCtxRef.current?.close().catch(() => undefined);
         mediaStreamRef.current?.getTracks().forEach((track: MediaStreamTrack) => track.stop());
         processorRef.current = null;
@@ -146,63 +185,115 @@ function App() {
 
     const connectWebSocket = useCallback(
         (id: string) => {
-            const ws = new WebSocket(`${BACKEND_WS_BASE}/ws/sessions/${id}`);
-            wsRef.current = ws;
+            lastSeqRef.current = null;
+            reconnectAttemptsRef.current = 0;
+
+            const open = () => {
+                // After a drop, resume from the last event seen so the server replays the gap
+                const params = new URLSearchParams({ topics: WS_TOPICS });
+                if (lastSeqRef.current !== null) {
+                    params.set("last_seq", String(lastSeqRef.current));
+                }
+                const ws = new WebSocket(`${BACKEND_WS_BASE}/ws/sessions/${id}?${params}`);
+                wsRef.current = ws;
+
+                ws.onopen = () => {
+                    reconnectAttemptsRef.current = 0;
+                    appendLog("WebSocket connected");
+                };
+                ws.onclose = (event: CloseEvent) => {
+                    if (wsRef.current !== ws) {
+                        return;
+                    }
+                    appendLog("WebSocket closed");
+                    if (event.code !== 4404 && reconnectAttemptsRef.current < MAX_WS_RECONNECT_ATTEMPTS) {
+                        const delay = Math.min(8000, 500 * 2 ** reconnectAttemptsRef.current);
+                        reconnectAttemptsRef.current += 1;
+                        appendLog(`Reconnecting in ${delay} ms`);
+                        window.setTimeout(() => {
+                            if (wsRef.current === ws) {
+                                open();
+                            }
+                        }, delay);
+                        return;
+                    }
+                    teardownMic();
+                };
+                ws.onerror = (event: Event) => appendLog(`WebSocket error: ${event.type}`);
 
-            ws.onopen = () => appendLog("WebSocket connected");
-            ws.onclose = () => {
-                appendLog("WebSocket closed");
-                teardownMic();
-            };
-            ws.onerror = (event: Event) => appendLog(`WebSocket error: ${event.type}`);
-
-            ws.onmessage = (msg) => {
-                const data: WsEvent = JSON.parse(msg.data);
-                switch (data.type) {
-                    case "session_ready":
-                        if (data.session_id) {
-                            appendLog(`Session ready: ${data.session_id}`);
-                        }
-                        break;
-                    case "assistant_audio_delta":
-                        if (typeof data.delta === "string") {
-                            schedulePlayback(data.delta);
-                        }
-                        break;
-                    case "assistant_transcript_delta":
-                        if (typeof data.delta === "string") {
-                            setAssistantTranscript((prev: string) => prev + data.delta);
-                        }
-                        break;
-                    case "assistant_transcript_done":
-                        if (typeof data.transcript === "string") {
-                            setAssistantTranscript(data.transcript);
-                        }
-                        break;
-                    case "user_transcript_completed":
-                        if (typeof data.transcript === "string") {
-                            setUserTranscript(data.transcript);
-                        }
-                        break;
-                    case "function_call_completed":
-                        appendLog(`Function call completed: ${data.name ?? "unknown"}`);
-                        break;
-                    case "error":
-                        appendLog(`Server error: ${JSON.stringify(data.payload)}`);
-                        break;
-                    case "event": {
-                        const payload = data.payload as Record<string, any> | undefined;
-                        appendLog(`Event received: ${payload?.type ?? 'unknown'}`);
-                        if (payload?.type === "session.updated") {
-                            const session = payload.session ?? {};
-                            const avatar = session.avatar ?? {};
-                            appendLog(`Session avatar config: ${JSON.stringify(avatar).substring(0, 200)}`);
-                            const candidateSources = [
-                                avatar.ice_servers,
-                                session.rtc?.ice_servers,
-                                session.ice_servers,
-                            ].find((value) => Array.isArray(value));
-                            if (candidateSources) {
+                ws.onmessage = (msg) => {
+                    if (typeof msg.data !== "string") {
+                        return; // binary animation frames, only sent when the "animation" topic is requested
+                    }
+                    const data: WsEvent = JSON.parse(msg.data);
+                    if (typeof data.seq === "number") {
+                        lastSeqRef.current = data.seq;
+                    }
+                    switch (data.type) {
+                        case "session_ready":
+                            // A first connection starts at the log head; a drop before any event still resumes from it
+                            if (lastSeqRef.current === null && typeof data.last_seq === "number") {
+                                lastSeqRef.current = data.last_seq;
+                            }
+                            if (data.session_id) {
+                                appendLog(`Session ready: ${data.session_id}`);
+                            }
+                            break;
+                        case "assistant_audio_delta":
+                            if (typeof data.delta === "string") {
+                                schedulePlayback(data.delta);
+                            }
+                            break;
+                        case "assistant_audio_done":
+                            postToPlayer({ type: "end" });
+                            break;
+                        case "speech_started":
+                        case "assistant_audio_flush":
+                            // The user is talking over the assistant: drop queued audio right away
+                            flushPlayback();
+                            break;
+                        case "assistant_transcript_delta":
+                        case "assistant_text_delta":
+                            if (typeof data.delta === "string") {
+                                setAssistantTranscript((prev: string) => prev + data.delta);
+                            }
+                            break;
+                        case "assistant_transcript_done":
+                            if (typeof data.transcript === "string") {
+                                setAssistantTranscript(data.transcript);
+                            }
+                            break;
+                        case "assistant_text_done":
+                            if (typeof data.text === "string") {
+                                setAssistantTranscript(data.text);
+                            }
+                            break;
+                        case "user_transcript_completed":
+                            if (typeof data.transcript === "string") {
+                                setUserTranscript(data.transcript);
+                            }
+                            break;
+                        case "function_call_completed":
+                            appendLog(`Function call completed: ${data.name ?? "unknown"}`);
+                            break;
+                        case "rate_limited":
+                            appendLog(`Rate limited (${data.kind ?? "unknown"} messages)`);
+                            break;
+                        case "session_migrate":
+                            migrateRef.current();
+                            break;
+                        case "events_lost":
+                            appendLog(`Missed ${data.count ?? 0} events while disconnected`);
+                            break;
+                        case "function_call_cancelled":
+                            appendLog(`Function call cancelled: ${data.name ?? "unknown"}`);
+                            break;
+                        case "error":
+                            appendLog(`Server error: ${JSON.stringify(data.payload)}`);
+                            break;
+                        case "session_updated": {
+                            const candidateSources = data.ice_servers;
+                            if (Array.isArray(candidateSources)) {
                                 const normalized: RTCIceServer[] = candidateSources
                                     .map((entry: any) => {
                                         if (typeof entry === "string") {
@@ -231,28 +322,177 @@ function App() {
                             } else {
                                 appendLog("No ICE servers found in session.updated event");
                             }
+                            break;
+                        }
+                        case "event": {
+                            const payload = data.payload as Record<string, any> | undefined;
+                            appendLog(`Event received: ${payload?.type ?? 'unknown'}`);
+                            break;
                         }
-                        break;
+                        default:
+                            break;
+                    }
+                };
+            };
+
+            open();
+        },
+        [appendLog, flushPlayback, postToPlayer, schedulePlayback, teardownMic]
+    );
+
+    // Builds the receive-only peer connection and returns the fully gathered offer SDP.
+    const createAvatarOffer = useCallback(
+        async (iceServers: RTCIceServer[]): Promise<string> => {
+            const iceServersToUse = iceServers.length > 0 ? iceServers : DEFAULT_ICE_SERVERS;
+            appendLog(`ICE Servers configured: ${iceServersToUse.length}`);
+
+            const pc = new RTCPeerConnection({
+                bundlePolicy: "max-bundle",
+                iceServers: iceServersToUse,
+            });
+            pcRef.current = pc;
+
+            // Add ICE connection state monitoring
+            pc.oniceconnectionstatechange = () => {
+                appendLog(`ICE connection state: ${pc.iceConnectionState}`);
+                if (pc.iceConnectionState === "failed") {
+                    appendLog("ICE connection failed - check network/firewall");
+                }
+            };
+
+            pc.onicecandidateerror = (event) => {
+                appendLog(`ICE candidate error: ${event.errorCode} - ${event.errorText}`);
+            };
+
+            pc.addTransceiver("audio", { direction: "recvonly" });
+            pc.addTransceiver("video", { direction: "recvonly" });
+
+            pc.ontrack = (event) => {
+                const [stream] = event.streams;
+                if (!stream) {
+                    appendLog("No stream in track event");
+                    return;
+                }
+
+                if (event.track.kind === "video" && videoRef.current) {
+                    appendLog(`Video track state: ${event.track.readyState}, enabled: ${event.track.enabled}`);
+                    videoRef.current.srcObject = stream;
+                    videoRef.current.muted = true; // Start muted to allow autoplay
+                    videoRef.current
+                        .play()
+                        .then(() => {
+                            appendLog("Video playback started successfully");
+                            // Unmute after playback starts
+                            if (videoRef.current) {
+                                videoRef.current.muted = false;
+                            }
+                        })
+                        .catch((err) => {
+                            appendLog(`Video play error: ${err.message}`);
+                        });
+                    appendLog("Avatar video track received");
+                }
+
+                if (event.track.kind === "audio") {
+                    let audioEl = remoteAudioRef.current;
+                    if (!audioEl) {
+                        audioEl = document.createElement("audio");
+                        audioEl.autoplay = true;
+                        audioEl.controls = false;
+                        audioEl.style.display = "none";
+                        audioEl.setAttribute("playsinline", "true");
+                        audioEl.muted = false;
+                        document.body.appendChild(audioEl);
+                        remoteAudioRef.current = audioEl;
                     }
-                    default:
-                        break;
+                    audioEl.srcObject = stream;
+                    audioEl.play().catch(() => undefined);
+                    appendLog("Avatar audio track received");
                 }
             };
+
+            const gatheringFinished = new Promise<void>((resolve) => {
+                if (pc.iceGatheringState === "complete") {
+                    resolve();
+                } else {
+                    pc.addEventListener("icegatheringstatechange", () => {
+                        if (pc.iceGatheringState === "complete") {
+                            resolve();
+                        }
+                    });
+                }
+            });
+
+            const offer = await pc.createOffer();
+            await pc.setLocalDescription(offer);
+            await gatheringFinished;
+
+            const localSdp = pc.localDescription?.sdp;
+            if (!localSdp) {
+                throw new Error("Failed to obtain local SDP");
+            }
+            return localSdp;
         },
-        [appendLog, schedulePlayback, teardownMic]
+        [appendLog]
     );
 
     const createSession = useCallback(async () => {
-        const response = await fetch(`${BACKEND_HTTP_BASE}/sessions`, { method: "POST" });
+        let offerSdp: string | null = null;
+        if (AVATAR_BOOTSTRAP) {
+            // Gather the avatar offer first so session setup and avatar negotiation share one round trip
+            setAvatarLoading(true);
+            offerSdp = await createAvatarOffer([]);
+        }
+        const request = () =>
+            offerSdp
+                ? fetch(`${BACKEND_HTTP_BASE}/sessions/bootstrap`, {
+                      method: "POST",
+                      headers: { "Content-Type": "application/json" },
+                      body: JSON.stringify({ sdp: offerSdp, ...clientHints() }),
+                  })
+                : fetch(`${BACKEND_HTTP_BASE}/sessions`, {
+                      method: "POST",
+                      headers: { "Content-Type": "application/json" },
+                      body: JSON.stringify(clientHints()),
+                  });
+
+        let response = await request();
+        // The backend sheds load with 503/429 + Retry-After; honour it a few times before giving up
+        for (let attempt = 0; attempt < 3 && (response.status === 503 || response.status === 429); attempt += 1) {
+            const retryAfter = Number(response.headers.get("Retry-After") ?? "1") || 1;
+            appendLog(`Server busy, retrying in ${retryAfter} s`);
+            await new Promise((resolve) => window.setTimeout(resolve, retryAfter * 1000));
+            response = await request();
+        }
         if (!response.ok) {
+            if (offerSdp) {
+                pcRef.current?.close();
+                pcRef.current = null;
+                setAvatarLoading(false);
+            }
             throw new Error(`Failed to create session: ${response.status}`);
         }
-        const { session_id } = await response.json();
+        const { session_id, sdp, avatar_profile } = await response.json();
         setSessionId(session_id);
+        setAvatarProfile(avatar_profile ?? null);
         appendLog(`Session created: ${session_id}`);
+        if (avatar_profile) {
+            appendLog(`Avatar profile: ${avatar_profile}`);
+        }
         connectWebSocket(session_id);
+        if (offerSdp && sdp) {
+            await pcRef.current?.setRemoteDescription({ type: "answer", sdp });
+            setAvatarLoading(false);
+            setAvatarReady(true);
+            appendLog("Avatar connected");
+        } else if (offerSdp) {
+            // The backend downgraded this session to audio-only
+            pcRef.current?.close();
+            pcRef.current = null;
+            setAvatarLoading(false);
+        }
         return session_id;
-    }, [appendLog, connectWebSocket]);
+    }, [appendLog, connectWebSocket, createAvatarOffer]);
 
     useEffect(() => {
         createSession().catch((err: unknown) => appendLog(`Error creating session: ${String(err)}`));
@@ -283,21 +523,20 @@ function App() {
         }
 
         const source = audioContext.createMediaStreamSource(mediaStream);
-        const processor = audioContext.createScriptProcessor(4096, 1, 1);
-        processor.onaudioprocess = (event: AudioProcessingEvent) => {
-            const input = event.inputBuffer.getChannelData(0);
-            const downsampled = downsampleBuffer(input, audioContext.sampleRate, TARGET_SAMPLE_RATE);
-            if (!downsampled.length) {
-                return;
+        await audioContext.audioWorklet.addModule(captureWorkletUrl);
+        const processor = new AudioWorkletNode(audioContext, "pcm-capture", {
+            numberOfInputs: 1,
+            numberOfOutputs: 1,
+            channelCount: 1,
+            channelCountMode: "explicit",
+            processorOptions: { targetSampleRate: TARGET_SAMPLE_RATE, frameMs: MIC_FRAME_MS },
+        });
+        // Frames arrive as PCM16 ArrayBuffers and go out as binary WebSocket messages.
+        processor.port.onmessage = (event: MessageEvent<ArrayBuffer>) => {
+            const ws = wsRef.current;
+            if (ws?.readyState === WebSocket.OPEN) {
+                ws.send(event.data);
             }
-            const base64 = float32ToBase64(downsampled);
-            wsRef.current?.send(
-                JSON.stringify({
-                    type: "audio_chunk",
-                    data: base64,
-                    encoding: "float32",
-                })
-            );
         };
         source.connect(processor);
         processor.connect(audioContext.destination);
@@ -344,104 +583,9 @@ function App() {
 
         setAvatarLoading(true);
         appendLog("Initializing avatar connection...");
-        
-        // Use provided ICE servers or fall back to default STUN servers
-        const iceServersToUse = avatarIceServers.length > 0 
-            ? avatarIceServers 
-            : [
-                { urls: "stun:stun.l.google.com:19302" },
-                { urls: "stun:stun1.l.google.com:19302" },
-              ];
-        appendLog(`ICE Servers configured: ${iceServersToUse.length}`);
 
         try {
-            const pc = new RTCPeerConnection({
-                bundlePolicy: "max-bundle",
-                iceServers: iceServersToUse,
-            });
-            pcRef.current = pc;
-
-            // Add ICE connection state monitoring
-            pc.oniceconnectionstatechange = () => {
-                appendLog(`ICE connection state: ${pc.iceConnectionState}`);
-                if (pc.iceConnectionState === "failed") {
-                    appendLog("ICE connection failed - check network/firewall");
-                }
-            };
-
-            pc.onicecandidateerror = (event) => {
-                appendLog(`ICE candidate error: ${event.errorCode} - ${event.errorText}`);
-            };
-
-            pc.addTransceiver("audio", { direction: "recvonly" });
-            pc.addTransceiver("video", { direction: "recvonly" });
-
-            pc.ontrack = (event) => {
-                const [stream] = event.streams;
-                if (!stream) {
-                    appendLog("No stream in track event");
-                    return;
-                }
-
-                if (event.track.kind === "video" && videoRef.current) {
-                    appendLog(`Video track state: ${event.track.readyState}, enabled: ${event.track.enabled}`);
-                    videoRef.current.srcObject = stream;
-                    videoRef.current.muted = true; // Start muted to allow autoplay
-                    videoRef.current
-                        .play()
-                        .then(() => {
-                            appendLog("Video playback started successfully");
-                            // Unmute after playback starts
-                            if (videoRef.current) {
-                                videoRef.current.muted = false;
-                            }
-                        })
-                        .catch((err) => {
-                            appendLog(`Video play error: ${err.message}`);
-                        });
-                    appendLog("Avatar video track received");
-                }
-
-                if (event.track.kind === "audio") {
-                    let audioEl = remoteAudioRef.current;
-                    if (!audioEl) {
-                        audioEl = document.createElement("audio");
-                        audioEl.autoplay = true;
-                        audioEl.controls = false;
-                        audioEl.style.display = "none";
-                        audioEl.setAttribute("playsinline", "true");
-                        audioEl.muted = false;
-                        document.body.appendChild(audioEl);
-                        remoteAudioRef.current = audioEl;
-                    }
-                    audioEl.srcObject = stream;
-                    audioEl.play().catch(() => undefined);
-                    appendLog("Avatar audio track received");
-                }
-            };
-
-            const gatheringFinished = new Promise<void>((resolve) => {
-                if (pc.iceGatheringState === "complete") {
-                    resolve();
-                } else {
-                    pc.addEventListener("icegatheringstatechange", () => {
-                        if (pc.iceGatheringState === "complete") {
-                            resolve();
-                        }
-                    });
-                }
-            });
-
-            const offer = await pc.createOffer();
-            await pc.setLocalDescription(offer);
-            await gatheringFinished;
-
-            const localSdp = pc.localDescription?.sdp;
-            if (!localSdp) {
-                appendLog("Failed to obtain local SDP");
-                return;
-            }
-
+            const localSdp = await createAvatarOffer(avatarIceServers);
             const response = await fetch(`${BACKEND_HTTP_BASE}/sessions/${sessionId}/avatar-offer`, {
                 method: "POST",
                 headers: { "Content-Type": "application/json" },
@@ -455,7 +599,7 @@ function App() {
             }
 
             const { sdp } = await response.json();
-            await pc.setRemoteDescription({ type: "answer", sdp });
+            await pcRef.current?.setRemoteDescription({ type: "answer", sdp });
             setAvatarLoading(false);
             setAvatarReady(true);
             appendLog("Avatar connected");
@@ -467,7 +611,7 @@ function App() {
                 pcRef.current = null;
             }
         }
-    }, [appendLog, sessionId, avatarIceServers]);
+    }, [appendLog, createAvatarOffer, sessionId, avatarIceServers]);
 
     const teardownAvatar = useCallback(() => {
         pcRef.current?.close();
@@ -487,6 +631,30 @@ function App() {
         appendLog("Avatar connection closed");
     }, [appendLog]);
 
+    // The server is draining for a deploy: move to a fresh session, which lands on another replica
+    const migrateSession = useCallback(() => {
+        const ws = wsRef.current;
+        wsRef.current = null;
+        ws?.close();
+        resumeAvatarRef.current = pcRef.current !== null && !AVATAR_BOOTSTRAP;
+        if (pcRef.current) {
+            teardownAvatar();
+        }
+        appendLog("Server is restarting, moving to a new session");
+        createSession().catch((err: unknown) => appendLog(`Error creating session: ${String(err)}`));
+    }, [appendLog, createSession, teardownAvatar]);
+
+    useEffect(() => {
+        migrateRef.current = migrateSession;
+    }, [migrateSession]);
+
+    useEffect(() => {
+        if (sessionId && resumeAvatarRef.current) {
+            resumeAvatarRef.current = false;
+            startAvatar().catch((err: unknown) => appendLog(`Avatar connection error: ${String(err)}`));
+        }
+    }, [appendLog, sessionId, startAvatar]);
+
     const pauseAvatar = useCallback(() => {
         if (videoRef.current) {
             videoRef.current.pause();
@@ -532,7 +700,10 @@ function App() {
                     <button className="secondary" onClick={sendTextPrompt} disabled={!sessionId}>
                         Send Text Prompt
                     </button>
-                    <button onClick={startAvatar} disabled={!sessionId || avatarLoading || avatarReady}>
+                    <button
+                        onClick={startAvatar}
+                        disabled={!sessionId || avatarLoading || avatarReady || avatarProfile === "audio-only"}
+                    >
                         {avatarLoading ? "Connecting Avatar..." : "Start Avatar"}
                     </button>
                     <button 
@@ -0,0 +1,67 @@
+// Runs on the audio rendering thread: downsamples the microphone signal to the
+// target rate, converts it to PCM16 and posts fixed-size frames to the main
+// thread as transferable ArrayBuffers.
+
+const INT16_MAX = 32767;
+
+type CaptureOptions = {
+    targetSampleRate: number;
+    frameMs: number;
+};
+
+class PcmCaptureProcessor extends AudioWorkletProcessor {
+    private readonly step: number;
+    private readonly frameSamples: number;
+    private frame: Int16Array<ArrayBuffer>;
+    private frameFill = 0;
+    private accum = 0;
+    private count = 0;
+    private position = 0;
+    private lastSample = 0;
+
+    constructor(options: AudioWorkletNodeOptions) {
+        super(options);
+        const { targetSampleRate, frameMs } = options.processorOptions as CaptureOptions;
+        this.step = sampleRate / targetSampleRate;
+        this.frameSamples = Math.round((targetSampleRate * frameMs) / 1000);
+        this.frame = new Int16Array(this.frameSamples);
+    }
+
+    process(inputs: Float32Array[][]): boolean {
+        const channel = inputs[0]?.[0];
+        if (!channel) {
+            return true;
+        }
+        for (let i = 0; i < channel.length; i += 1) {
+            this.accum += channel[i];
+            this.count += 1;
+            this.position += 1;
+            // Average every `step` input samples into one output sample; the
+            // fractional remainder carries over so the rate stays exact.
+            while (this.position >= this.step) {
+                if (this.count > 0) {
+                    this.lastSample = this.accum / this.count;
+                }
+                this.pushSample(this.lastSample);
+                this.accum = 0;
+                this.count = 0;
+                this.position -= this.step;
+            }
+        }
+        return true;
+    }
+
+    private pushSample(sample: number): void {
+        const clipped = Math.max(-1, Math.min(1, sample));
+        this.frame[this.frameFill] = (clipped * INT16_MAX) | 0;
+        this.frameFill += 1;
+        if (this.frameFill === this.frameSamples) {
+            const buffer = this.frame.buffer;
+            this.port.postMessage(buffer, [buffer]);
+            this.frame = new Int16Array(this.frameSamples);
+            this.frameFill = 0;
+        }
+    }
+}
+
+registerProcessor("pcm-capture", PcmCaptureProcessor);
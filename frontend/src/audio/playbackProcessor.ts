@@ -0,0 +1,163 @@
+// Runs on the audio rendering thread: a message-fed ring buffer that plays
+// assistant PCM16 audio with a jitter-buffer target, counts underruns and can
+// drop everything queued within one render quantum.
+
+const INT16_MAX = 32767;
+const B64_ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/";
+const B64_LOOKUP = new Uint8Array(128);
+for (let i = 0; i < B64_ALPHABET.length; i += 1) {
+    B64_LOOKUP[B64_ALPHABET.charCodeAt(i)] = i;
+}
+
+type PlaybackOptions = {
+    capacityMs: number;
+    jitterTargetMs: number;
+};
+
+type PlaybackCommand =
+    | { type: "push"; data: string }
+    | { type: "end" }
+    | { type: "flush" }
+    | { type: "stats" };
+
+class PcmPlaybackProcessor extends AudioWorkletProcessor {
+    private readonly ring: Float32Array;
+    private readonly targetSamples: number;
+    private scratch = new Uint8Array(8192);
+    private readIndex = 0;
+    private writeIndex = 0;
+    private available = 0;
+    private buffering = true;
+    private ending = false;
+    private underruns = 0;
+    private underrunSamples = 0;
+    private overflowSamples = 0;
+    private playedSamples = 0;
+    private flushedSamples = 0;
+
+    constructor(options: AudioWorkletNodeOptions) {
+        super(options);
+        const { capacityMs, jitterTargetMs } = options.processorOptions as PlaybackOptions;
+        this.ring = new Float32Array(Math.round((sampleRate * capacityMs) / 1000));
+        this.targetSamples = Math.round((sampleRate * jitterTargetMs) / 1000);
+        this.port.onmessage = (event: MessageEvent<PlaybackCommand>) => this.handleCommand(event.data);
+    }
+
+    private handleCommand(command: PlaybackCommand): void {
+        switch (command.type) {
+            case "push":
+                this.push(command.data);
+                break;
+            case "end":
+                this.ending = true;
+                break;
+            case "flush":
+                this.flushedSamples += this.available;
+                this.readIndex = this.writeIndex;
+                this.available = 0;
+                this.buffering = true;
+                this.ending = false;
+                this.postStats();
+                break;
+            case "stats":
+                this.postStats();
+                break;
+            default:
+                break;
+        }
+    }
+
+    private push(b64: string): void {
+        const byteLength = this.decodeBase64(b64);
+        const samples = byteLength >> 1;
+        const bytes = this.scratch;
+        for (let i = 0; i < samples; i += 1) {
+            if (this.available === this.ring.length) {
+                this.overflowSamples += samples - i;
+                break;
+            }
+            const raw = bytes[2 * i] | (bytes[2 * i + 1] << 8);
+            const signed = raw >= 0x8000 ? raw - 0x10000 : raw;
+            this.ring[this.writeIndex] = signed / INT16_MAX;
+            this.writeIndex = (this.writeIndex + 1) % this.ring.length;
+            this.available += 1;
+        }
+        this.ending = false;
+    }
+
+    private decodeBase64(b64: string): number {
+        let padding = 0;
+        if (b64.endsWith("==")) {
+            padding = 2;
+        } else if (b64.endsWith("=")) {
+            padding = 1;
+        }
+        const byteLength = Math.max(0, (b64.length >> 2) * 3 - padding);
+        if (this.scratch.length < byteLength) {
+            this.scratch = new Uint8Array(byteLength * 2);
+        }
+        const out = this.scratch;
+        let offset = 0;
+        for (let i = 0; i + 3 < b64.length; i += 4) {
+            const triple =
+                (B64_LOOKUP[b64.charCodeAt(i)] << 18) |
+                (B64_LOOKUP[b64.charCodeAt(i + 1)] << 12) |
+                (B64_LOOKUP[b64.charCodeAt(i + 2)] << 6) |
+                B64_LOOKUP[b64.charCodeAt(i + 3)];
+            if (offset < byteLength) out[offset++] = (triple >> 16) & 0xff;
+            if (offset < byteLength) out[offset++] = (triple >> 8) & 0xff;
+            if (offset < byteLength) out[offset++] = triple & 0xff;
+        }
+        return byteLength;
+    }
+
+    private postStats(): void {
+        this.port.postMessage({
+            type: "stats",
+            bufferedMs: (this.available / sampleRate) * 1000,
+            playedMs: (this.playedSamples / sampleRate) * 1000,
+            flushedMs: (this.flushedSamples / sampleRate) * 1000,
+            underruns: this.underruns,
+            underrunMs: (this.underrunSamples / sampleRate) * 1000,
+            overflowMs: (this.overflowSamples / sampleRate) * 1000,
+        });
+    }
+
+    process(_inputs: Float32Array[][], outputs: Float32Array[][]): boolean {
+        const output = outputs[0]?.[0];
+        if (!output) {
+            return true;
+        }
+        if (this.buffering) {
+            // Hold playback until the jitter target is met, or the stream has
+            // ended and whatever is left should simply play out.
+            if (this.available === 0 || (this.available < this.targetSamples && !this.ending)) {
+                output.fill(0);
+                return true;
+            }
+            this.buffering = false;
+        }
+        let written = 0;
+        while (written < output.length && this.available > 0) {
+            output[written] = this.ring[this.readIndex];
+            this.readIndex = (this.readIndex + 1) % this.ring.length;
+            this.available -= 1;
+            written += 1;
+        }
+        this.playedSamples += written;
+        if (written < output.length) {
+            output.fill(0, written);
+            this.buffering = true;
+            if (this.ending) {
+                this.ending = false;
+                this.postStats();
+            } else {
+                this.underruns += 1;
+                this.underrunSamples += output.length - written;
+            }
+        }
+        return true;
+    }
+}
+
+registerProcessor("pcm-playback", PcmPlaybackProcessor);